@@ -0,0 +1,193 @@
+import argparse
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCHMARKS_DIR)
+PLOX = os.path.join(ROOT, 'plox', 'main.py')
+CLOX = os.path.join(ROOT, 'clox', 'clox')
+
+WORKLOADS = [
+    'binary_trees',
+    'equality',
+    'fib',
+    'instantiation',
+    'invocation',
+    'method_call',
+    'properties',
+    'string_equality',
+    'trees',
+    'zoo',
+]
+
+IMPLEMENTATIONS = ['plox:tree', 'plox:closure', 'plox:vm', 'clox']
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class ArgumentParser(argparse.ArgumentParser):
+    def error(self, message):
+        self.print_usage(sys.stderr)
+        self.exit(64, f'{self.prog}: error: {message}\n')
+
+
+def command(implementation: str, path: str, clox: str) -> [str]:
+    if implementation == 'clox':
+        return [clox, path]
+    engine = implementation.split(':')[1]
+    # Without the program cache, so every run measures the whole pipeline.
+    return [sys.executable, PLOX, '--no-cache', '--engine', engine, path]
+
+
+# Wall-clock seconds of each run of the command, startup included.
+def measure(cmd: [str], runs: int, timeout: float) -> [float]:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        try:
+            result = subprocess.run(cmd, stdout=subprocess.DEVNULL,
+                                    stderr=subprocess.PIPE, timeout=timeout)
+        except OSError as e:
+            raise BenchmarkError(str(e)) from None
+        except subprocess.TimeoutExpired:
+            raise BenchmarkError(f'timed out after {timeout}s') from None
+        times.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            message = result.stderr.decode(errors='replace').strip()
+            raise BenchmarkError(
+                f'exit status {result.returncode}: {message}')
+    return times
+
+
+# Nearest-rank percentile.
+def percentile(times: [float], pct: float) -> float:
+    ordered = sorted(times)
+    return ordered[max(math.ceil(pct / 100 * len(ordered)) - 1, 0)]
+
+
+def run(workloads: [str], implementations: [str], runs: int, timeout: float,
+        clox: str) -> dict:
+    results = {}
+    for workload in workloads:
+        path = os.path.join(BENCHMARKS_DIR, f'{workload}.lox')
+        results[workload] = {}
+        for implementation in implementations:
+            cmd = command(implementation, path, clox)
+            try:
+                times = measure(cmd, runs, timeout)
+            except BenchmarkError as e:
+                result = {'error': str(e)}
+            else:
+                result = {
+                    'median': statistics.median(times),
+                    'p95': percentile(times, 95),
+                    'times': times,
+                }
+            results[workload][implementation] = result
+            print_result(workload, implementation, result,
+                         results[workload].get('clox'))
+    return results
+
+
+def print_result(workload: str, implementation: str, result: dict,
+                 clox: dict):
+    if 'error' in result:
+        print(f'{workload:<16} {implementation:<13} error: {result["error"]}',
+              flush=True)
+        return
+    line = (f'{workload:<16} {implementation:<13} '
+            f'median {result["median"]:8.3f}s  p95 {result["p95"]:8.3f}s')
+    if clox is not None and 'median' in clox and implementation != 'clox':
+        line += f'  {result["median"] / clox["median"]:7.1f}x clox'
+    print(line, flush=True)
+
+
+# Medians that grew by more than `threshold` over the baseline, as
+# (workload, implementation, baseline median, median).
+def regressions(results: dict, baseline: dict, threshold: float) -> list:
+    found = []
+    for workload, implementations in results.items():
+        for implementation, result in implementations.items():
+            previous = baseline.get(workload, {}).get(implementation, {})
+            if 'median' not in result or 'median' not in previous:
+                continue
+            if result['median'] > previous['median'] * (1 + threshold):
+                found.append((workload, implementation, previous['median'],
+                              result['median']))
+    return found
+
+
+def main():
+    parser = ArgumentParser(
+        prog='run.py',
+        description='Times the Lox workloads in this directory on plox '
+                    'engines and clox.')
+    parser.add_argument('workloads', nargs='*', metavar='WORKLOAD',
+                        help='workloads to run, of: '
+                             f'{", ".join(WORKLOADS)} (default: all)')
+    parser.add_argument('--impl', action='append', choices=IMPLEMENTATIONS,
+                        dest='implementations',
+                        help='implementation to time, one of: '
+                             f'{", ".join(IMPLEMENTATIONS)} (repeatable, '
+                             'default: plox:tree and clox)')
+    parser.add_argument('--runs', type=int, default=5,
+                        help='runs of each workload (default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=300,
+                        help='seconds a single run may take (default: '
+                             '%(default)s)')
+    parser.add_argument('--clox', default=CLOX,
+                        help='clox executable, built with `make clox` in '
+                             'clox/ (default: %(default)s)')
+    parser.add_argument('--json', metavar='FILE',
+                        help='write the results to FILE')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='results written by an earlier --json run to '
+                             'compare against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='fail when a median is this fraction slower '
+                             'than in the baseline (default: %(default)s)')
+    args = parser.parse_args()
+    if args.runs < 1:
+        parser.error('--runs must be at least 1')
+    for workload in args.workloads:
+        if workload not in WORKLOADS:
+            parser.error(f'unknown workload {workload}')
+    implementations = args.implementations or ['plox:tree', 'clox']
+    # clox first, so plox results can be printed relative to it.
+    implementations.sort(key=lambda implementation: implementation != 'clox')
+
+    baseline = None
+    if args.baseline is not None:
+        try:
+            with open(args.baseline) as baseline_file:
+                baseline = json.load(baseline_file)['results']
+        except (OSError, ValueError, KeyError) as e:
+            parser.exit(66, f'{parser.prog}: {args.baseline}: {e}\n')
+
+    results = run(args.workloads or WORKLOADS, implementations, args.runs,
+                  args.timeout, args.clox)
+    if args.json is not None:
+        with open(args.json, 'w') as json_file:
+            json.dump({'runs': args.runs, 'results': results}, json_file,
+                      indent=2)
+
+    failed = any('error' in result for workload in results.values()
+                 for result in workload.values())
+    if baseline is not None:
+        for workload, implementation, before, after in regressions(
+                results, baseline, args.threshold):
+            print(f'regression: {workload} on {implementation}: median '
+                  f'{before:.3f}s -> {after:.3f}s', file=sys.stderr)
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
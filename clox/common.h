@@ -5,10 +5,13 @@
 #include <stddef.h>
 #include <stdint.h>
 
+// Only the debug build (make debug) traces, release builds are benchmarked.
+#ifdef DEBUG
 #define DEBUG_PRINT_CODE
 #define DEBUG_TRACE_EXECUTION
 
 #define DEBUG_LOG_GC
+#endif
 
 #define UINT8_COUNT (UINT8_MAX + 1)
 
@@ -44,6 +44,7 @@ static char* instructionToStr(OpCode code) {
 		case OP_METHOD: return "OP_METHOD";
 		case OP_RETURN: return "OP_RETURN";
 	}
+	return "OP_UNKNOWN";
 }
 
 void disassembleChunk(Chunk* chunk, const char* name) {
@@ -1,19 +1,15 @@
 import sys
 
-from plox.lox import Lox
-
 
 def main():
-    args = sys.argv[1:]
-    if len(args) > 1:
-        print("Usage: plox [file]")
-        sys.exit(64)
-
-    lox = Lox()
-    if len(args) == 1:
-        lox.run_file(args[0])
+    # Running a script on a daemon only needs the client, which starts
+    # without importing the interpreter.
+    if sys.argv[1:2] == ['run']:
+        from plox.client import main as run
+        run(sys.argv[2:])
     else:
-        lox.run_prompt()
+        from plox.cli import main as cli
+        cli(sys.argv[1:])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,8 @@
+import argparse
+import sys
+
+
+class ArgumentParser(argparse.ArgumentParser):
+    def error(self, message):
+        self.print_usage(sys.stderr)
+        self.exit(64, f'{self.prog}: error: {message}\n')
@@ -0,0 +1,114 @@
+import io
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Iterator, TextIO
+
+from plox.cache import MemoryCache, ProgramCache
+from plox.lox import Lox
+from plox.optimizer import PASSES
+
+
+# How every script of the batch is run. Workers get it once, when they start.
+class BatchSettings:
+    def __init__(self, engine: str = 'tree', passes: [str] = PASSES,
+                 cache_dir: str = None, use_cache: bool = True):
+        self.engine = engine
+        self.passes = passes
+        self.cache_dir = cache_dir
+        self.use_cache = use_cache
+
+    def cache(self, path: str) -> ProgramCache:
+        if not self.use_cache:
+            return None
+        if self.cache_dir is not None:
+            return ProgramCache(self.cache_dir)
+        return ProgramCache.for_script(path)
+
+
+# Runs one script on a fresh interpreter, as `plox <path>` would, and
+# returns what it printed and its exit code. Output written to `out` or
+# `err` instead, as it's produced, is left out of the result.
+def run_script(path: str, settings: BatchSettings,
+               cache: ProgramCache | MemoryCache = None,
+               out: TextIO = None, err: TextIO = None) -> dict:
+    if cache is None:
+        cache = settings.cache(path)
+    return _run(path, settings, cache, lambda lox: lox.run_file(path),
+                out, err)
+
+
+def run_source(source: str, settings: BatchSettings,
+               cache: ProgramCache | MemoryCache = None,
+               name: str = '<source>',
+               out: TextIO = None, err: TextIO = None) -> dict:
+    return _run(name, settings, cache, lambda lox: lox.run(source), out, err)
+
+
+def _run(name: str, settings: BatchSettings,
+         cache: ProgramCache | MemoryCache, run: Callable[[Lox], None],
+         out: TextIO = None, err: TextIO = None):
+    stdout = io.StringIO() if out is None else out
+    stderr = io.StringIO() if err is None else err
+    start = time.perf_counter()
+    try:
+        lox = Lox(engine=settings.engine, passes=settings.passes,
+                  cache=cache, out=stdout, err=stderr)
+        run(lox)
+        exit_code = 0
+        if lox.errors.had_error:
+            exit_code = 65
+        elif lox.errors.had_runtime_error:
+            exit_code = 70
+    except SystemExit as e:
+        exit_code = e.code
+    except OSError as e:
+        print(f'plox: {name}: {e.strerror}', file=stderr)
+        exit_code = 66
+    except Exception:
+        traceback.print_exc(file=stderr)
+        exit_code = 1
+    return {
+        'file': name,
+        'exit_code': exit_code,
+        'stdout': '' if out is not None else stdout.getvalue(),
+        'stderr': '' if err is not None else stderr.getvalue(),
+        'seconds': time.perf_counter() - start,
+    }
+
+
+_settings: BatchSettings = None
+
+
+def _start_worker(settings: BatchSettings):
+    global _settings
+    _settings = settings
+
+
+def _run_in_worker(path: str) -> dict:
+    return run_script(path, _settings)
+
+
+# Runs the scripts on `jobs` worker processes and yields their results as
+# they finish. Workers are forked with plox already imported and each runs
+# many scripts, so a script costs neither a Python startup nor imports.
+def run_batch(paths: [str], settings: BatchSettings,
+              jobs: int = None) -> Iterator[dict]:
+    pool = ProcessPoolExecutor(jobs, initializer=_start_worker,
+                               initargs=(settings,))
+    try:
+        futures = {pool.submit(_run_in_worker, path): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                yield future.result()
+            except Exception as e:
+                # The worker died, e.g. killed or out of memory.
+                yield {
+                    'file': futures[future],
+                    'exit_code': None,
+                    'stdout': '',
+                    'stderr': f'plox: worker failed: {e}\n',
+                    'seconds': None,
+                }
+    finally:
+        pool.shutdown(cancel_futures=True)
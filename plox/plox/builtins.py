@@ -0,0 +1,39 @@
+import time
+from array import array
+
+from plox.float_array import FloatArray
+from plox.lox_list import LoxList, whole_number
+from plox.lox_map import LoxMap
+from plox.natives import NativeError, Natives
+
+# Defined in every interpreter.
+BUILTINS = Natives()
+
+
+@BUILTINS.register
+def clock():
+    return time.time()*1000.0
+
+
+@BUILTINS.register(name='List')
+def new_list(*elements):
+    return LoxList(list(elements))
+
+
+@BUILTINS.register(name='Map')
+def new_map():
+    return LoxMap({})
+
+
+# FloatArray(size) has every element zero, FloatArray(list) the elements of
+# a list of numbers.
+@BUILTINS.register(name='FloatArray')
+def new_float_array(source):
+    if type(source) is LoxList:
+        if not all(type(value) is float for value in source.elements):
+            raise NativeError('FloatArray elements must be numbers.')
+        return FloatArray(array('d', source.elements))
+    size = whole_number(source, 'FloatArray size')
+    if size < 0:
+        raise NativeError('FloatArray size must not be negative.')
+    return FloatArray(array('d', bytes(8 * size)))
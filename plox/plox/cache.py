@@ -0,0 +1,83 @@
+import hashlib
+import os
+import pickle
+from collections import OrderedDict
+
+from plox import __version__
+from plox.statements import Stmt
+
+# Bumped when the pickled program changes shape without a version bump.
+FORMAT = 3
+
+
+# Keeps parsed, optimized and resolved programs on disk, keyed by a hash of
+# their source, the plox version and the optimization passes they went
+# through, so unchanged scripts skip the whole front end.
+class ProgramCache:
+    def __init__(self, directory: str):
+        self._directory = directory
+
+    @staticmethod
+    def for_script(path: str) -> 'ProgramCache':
+        directory = os.path.dirname(os.path.abspath(path))
+        return ProgramCache(os.path.join(directory, '__ploxcache__'))
+
+    def load(self, source: str, passes: [str]) -> [Stmt]:
+        try:
+            with open(self._path(source, passes), 'rb') as cache_file:
+                version, format, statements = pickle.load(cache_file)
+        except Exception:
+            # Missing, unreadable, or written by an incompatible plox.
+            return None
+        if (version, format) != (__version__, FORMAT):
+            return None
+        return statements
+
+    def store(self, source: str, passes: [str], statements: [Stmt]):
+        path = self._path(source, passes)
+        try:
+            data = pickle.dumps((__version__, FORMAT, statements),
+                                pickle.HIGHEST_PROTOCOL)
+            os.makedirs(self._directory, exist_ok=True)
+            # Written aside and renamed, so concurrent runs never see a
+            # partial file.
+            temp = f'{path}.{os.getpid()}.tmp'
+            with open(temp, 'wb') as cache_file:
+                cache_file.write(data)
+            os.replace(temp, path)
+        except (OSError, RecursionError, pickle.PicklingError):
+            pass
+
+    def _path(self, source: str, passes: [str]) -> str:
+        return os.path.join(self._directory, f'{_key(source, passes)}.plc')
+
+
+# Keeps the most recently stored programs of a long-running process in
+# memory. Interpreters don't bind anything to the statements, so every load
+# returns the same ones.
+class MemoryCache:
+    def __init__(self, size: int = 256):
+        self._size = size
+        self._programs: OrderedDict[str, [Stmt]] = OrderedDict()
+        # Loads that found the program.
+        self.hits = 0
+
+    def load(self, source: str, passes: [str]) -> [Stmt]:
+        key = _key(source, passes)
+        statements = self._programs.get(key)
+        if statements is not None:
+            self._programs.move_to_end(key)
+            self.hits += 1
+        return statements
+
+    def store(self, source: str, passes: [str], statements: [Stmt]):
+        self._programs[_key(source, passes)] = statements
+        if len(self._programs) > self._size:
+            self._programs.popitem(last=False)
+
+
+def _key(source: str, passes: [str]) -> str:
+    key = hashlib.sha256(
+        f'{__version__}\0{FORMAT}\0{",".join(passes)}\0'.encode())
+    key.update(source.encode())
+    return key.hexdigest()
@@ -1,9 +1,7 @@
-import time
 from abc import abstractmethod
 from dataclasses import dataclass
 
-from plox.environment import Environment
-from plox.return_ex import LoxReturn
+from plox.environment import Environment, LocalEnvironment
 from plox.statements import Function, Lambda
 
 
@@ -17,15 +15,26 @@ class LoxCallable:
         raise NotImplementedError
 
 
-class Clock(LoxCallable):
-    def arity(self):
-        return 0
+# A call in return position whose callee is a Lox function. It's handed back
+# to the caller's trampoline, which runs it in place of the returning call so
+# tail recursion doesn't grow the Python stack.
+class TailCall:
+    __slots__ = ('function', 'args')
 
-    def call(self, interpreter, args):
-        return time.time()*1000.0
+    def __init__(self, function: LoxCallable, args: list):
+        self.function = function
+        self.args = args
 
-    def __repr__(self):
-        return '<native fn>'
+
+def _trampoline(interpreter, function, args: list):
+    while True:
+        env = LocalEnvironment(function._closure, args)
+        if not interpreter.execute_function(function, env):
+            return None
+        result = interpreter.return_value
+        if type(result) is not TailCall:
+            return result
+        function, args = result.function, result.args
 
 
 @dataclass
@@ -35,23 +44,18 @@ class LoxFunction(LoxCallable):
     _is_initializer: bool
 
     def call(self, interpreter, args):
-        env = Environment(self._closure)
-        for i in range(len(self._declaration.params)):
-            env.define(self._declaration.params[i].lexeme, args[i])
-        try:
-            interpreter.execute_block(self._declaration.body, env)
-        except LoxReturn as ret:
-            if self._is_initializer:
-                return self._closure.get_at(0, 'this')
-            return ret.value
+        return _trampoline(interpreter, self, args)
+
+    # Runs the function as a method: `values` holds the receiver followed by
+    # the arguments, and becomes the frame the Resolver expects "this" in.
+    def invoke(self, interpreter, values: list):
+        result = self.call(interpreter, values)
         if self._is_initializer:
-            return self._closure.get_at(0, "this")
-        return None
+            return values[0]
+        return result
 
     def bind(self, instance):
-        env: Environment = Environment(self._closure)
-        env.define("this", instance)
-        return LoxFunction(self._declaration, env, self._is_initializer)
+        return LoxBoundMethod(instance, self)
 
     def arity(self):
         return len(self._declaration.params)
@@ -60,6 +64,21 @@ class LoxFunction(LoxCallable):
         return f'<fn {self._declaration.name.lexeme}>'
 
 
+class LoxBoundMethod(LoxCallable):
+    def __init__(self, receiver, method):
+        self._receiver = receiver
+        self._method = method
+
+    def call(self, interpreter, args):
+        return self._method.invoke(interpreter, [self._receiver, *args])
+
+    def arity(self):
+        return self._method.arity()
+
+    def __repr__(self):
+        return repr(self._method)
+
+
 # TODO: this class is a copy-paste of LoxFunction except for the type of
 # declaration. And even it doesn't really matter: both Function and Lambda are
 # designed to have parameters and a body. Function has a name, but it doesn't
@@ -71,14 +90,7 @@ class LoxLambda(LoxCallable):
         self._closure = closure
 
     def call(self, interpreter, args):
-        env = Environment(self._closure)
-        for i in range(len(self._declaration.params)):
-            env.define(self._declaration.params[i].lexeme, args[i])
-        try:
-            interpreter.execute_block(self._declaration.body, env)
-        except LoxReturn as ret:
-            return ret.value
-        return None
+        return _trampoline(interpreter, self, args)
 
     def arity(self):
         return len(self._declaration.params)
@@ -0,0 +1,187 @@
+import glob
+import json
+import os
+import signal
+import sys
+
+from plox.arguments import ArgumentParser
+from plox.batch import BatchSettings, run_batch
+from plox.cache import ProgramCache
+from plox.client import default_socket
+from plox.daemon import Daemon
+from plox.lox import ENGINES, Lox
+from plox.optimizer import PASSES
+from plox.profiler import Profiler
+from plox.snapshot import SnapshotError
+
+
+def add_engine_arguments(parser: ArgumentParser):
+    parser.add_argument('--engine', choices=ENGINES, default='tree',
+                        help='execution engine (default: %(default)s)')
+    parser.add_argument('--disable-pass', action='append', default=[],
+                        choices=PASSES, metavar='PASS',
+                        help='skip an optimization pass, one of: '
+                             f'{", ".join(PASSES)} (repeatable)')
+
+
+def add_cache_arguments(parser: ArgumentParser):
+    parser.add_argument('--cache-dir', metavar='DIR',
+                        help='where compiled scripts are cached (default: '
+                             '__ploxcache__ next to the script)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='always compile the script from source')
+
+
+def main(argv: [str]):
+    if argv[:1] == ['batch']:
+        batch(argv[1:])
+        return
+    if argv[:1] == ['serve']:
+        serve(argv[1:])
+        return
+    parser = ArgumentParser(
+        prog='plox',
+        epilog='plox batch --help: run many scripts; plox serve --help: '
+               'run scripts for clients; plox run --help: run a script on '
+               'a daemon')
+    parser.add_argument('file', nargs='?')
+    add_engine_arguments(parser)
+    add_cache_arguments(parser)
+    parser.add_argument('--stream', action='store_true',
+                        help='run each declaration of the file as soon as '
+                             'it is parsed')
+    parser.add_argument('--restore', metavar='SNAPSHOT',
+                        help='start from the globals saved in a heap '
+                             'snapshot')
+    parser.add_argument('--snapshot', metavar='SNAPSHOT',
+                        help='save the globals left by the script to a heap '
+                             'snapshot')
+    parser.add_argument('--profile', action='store_true',
+                        help='print time spent per function and per line '
+                             'to stderr (tree engine only)')
+    parser.add_argument('--profile-stacks', metavar='FILE',
+                        help='with --profile, also write the time of each '
+                             'call stack to FILE in collapsed form for '
+                             'flame graphs')
+    args = parser.parse_args(argv)
+    if args.profile and args.engine != 'tree':
+        parser.error('--profile needs the tree engine')
+    if args.profile_stacks is not None and not args.profile:
+        parser.error('--profile-stacks needs --profile')
+
+    passes = [name for name in PASSES if name not in args.disable_pass]
+    cache = None
+    if args.file is not None and not args.no_cache:
+        if args.cache_dir is not None:
+            cache = ProgramCache(args.cache_dir)
+        else:
+            cache = ProgramCache.for_script(args.file)
+    profiler = Profiler() if args.profile else None
+    lox = Lox(engine=args.engine, passes=passes, cache=cache,
+              profiler=profiler)
+    if args.restore is not None:
+        try:
+            lox.load_heap(args.restore)
+        except (OSError, SnapshotError) as e:
+            parser.exit(66, f'{parser.prog}: {args.restore}: {e}\n')
+    try:
+        if args.file is not None:
+            lox.run_file(args.file, stream=args.stream)
+        else:
+            lox.run_prompt()
+    finally:
+        # Also reported when the script fails, which exits from run_file.
+        if profiler is not None:
+            profiler.report(sys.stderr)
+            if args.profile_stacks is not None:
+                with open(args.profile_stacks, 'w') as stacks_file:
+                    profiler.write_stacks(stacks_file)
+    if args.snapshot is not None:
+        try:
+            lox.save_heap(args.snapshot)
+        except (OSError, SnapshotError) as e:
+            parser.exit(73, f'{parser.prog}: {args.snapshot}: {e}\n')
+
+
+def batch(argv: [str]):
+    parser = ArgumentParser(
+        prog='plox batch',
+        description='Runs scripts in parallel, each on a fresh interpreter, '
+                    'and prints one JSON line per script as it finishes.')
+    parser.add_argument('files', nargs='*', metavar='FILE',
+                        help='script or glob pattern of scripts')
+    parser.add_argument('--files-from', metavar='LIST',
+                        help='also run the scripts listed in LIST, one per '
+                             'line (- for stdin)')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count(),
+                        help='worker processes (default: %(default)s)')
+    add_engine_arguments(parser)
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+
+    paths = []
+    for pattern in args.files:
+        if glob.has_magic(pattern):
+            paths.extend(sorted(glob.glob(pattern, recursive=True)))
+        else:
+            paths.append(pattern)
+    if args.files_from is not None:
+        try:
+            if args.files_from == '-':
+                lines = sys.stdin.read().splitlines()
+            else:
+                with open(args.files_from) as list_file:
+                    lines = list_file.read().splitlines()
+        except OSError as e:
+            parser.exit(66, f'{parser.prog}: {args.files_from}: '
+                            f'{e.strerror}\n')
+        paths.extend(line for line in lines if line)
+    if not paths:
+        parser.error('no scripts to run')
+
+    settings = BatchSettings(
+        engine=args.engine,
+        passes=[name for name in PASSES if name not in args.disable_pass],
+        cache_dir=args.cache_dir, use_cache=not args.no_cache)
+    failed = False
+    for result in run_batch(paths, settings, args.jobs):
+        print(json.dumps(result), flush=True)
+        failed = failed or result['exit_code'] != 0
+    sys.exit(1 if failed else 0)
+
+
+def serve(argv: [str]):
+    parser = ArgumentParser(
+        prog='plox serve',
+        description='Runs scripts sent by plox run --daemon on warm worker '
+                    'processes, until interrupted.')
+    parser.add_argument('--socket', default=default_socket(),
+                        help='where to listen (default: %(default)s)')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count(),
+                        help='worker processes (default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=60,
+                        metavar='SECONDS',
+                        help='stop scripts running longer, 0 for never '
+                             '(default: %(default)s)')
+    add_engine_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error('--jobs must be at least 1')
+    if args.timeout < 0:
+        parser.error('--timeout must not be negative')
+
+    settings = BatchSettings(
+        engine=args.engine,
+        passes=[name for name in PASSES if name not in args.disable_pass])
+    try:
+        daemon = Daemon(args.socket, settings, args.jobs, args.timeout)
+    except OSError as e:
+        parser.exit(71, f'{parser.prog}: {e}\n')
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    with daemon:
+        try:
+            daemon.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,69 @@
+import json
+import os
+import socket
+import sys
+from typing import Iterator
+
+from plox.arguments import ArgumentParser
+
+# Imports nothing of the interpreter itself, so asking a daemon to run a
+# script costs little more than starting Python.
+
+
+def default_socket() -> str:
+    directory = os.environ.get('XDG_RUNTIME_DIR')
+    if directory:
+        return os.path.join(directory, 'plox.sock')
+    return f'/tmp/plox-{os.getuid()}.sock'
+
+
+# Sends one request to the daemon and yields its replies as they arrive,
+# each a line of JSON: what the script prints while it runs, then its exit
+# code, or an error.
+def request(socket_path: str, message: dict) -> Iterator[dict]:
+    # Anyone can create the socket in /tmp, scripts only go to a daemon
+    # running as this user.
+    if os.stat(socket_path).st_uid != os.getuid():
+        raise PermissionError(f'{socket_path} belongs to another user')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(message).encode() + b'\n')
+        connection.shutdown(socket.SHUT_WR)
+        with connection.makefile('rb') as replies:
+            for line in replies:
+                yield json.loads(line)
+
+
+def main(argv: [str]):
+    parser = ArgumentParser(prog='plox run')
+    parser.add_argument('file', help='script to run, - for stdin')
+    parser.add_argument('--daemon', action='store_true',
+                        help='run the script on a plox serve daemon')
+    parser.add_argument('--socket', default=default_socket(),
+                        help='socket of the daemon (default: %(default)s)')
+    args = parser.parse_args(argv)
+    if not args.daemon:
+        from plox.cli import main as cli
+        if args.file == '-':
+            parser.error('only a daemon runs scripts from stdin')
+        cli([args.file])
+        return
+
+    if args.file == '-':
+        message = {'source': sys.stdin.read()}
+    else:
+        message = {'path': os.path.abspath(args.file)}
+    try:
+        for reply in request(args.socket, message):
+            if 'error' in reply:
+                parser.exit(64, f'{parser.prog}: {reply["error"]}\n')
+            if 'exit_code' in reply:
+                sys.exit(reply['exit_code'])
+            for name, text in reply.items():
+                stream = sys.stdout if name == 'stdout' else sys.stderr
+                stream.write(text)
+                stream.flush()
+    except (OSError, ValueError) as e:
+        parser.exit(69, f'{parser.prog}: daemon at {args.socket}: {e}\n')
+    parser.exit(69, f'{parser.prog}: daemon at {args.socket}: closed the '
+                    f'connection\n')
@@ -0,0 +1,732 @@
+from dataclasses import dataclass, field
+from functools import singledispatchmethod
+from operator import add, mul, sub, truediv
+from typing import Callable, TextIO
+
+from plox.callable import LoxBoundMethod, LoxCallable, TailCall
+from plox.environment import (UNDEFINED, Environment, LocalEnvironment,
+                              undefined_variable)
+from plox.errors import LoxErrors, LoxRuntimeError
+from plox.expressions import (Assignment, Binary, Call, Expr, Get, Grouping,
+                              Index, Literal, Logical, Set, SetIndex, Super,
+                              This, Unary, Variable)
+from plox.float_array import arithmetic
+from plox.inline_cache import MethodCache
+from plox.interpreter import Interpreter
+from plox.lox_class import LoxClass, LoxInstance
+from plox.natives import (NativeError, NativeFunction, NativeMethod,
+                          NativeObject)
+from plox.statements import (Block, Class, Expression, Function, If, Lambda,
+                             Print, Return, Stmt, Var, While)
+from plox.token_types import Token, TokenType
+
+
+@dataclass(frozen=True)
+class FunctionCode:
+    name: str
+    params: tuple[str, ...]
+    body: Callable
+    # Kept so the code can be compiled again, e.g. when a heap snapshot is
+    # restored into another interpreter.
+    declaration: Function | Lambda = field(compare=False, repr=False)
+
+
+@dataclass
+class CompiledFunction(LoxCallable):
+    _code: FunctionCode
+    _closure: Environment
+    _is_initializer: bool
+
+    def call(self, interpreter, args):
+        function = self
+        while True:
+            env = LocalEnvironment(function._closure, args)
+            if function._code.body(env) is not RETURN:
+                return None
+            result = interpreter.return_value
+            if type(result) is not TailCall:
+                return result
+            function, args = result.function, result.args
+
+    def invoke(self, interpreter, values: list):
+        result = self.call(interpreter, values)
+        if self._is_initializer:
+            return values[0]
+        return result
+
+    def bind(self, instance):
+        return LoxBoundMethod(instance, self)
+
+    def arity(self):
+        return len(self._code.params)
+
+    def __repr__(self):
+        if self._code.name is None:
+            return '<lambda fn>'
+        return f'<fn {self._code.name}>'
+
+
+# Result of a compiled statement that executed a return. Expression statements
+# are run as the bare expression closure and evaluate to arbitrary Lox values,
+# so the signal has to be a marker no program can produce.
+RETURN = object()
+
+
+def _is_truthy(value) -> bool:
+    return not (value is None or value is False)
+
+
+def _number_operands(operator: Token, left, right):
+    if isinstance(left, float) and isinstance(right, float):
+        return
+    raise LoxRuntimeError(operator, 'Operands must be numbers')
+
+
+def _native_error(paren: Token, error: Exception) -> LoxRuntimeError:
+    if isinstance(error, RecursionError):
+        return LoxRuntimeError(paren, 'Stack overflow.')
+    return LoxRuntimeError(paren, str(error))
+
+
+# Every node is visited once here and turned into a closure taking the current
+# environment. Operators and resolved depths are picked at compile time, so
+# running the program never goes through singledispatch again.
+class ClosureCompiler:
+    def __init__(self, interpreter: 'ClosureInterpreter'):
+        self._interpreter = interpreter
+
+    def compile(self, statements: [Stmt]) -> Callable:
+        return self._sequence(statements)
+
+    def _sequence(self, statements: [Stmt]) -> Callable:
+        compiled = tuple(self._stmt(stmt)
+                         for stmt in statements if stmt is not None)
+        if len(compiled) == 1:
+            return compiled[0]
+
+        def run(env):
+            for stmt in compiled:
+                if stmt(env) is RETURN:
+                    return RETURN
+        return run
+
+    def _function_code(self, name: str,
+                       declaration: Function | Lambda) -> FunctionCode:
+        params = tuple(param.lexeme for param in declaration.params)
+        return FunctionCode(name, params, self._sequence(declaration.body),
+                            declaration)
+
+    @singledispatchmethod
+    def _stmt(self, stmt: Stmt) -> Callable:
+        raise NotImplementedError
+
+    @_stmt.register
+    def _(self, stmt: Expression):
+        return self._expr(stmt.expr)
+
+    @_stmt.register
+    def _(self, stmt: Print):
+        value = self._expr(stmt.expr)
+        stringify = self._interpreter._stringify
+        out = self._interpreter._out
+
+        def run(env):
+            print(stringify(value(env)), file=out)
+        return run
+
+    @_stmt.register
+    def _(self, stmt: Var):
+        init = None
+        if stmt.init is not None:
+            init = self._expr(stmt.init)
+        if stmt.slot is None:
+            name = stmt.name.lexeme
+            if init is None:
+                def run(env):
+                    env.define(name, None)
+            else:
+                def run(env):
+                    env.define(name, init(env))
+        elif init is None:
+            def run(env):
+                env.values.append(None)
+        else:
+            def run(env):
+                env.values.append(init(env))
+        return run
+
+    @_stmt.register
+    def _(self, stmt: Function):
+        name = stmt.name.lexeme
+        code = self._function_code(name, stmt)
+        if stmt.slot is None:
+            def run(env):
+                env.define(name, CompiledFunction(code, env, False))
+        else:
+            def run(env):
+                env.values.append(CompiledFunction(code, env, False))
+        return run
+
+    @_stmt.register
+    def _(self, stmt: Return):
+        interpreter = self._interpreter
+        if stmt.value is None:
+            def run(env):
+                interpreter.return_value = None
+                return RETURN
+            return run
+        if stmt.tail_call:
+            value = self._call_expr(stmt.value, tail=True)
+        else:
+            value = self._expr(stmt.value)
+
+        def run(env):
+            interpreter.return_value = value(env)
+            return RETURN
+        return run
+
+    @_stmt.register
+    def _(self, stmt: If):
+        condition = self._expr(stmt.condition)
+        then_branch = self._stmt(stmt.then_branch)
+        if stmt.else_branch is None:
+            def run(env):
+                if _is_truthy(condition(env)):
+                    return then_branch(env)
+            return run
+        else_branch = self._stmt(stmt.else_branch)
+
+        def run(env):
+            if _is_truthy(condition(env)):
+                return then_branch(env)
+            return else_branch(env)
+        return run
+
+    @_stmt.register
+    def _(self, stmt: While):
+        condition = self._expr(stmt.condition)
+        body = self._stmt(stmt.body)
+
+        def run(env):
+            while _is_truthy(condition(env)):
+                if body(env) is RETURN:
+                    return RETURN
+        return run
+
+    @_stmt.register
+    def _(self, stmt: Block):
+        body = self._sequence(stmt.statements)
+
+        def run(env):
+            return body(LocalEnvironment(env))
+        return run
+
+    @_stmt.register
+    def _(self, stmt: Class):
+        name = stmt.name
+        superclass_expr = None
+        if stmt.superclass is not None:
+            superclass_expr = self._expr(stmt.superclass)
+        methods = tuple(
+            (method.name.lexeme,
+             self._function_code(method.name.lexeme, method))
+            for method in stmt.methods)
+
+        slot = stmt.slot
+
+        def run(env):
+            superclass = None
+            if superclass_expr is not None:
+                superclass = superclass_expr(env)
+                if not isinstance(superclass, LoxClass):
+                    raise LoxRuntimeError(
+                        stmt.superclass.name, 'Superclass must be a class')
+            if slot is None:
+                env.define(name.lexeme, None)
+            else:
+                env.values.append(None)
+
+            method_env = env
+            if superclass is not None:
+                method_env = LocalEnvironment(env, [superclass])
+
+            klass = LoxClass(name.lexeme, superclass, {
+                method_name: CompiledFunction(code, method_env,
+                                              method_name == 'init')
+                for method_name, code in methods
+            })
+            if slot is None:
+                env.assign(name, klass)
+            else:
+                env.values[slot] = klass
+        return run
+
+    @singledispatchmethod
+    def _expr(self, expr: Expr) -> Callable:
+        raise NotImplementedError
+
+    @_expr.register
+    def _(self, expr: Literal):
+        value = expr.value
+
+        def run(env):
+            return value
+        return run
+
+    @_expr.register
+    def _(self, expr: Grouping):
+        return self._expr(expr.expression)
+
+    @_expr.register
+    def _(self, expr: Variable):
+        return self._lookup(expr.name, expr)
+
+    @_expr.register
+    def _(self, expr: This):
+        return self._lookup(expr.keyword, expr)
+
+    def _lookup(self, name: Token, expr: Expr) -> Callable:
+        depth, slot = expr.depth, expr.slot
+        if depth is None:
+            # The compiled program belongs to one interpreter, so the cell
+            # can be bound here rather than on the first run.
+            cell = self._interpreter.globals.cell(name.lexeme)
+
+            def run(env):
+                value = cell.value
+                if value is UNDEFINED:
+                    raise undefined_variable(name)
+                return value
+        elif depth == 0:
+            def run(env):
+                return env.values[slot]
+        elif depth == 1:
+            def run(env):
+                return env.enclosing.values[slot]
+        else:
+            def run(env):
+                return env.get_at(depth, slot)
+        return run
+
+    @_expr.register
+    def _(self, expr: Assignment):
+        value = self._expr(expr.value)
+        depth, slot = expr.depth, expr.slot
+        if depth is None:
+            name = expr.name
+            cell = self._interpreter.globals.cell(name.lexeme)
+
+            def run(env):
+                result = value(env)
+                if cell.value is UNDEFINED:
+                    raise undefined_variable(name)
+                cell.value = result
+                return result
+        elif depth == 0:
+            def run(env):
+                result = env.values[slot] = value(env)
+                return result
+        else:
+            def run(env):
+                result = value(env)
+                env.assign_at(depth, slot, result)
+                return result
+        return run
+
+    @_expr.register
+    def _(self, expr: Unary):
+        right = self._expr(expr.right)
+        operator = expr.operator
+        match operator.type:
+            case TokenType.BANG:
+                def run(env):
+                    return not _is_truthy(right(env))
+            case TokenType.MINUS:
+                def run(env):
+                    value = right(env)
+                    if not isinstance(value, float):
+                        raise LoxRuntimeError(
+                            operator, 'Operand must be a number')
+                    return -value
+        return run
+
+    @_expr.register
+    def _(self, expr: Logical):
+        left = self._expr(expr.left)
+        right = self._expr(expr.right)
+        if expr.operator.type == TokenType.OR:
+            def run(env):
+                value = left(env)
+                if _is_truthy(value):
+                    return value
+                return right(env)
+        else:
+            def run(env):
+                value = left(env)
+                if not _is_truthy(value):
+                    return value
+                return right(env)
+        return run
+
+    @_expr.register
+    def _(self, expr: Binary):
+        left = self._expr(expr.left)
+        right = self._expr(expr.right)
+        operator = expr.operator
+        match operator.type:
+            case TokenType.BANG_EQUAL:
+                check_equal = self._interpreter._check_equal
+
+                def run(env):
+                    return not check_equal(left(env), right(env))
+            case TokenType.EQUAL_EQUAL:
+                check_equal = self._interpreter._check_equal
+
+                def run(env):
+                    return check_equal(left(env), right(env))
+            case TokenType.GREATER:
+                def run(env):
+                    a, b = left(env), right(env)
+                    _number_operands(operator, a, b)
+                    return a > b
+            case TokenType.GREATER_EQUAL:
+                def run(env):
+                    a, b = left(env), right(env)
+                    _number_operands(operator, a, b)
+                    return a >= b
+            case TokenType.LESS:
+                def run(env):
+                    a, b = left(env), right(env)
+                    _number_operands(operator, a, b)
+                    return a < b
+            case TokenType.LESS_EQUAL:
+                def run(env):
+                    a, b = left(env), right(env)
+                    _number_operands(operator, a, b)
+                    return a <= b
+            case TokenType.MINUS:
+                def run(env):
+                    a, b = left(env), right(env)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a - b
+                    return arithmetic(operator, sub, a, b)
+            case TokenType.SLASH:
+                def run(env):
+                    a, b = left(env), right(env)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a / b
+                    return arithmetic(operator, truediv, a, b)
+            case TokenType.STAR:
+                def run(env):
+                    a, b = left(env), right(env)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a * b
+                    return arithmetic(operator, mul, a, b)
+            case TokenType.PLUS:
+                def run(env):
+                    a, b = left(env), right(env)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a + b
+                    if isinstance(a, str) and isinstance(b, str):
+                        return a + b
+                    return arithmetic(
+                        operator, add, a, b,
+                        'Operands must be two numbers or two strings.')
+        return run
+
+    @_expr.register
+    def _(self, expr: Lambda):
+        code = self._function_code(None, expr)
+
+        def run(env):
+            return CompiledFunction(code, env, False)
+        return run
+
+    @_expr.register
+    def _(self, expr: Call):
+        return self._call_expr(expr)
+
+    # With `tail` set, calls of compiled functions are not made but handed
+    # back as a TailCall for the trampoline of the function being returned
+    # from.
+    def _call_expr(self, expr: Call, tail: bool = False) -> Callable:
+        if isinstance(expr.callee, Get):
+            return self._invoke(expr, expr.callee, tail)
+        if isinstance(expr.callee, Super):
+            return self._super_invoke(expr, expr.callee, tail)
+        callee_expr = self._expr(expr.callee)
+        arg_exprs = tuple(self._expr(arg) for arg in expr.args)
+        call = self._call(expr, tail)
+        native = self._call_native(expr, arg_exprs)
+
+        def run(env):
+            callee = callee_expr(env)
+            if type(callee) is NativeFunction:
+                return native(env, callee)
+            return call(callee, [arg(env) for arg in arg_exprs])
+        return run
+
+    # Evaluates the arguments and calls a native function with them,
+    # reporting its errors at the call. Calls with few arguments pass them
+    # directly, without building a list.
+    def _call_native(self, expr: Call, arg_exprs: tuple) -> Callable:
+        paren = expr.paren
+        match arg_exprs:
+            case ():
+                def native(env, callee: NativeFunction):
+                    try:
+                        return callee.call_native()
+                    except (NativeError, RecursionError) as e:
+                        raise _native_error(paren, e) from None
+            case (arg,):
+                def native(env, callee: NativeFunction):
+                    try:
+                        return callee.call_native(arg(env))
+                    except (NativeError, RecursionError) as e:
+                        raise _native_error(paren, e) from None
+            case (first, second):
+                def native(env, callee: NativeFunction):
+                    try:
+                        return callee.call_native(first(env), second(env))
+                    except (NativeError, RecursionError) as e:
+                        raise _native_error(paren, e) from None
+            case _:
+                def native(env, callee: NativeFunction):
+                    args = [arg(env) for arg in arg_exprs]
+                    try:
+                        return callee.call_native(*args)
+                    except (NativeError, RecursionError) as e:
+                        raise _native_error(paren, e) from None
+        return native
+
+    # The same for methods of native objects.
+    def _call_native_method(self, expr: Call, arg_exprs: tuple) -> Callable:
+        paren = expr.paren
+        interpreter = self._interpreter
+        match arg_exprs:
+            case ():
+                def native(env, method: NativeMethod, obj: NativeObject):
+                    try:
+                        return method.call_method(interpreter, obj)
+                    except (NativeError, RecursionError) as e:
+                        raise _native_error(paren, e) from None
+            case (arg,):
+                def native(env, method: NativeMethod, obj: NativeObject):
+                    try:
+                        return method.call_method(interpreter, obj, arg(env))
+                    except (NativeError, RecursionError) as e:
+                        raise _native_error(paren, e) from None
+            case (first, second):
+                def native(env, method: NativeMethod, obj: NativeObject):
+                    try:
+                        return method.call_method(interpreter, obj,
+                                                  first(env), second(env))
+                    except (NativeError, RecursionError) as e:
+                        raise _native_error(paren, e) from None
+            case _:
+                def native(env, method: NativeMethod, obj: NativeObject):
+                    args = [arg(env) for arg in arg_exprs]
+                    try:
+                        return method.call_method(interpreter, obj, *args)
+                    except (NativeError, RecursionError) as e:
+                        raise _native_error(paren, e) from None
+        return native
+
+    # Checks and performs a call of an already evaluated callee.
+    def _call(self, expr: Call, tail: bool) -> Callable:
+        paren = expr.paren
+        interpreter = self._interpreter
+
+        def call(callee, args):
+            if type(callee) is NativeFunction:
+                try:
+                    return callee.call_native(*args)
+                except (NativeError, RecursionError) as e:
+                    raise _native_error(paren, e) from None
+            if not isinstance(callee, LoxCallable):
+                raise LoxRuntimeError(
+                    paren, 'Can only call functions and classes')
+            if len(args) != callee.arity():
+                raise LoxRuntimeError(
+                    paren,
+                    f'Expected {callee.arity()} arguments, '
+                    f'but got {len(args)}.')
+            if tail and type(callee) is CompiledFunction:
+                return TailCall(callee, args)
+            try:
+                return callee.call(interpreter, args)
+            except RecursionError:
+                raise LoxRuntimeError(paren, 'Stack overflow.') from None
+        return call
+
+    # Checks and performs a call of a method with `values` holding the
+    # receiver and the arguments.
+    def _call_method(self, expr: Call, tail: bool) -> Callable:
+        argc = len(expr.args)
+        paren = expr.paren
+        interpreter = self._interpreter
+
+        def call_method(method: CompiledFunction, values: list):
+            if method.arity() != argc:
+                raise LoxRuntimeError(
+                    paren,
+                    f'Expected {method.arity()} arguments, but got {argc}.')
+            if tail and not method._is_initializer:
+                return TailCall(method, values)
+            try:
+                return method.invoke(interpreter, values)
+            except RecursionError:
+                raise LoxRuntimeError(paren, 'Stack overflow.') from None
+        return call_method
+
+    # obj.name(args): calls the method with the receiver prepended to the
+    # arguments instead of allocating a bound method first.
+    def _invoke(self, expr: Call, get: Get, tail: bool) -> Callable:
+        obj_expr = self._expr(get.object)
+        arg_exprs = tuple(self._expr(arg) for arg in expr.args)
+        name = get.name
+        call = self._call(expr, tail)
+        call_method = self._call_method(expr, tail)
+        native = self._call_native_method(expr, arg_exprs)
+        cache = MethodCache()
+
+        def run(env):
+            obj = obj_expr(env)
+            if not isinstance(obj, LoxInstance):
+                if isinstance(obj, NativeObject):
+                    return native(env, obj.method(name), obj)
+                raise LoxRuntimeError(name, 'Only instances have properties.')
+            if obj.has_field(name):
+                return call(obj.get(name), [arg(env) for arg in arg_exprs])
+            method = obj.find_method(name, cache)
+            values = [obj]
+            for arg in arg_exprs:
+                values.append(arg(env))
+            return call_method(method, values)
+        return run
+
+    def _super_invoke(self, expr: Call, super: Super,
+                      tail: bool) -> Callable:
+        arg_exprs = tuple(self._expr(arg) for arg in expr.args)
+        depth, slot = super.depth, super.slot
+        method_name = super.method
+        call_method = self._call_method(expr, tail)
+        cache = MethodCache()
+
+        def run(env):
+            superclass: LoxClass = env.get_at(depth, slot)
+            obj: LoxInstance = env.get_at(depth - 1, 0)
+            method = cache.lookup(superclass, method_name.lexeme)
+            if method is None:
+                raise LoxRuntimeError(
+                    method_name,
+                    f'Undefined property {method_name.lexeme}.')
+            values = [obj]
+            for arg in arg_exprs:
+                values.append(arg(env))
+            return call_method(method, values)
+        return run
+
+    @_expr.register
+    def _(self, expr: Get):
+        obj_expr = self._expr(expr.object)
+        name = expr.name
+        interpreter = self._interpreter
+        cache = MethodCache()
+
+        def run(env):
+            obj = obj_expr(env)
+            if isinstance(obj, LoxInstance):
+                return obj.get(name, cache)
+            if isinstance(obj, NativeObject):
+                return obj.method(name).bind(interpreter, obj)
+            raise LoxRuntimeError(name, 'Only instances have properties.')
+        return run
+
+    @_expr.register
+    def _(self, expr: Index):
+        obj_expr = self._expr(expr.object)
+        index_expr = self._expr(expr.index)
+        bracket = expr.bracket
+
+        def run(env):
+            obj = obj_expr(env)
+            index = index_expr(env)
+            if not isinstance(obj, NativeObject):
+                raise LoxRuntimeError(bracket,
+                                      'Only collections can be indexed.')
+            try:
+                return obj.get_item(index)
+            except NativeError as e:
+                raise LoxRuntimeError(bracket, str(e)) from None
+        return run
+
+    @_expr.register
+    def _(self, expr: SetIndex):
+        obj_expr = self._expr(expr.object)
+        index_expr = self._expr(expr.index)
+        value_expr = self._expr(expr.value)
+        bracket = expr.bracket
+
+        def run(env):
+            obj = obj_expr(env)
+            index = index_expr(env)
+            value = value_expr(env)
+            if not isinstance(obj, NativeObject):
+                raise LoxRuntimeError(bracket,
+                                      'Only collections can be indexed.')
+            try:
+                obj.set_item(index, value)
+            except NativeError as e:
+                raise LoxRuntimeError(bracket, str(e)) from None
+            return value
+        return run
+
+    @_expr.register
+    def _(self, expr: Set):
+        obj_expr = self._expr(expr.object)
+        value_expr = self._expr(expr.value)
+        name = expr.name
+
+        def run(env):
+            obj = obj_expr(env)
+            if not isinstance(obj, LoxInstance):
+                raise LoxRuntimeError(name, 'Only instances have fields')
+            value = value_expr(env)
+            obj.set(name, value)
+            return value
+        return run
+
+    @_expr.register
+    def _(self, expr: Super):
+        depth, slot = expr.depth, expr.slot
+        method_name = expr.method
+        cache = MethodCache()
+
+        def run(env):
+            superclass: LoxClass = env.get_at(depth, slot)
+            obj: LoxInstance = env.get_at(depth - 1, 0)
+            method = cache.lookup(superclass, method_name.lexeme)
+            if method is None:
+                raise LoxRuntimeError(
+                    method_name,
+                    f'Undefined property {method_name.lexeme}.')
+            return method.bind(obj)
+        return run
+
+
+class ClosureInterpreter(Interpreter):
+    def __init__(self, errors: LoxErrors = None, out: TextIO = None):
+        super().__init__(errors, out)
+        self._compiler = ClosureCompiler(self)
+
+    def compile_function(self, name: str,
+                         declaration: Function | Lambda) -> FunctionCode:
+        return self._compiler._function_code(name, declaration)
+
+    def interpret(self, statements: [Stmt]):
+        try:
+            program = self._compiler.compile(statements)
+            program(self.globals)
+        except LoxRuntimeError as e:
+            self.errors.runtime_error(e)
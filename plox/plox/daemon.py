@@ -0,0 +1,248 @@
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import socketserver
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Callable
+
+from plox.batch import BatchSettings, run_script, run_source
+from plox.cache import MemoryCache
+
+# Exit code of a script stopped for running too long, as timeout(1) has.
+TIMED_OUT = 124
+
+_settings: BatchSettings = None
+_cache: MemoryCache = None
+_output: multiprocessing.Queue = None
+
+
+# Not an Exception, so neither natives nor the interpreter catch it.
+class _Timeout(BaseException):
+    pass
+
+
+def _time_out(signum, frame):
+    raise _Timeout
+
+
+def _start_worker(settings: BatchSettings, output: multiprocessing.Queue):
+    global _settings, _cache, _output
+    # Interrupting the daemon also interrupts its process group, the
+    # workers are shut down by the daemon instead.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGALRM, _time_out)
+    _settings = settings
+    # Programs compiled by this worker are reused by its later requests.
+    _cache = MemoryCache()
+    _output = output
+
+
+# Sends what a script writes to the daemon a line at a time, for the client
+# to get it while the script still runs.
+class _Stream(io.TextIOBase):
+    def __init__(self, request: int, name: str):
+        self._request = request
+        self._name = name
+        self._buffer = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        self._buffer.append(text)
+        if '\n' in text:
+            self.flush()
+        return len(text)
+
+    def flush(self):
+        if self._buffer:
+            _output.put((self._request, {self._name: ''.join(self._buffer)}))
+            self._buffer.clear()
+
+
+def _serve_in_worker(request: int, message: dict, timeout: float):
+    out, err = _Stream(request, 'stdout'), _Stream(request, 'stderr')
+    hits = _cache.hits
+    if timeout:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        if 'source' in message:
+            result = run_source(message['source'], _settings, _cache,
+                                out=out, err=err)
+        else:
+            result = run_script(message['path'], _settings, _cache,
+                                out=out, err=err)
+        exit_code = result['exit_code']
+    except _Timeout:
+        print(f'plox: timed out after {timeout:g}s', file=err)
+        exit_code = TIMED_OUT
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    out.flush()
+    err.flush()
+    _output.put((request, {'exit_code': exit_code,
+                           'cached': _cache.hits > hits}))
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            # Just checking whether the daemon is up.
+            return
+        try:
+            message = json.loads(line)
+            if not isinstance(message, dict) or not (
+                    isinstance(message.get('source'), str)
+                    or isinstance(message.get('path'), str)):
+                raise ValueError('expected a source or a path')
+        except ValueError as e:
+            self._send({'error': f'bad request: {e}'})
+            return
+        replies = self.server.submit(message)
+        while True:
+            reply = replies.get()
+            if not self._send(reply):
+                # The client is gone, the script still runs to its end.
+                return
+            if 'exit_code' in reply or 'error' in reply:
+                return
+
+    def _send(self, reply: dict) -> bool:
+        try:
+            self.wfile.write(json.dumps(reply).encode() + b'\n')
+            self.wfile.flush()
+        except OSError:
+            return False
+        return True
+
+
+# A pool of worker processes and the queue they send replies through. A
+# worker killed while writing to the queue leaves it locked, so a broken pool
+# is replaced along with its queue.
+class _Workers:
+    def __init__(self, jobs: int, settings: BatchSettings,
+                 route: Callable[[int, dict], None]):
+        self.output = multiprocessing.Queue()
+        self.pool = ProcessPoolExecutor(jobs, initializer=_start_worker,
+                                        initargs=(settings, self.output))
+        self._stopped = threading.Event()
+        self._router = threading.Thread(target=self._route, args=(route,))
+        self._router.start()
+
+    def _route(self, route: Callable[[int, dict], None]):
+        while not self._stopped.is_set():
+            try:
+                request, reply = self.output.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            route(request, reply)
+
+    def shutdown(self, wait: bool = True):
+        self.pool.shutdown(wait=wait, cancel_futures=True)
+        self._stopped.set()
+        self._router.join()
+        self.output.close()
+
+
+# Serves `plox run --daemon` clients on a Unix socket. Each request runs on a
+# fresh interpreter in one of the worker processes, which are started once
+# with plox imported. What the script prints is streamed back as it's
+# printed, followed by the exit code.
+class Daemon(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, settings: BatchSettings,
+                 jobs: int = None, request_timeout: float = None):
+        self._remove_stale_socket(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+        # Scripts run with the rights of the daemon, so only its user may
+        # connect.
+        os.chmod(socket_path, 0o600)
+        self.request_timeout = request_timeout
+        self._settings = settings
+        self._jobs = jobs
+        # Handlers wait on their own queue for the replies the workers send.
+        self._replies: {int: queue.SimpleQueue} = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._workers = self._new_workers()
+
+    # Starts running a request and returns the queue its replies arrive
+    # on, the last of them with the exit code or an error.
+    def submit(self, message: dict) -> queue.SimpleQueue:
+        replies = queue.SimpleQueue()
+        with self._lock:
+            request = next(self._ids)
+            self._replies[request] = replies
+            workers = self._workers
+        run = partial(_serve_in_worker, request, message,
+                      self.request_timeout)
+        try:
+            future = workers.pool.submit(run)
+        except BrokenProcessPool:
+            workers = self._replace_workers(workers)
+            future = workers.pool.submit(run)
+        future.add_done_callback(partial(self._finished, request, workers))
+        return replies
+
+    def _finished(self, request: int, workers: _Workers, future: Future):
+        error = future.exception()
+        if error is None:
+            return
+        # The worker died, e.g. killed or out of memory, and took the pool
+        # with it.
+        if isinstance(error, BrokenProcessPool):
+            self._replace_workers(workers)
+        with self._lock:
+            replies = self._replies.pop(request, None)
+        if replies is not None:
+            replies.put({'error': f'worker failed: {error}'})
+
+    def _replace_workers(self, broken: _Workers) -> _Workers:
+        with self._lock:
+            if self._workers is broken:
+                self._workers = self._new_workers()
+            workers = self._workers
+        broken.shutdown(wait=False)
+        return workers
+
+    def _new_workers(self) -> _Workers:
+        return _Workers(self._jobs, self._settings, self._route)
+
+    def _route(self, request: int, reply: dict):
+        with self._lock:
+            if 'exit_code' in reply:
+                replies = self._replies.pop(request, None)
+            else:
+                replies = self._replies.get(request)
+        if replies is not None:
+            replies.put(reply)
+
+    def server_close(self):
+        super().server_close()
+        self._workers.shutdown()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _remove_stale_socket(socket_path: str):
+        if not os.path.exists(socket_path):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(socket_path)
+            except OSError:
+                os.unlink(socket_path)
+                return
+        raise OSError(f'a daemon is already listening on {socket_path}')
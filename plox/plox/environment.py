@@ -2,43 +2,84 @@ from plox.errors import LoxRuntimeError
 from plox.token_types import Token
 
 
+# Value held by the cell of a global that has been referenced but not yet
+# defined.
+UNDEFINED = object()
+
+
+class GlobalCell:
+    __slots__ = ('value',)
+
+    def __init__(self, value=UNDEFINED):
+        self.value = value
+
+
+# Globals live in cells that keep their identity for the whole run, so
+# Variable and Assignment nodes bind the cell once and then read and write it
+# directly instead of looking the name up on every access.
 class Environment:
-    def __init__(self, enclosing: 'Environment' = None):
-        self._values = dict()
-        self.enclosing = enclosing
+    def __init__(self):
+        self._cells: {str: GlobalCell} = dict()
 
     def __str__(self):
-        result = str(self._values)
-        if self.enclosing is not None:
-            result += f' -> {self.enclosing}'
-        return result
+        return str({name: cell.value for name, cell in self._cells.items()
+                    if cell.value is not UNDEFINED})
+
+    def cell(self, name: str) -> GlobalCell:
+        cell = self._cells.get(name)
+        if cell is None:
+            cell = self._cells[name] = GlobalCell()
+        return cell
+
+    def cells(self) -> {str: GlobalCell}:
+        return self._cells
 
     def define(self, name: str, value):
-        self._values[name] = value
+        self.cell(name).value = value
 
     def get(self, name: Token):
-        if name.lexeme in self._values.keys():
-            return self._values[name.lexeme]
-        if self.enclosing is not None:
-            return self.enclosing.get(name)
-        raise LoxRuntimeError(name, f'Undefined variable {name.lexeme}.')
+        value = self.cell(name.lexeme).value
+        if value is UNDEFINED:
+            raise undefined_variable(name)
+        return value
+
+    def assign(self, name: Token, value):
+        cell = self.cell(name.lexeme)
+        if cell.value is UNDEFINED:
+            raise undefined_variable(name)
+        cell.value = value
+
 
-    def get_at(self, distance: int, name: str):
-        return self._ancestor(distance)._values[name]
+def undefined_variable(name: Token) -> LoxRuntimeError:
+    return LoxRuntimeError(name, f'Undefined variable {name.lexeme}.')
 
-    def _ancestor(self, distance: int):
+
+# Frame of a block, function call or bound method. Values are appended in
+# declaration order, which is the order the Resolver hands out slots in, so
+# variables are read and written by (depth, slot) without any name lookups.
+class LocalEnvironment:
+    __slots__ = ('values', 'enclosing')
+
+    def __init__(self, enclosing, values: list = None):
+        self.values = [] if values is None else values
+        self.enclosing = enclosing
+
+    def __str__(self):
+        return f'{self.values} -> {self.enclosing}'
+
+    def define(self, value):
+        self.values.append(value)
+
+    def get_at(self, depth: int, slot: int):
         env = self
-        for _ in range(distance):
+        while depth:
             env = env.enclosing
-        return env
+            depth -= 1
+        return env.values[slot]
 
-    def assign(self, name: Token, value):
-        if name.lexeme in self._values.keys():
-            self._values[name.lexeme] = value
-        elif self.enclosing is not None:
-            self.enclosing.assign(name, value)
-        else:
-            raise LoxRuntimeError(name, f'Undefined variable {name.lexeme}.')
-
-    def assign_at(self, distance: int, name: Token, value):
-        self._ancestor(distance)._values[name.lexeme] = value
+    def assign_at(self, depth: int, slot: int, value):
+        env = self
+        while depth:
+            env = env.enclosing
+            depth -= 1
+        env.values[slot] = value
@@ -1,25 +1,42 @@
 import sys
+from dataclasses import dataclass
+from typing import TextIO
 
 from plox.token_types import Token
 
 
+@dataclass(frozen=True)
+class ErrorReport:
+    line: int
+    where: str
+    message: str
+
+
+# Error state of one Lox instance, shared by all the stages running its
+# programs. Reports go to `out` and runtime errors to `err`, sys.stdout and
+# sys.stderr (at the time of the report) when not given.
 class LoxErrors:
-    had_error = False
-    had_runtime_error = False
+    def __init__(self, out: TextIO = None, err: TextIO = None):
+        self.had_error = False
+        self.had_runtime_error = False
+        self.out = out
+        self.err = err
+        # Everything reported, for callers that handle errors themselves.
+        self.reports: [ErrorReport] = []
+        self.runtime_errors: [LoxRuntimeError] = []
 
-    @staticmethod
-    def error(line: int, message: str):
-        LoxErrors.had_error = True
-        LoxErrors.report(line, "", message)
+    def error(self, line: int, message: str):
+        self.had_error = True
+        self.report(line, "", message)
 
-    @staticmethod
-    def runtime_error(re: RuntimeError):
-        LoxErrors.had_runtime_error = True
-        print(f'{re}\n[line {re.token.line}]', file=sys.stderr)
+    def runtime_error(self, re: RuntimeError):
+        self.had_runtime_error = True
+        self.runtime_errors.append(re)
+        print(f'{re}\n[line {re.token.line}]', file=self.err or sys.stderr)
 
-    @staticmethod
-    def report(line: int, where: str, message: str):
-        print(f"[line {line}] Error {where}: {message}")
+    def report(self, line: int, where: str, message: str):
+        self.reports.append(ErrorReport(line, where, message))
+        print(f"[line {line}] Error {where}: {message}", file=self.out)
 
 
 class LoxRuntimeError(Exception):
@@ -32,6 +49,14 @@ class LoxRuntimeError(Exception):
         return f"{self.token.lexeme}: {self.message}"
 
 
+class LoxCompileError(Exception):
+    def __init__(self, reports: [ErrorReport]):
+        super().__init__('\n'.join(
+            f'[line {report.line}] Error {report.where}: {report.message}'
+            for report in reports))
+        self.reports = reports
+
+
 class LoxParseError(Exception):
     def __init__(self):
         super().__init__()
@@ -1,80 +1,108 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any
 
+from plox.inline_cache import MethodCache
 from plox.token_types import Token
 
 
 class Expr:
-    pass
+    __slots__ = ()
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Binary(Expr):
     left: Expr
     operator: Token
     right: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class Call(Expr):
     callee: Expr
     paren: Token
     args: [Expr]
 
 
-@dataclass
+@dataclass(slots=True)
 class Get(Expr):
     object: Expr
     name: Token
+    cache: MethodCache = field(
+        default_factory=MethodCache, repr=False, compare=False)
 
 
-@dataclass
+# object[index]
+@dataclass(slots=True)
+class Index(Expr):
+    object: Expr
+    bracket: Token
+    index: Expr
+
+
+@dataclass(slots=True)
 class Logical(Expr):
     left: Expr
     operator: Token
     right: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class Set(Expr):
     object: Expr
     name: Token
     value: Expr
 
 
-@dataclass(frozen=True)
+@dataclass(slots=True)
+class SetIndex(Expr):
+    object: Expr
+    bracket: Token
+    index: Expr
+    value: Expr
+
+
+@dataclass(eq=False, slots=True)
 class Super(Expr):
     keyword: Token
     method: Token
+    depth: int = None
+    slot: int = None
+    cache: MethodCache = field(default_factory=MethodCache, repr=False)
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, slots=True)
 class This(Expr):
     keyword: Token
+    depth: int = None
+    slot: int = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Unary(Expr):
     operator: Token
     right: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class Grouping(Expr):
     expression: Expr
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Literal(Expr):
     value: Any
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, slots=True)
 class Variable(Expr):
     name: Token
+    depth: int = None
+    slot: int = None
 
 
-@dataclass(frozen=True)
+@dataclass(eq=False, slots=True)
 class Assignment(Expr):
     name: Token
     value: Expr
+    depth: int = None
+    slot: int = None
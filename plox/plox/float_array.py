@@ -0,0 +1,132 @@
+import math
+from array import array
+from itertools import repeat
+from operator import mul
+from typing import Callable
+
+from plox.errors import LoxRuntimeError
+from plox.lox_list import LoxList, whole_number
+from plox.natives import NativeError, NativeMethod, NativeObject, Natives
+from plox.token_types import Token
+
+
+# Numbers stored unboxed, in an array('d') or in a memoryview of doubles
+# shared with the host. Arithmetic on them runs element-wise over the whole
+# array.
+class FloatArray(NativeObject):
+    __slots__ = ('values',)
+
+    type_name = 'FloatArray'
+    methods = Natives(NativeMethod)
+
+    def __init__(self, values: array | memoryview):
+        self.values = values
+
+    # Wraps a buffer of the host without copying it, so both sides see
+    # every change the other makes.
+    @classmethod
+    def share(cls, buffer: array | memoryview) -> 'FloatArray':
+        if isinstance(buffer, array) and buffer.typecode == 'd':
+            return cls(buffer)
+        if isinstance(buffer, memoryview) and buffer.format == 'd' and \
+                buffer.ndim == 1:
+            return cls(buffer)
+        raise TypeError('FloatArray buffers must be one-dimensional arrays '
+                        'of doubles.')
+
+    def get_item(self, index):
+        return self.values[self._index(index)]
+
+    def set_item(self, index, value):
+        if type(value) is not float:
+            raise NativeError('FloatArray elements must be numbers.')
+        index = self._index(index)
+        try:
+            self.values[index] = value
+        except TypeError:
+            raise NativeError('FloatArray is read-only.') from None
+
+    def _index(self, index) -> int:
+        index = whole_number(index, 'FloatArray index')
+        if not -len(self.values) <= index < len(self.values):
+            raise NativeError('FloatArray index out of range.')
+        return index
+
+    def stringify(self, stringify: Callable) -> str:
+        return f'[{", ".join(map(stringify, self.values))}]'
+
+    # Memoryviews can't be pickled, snapshots get a copy.
+    def __reduce__(self):
+        return FloatArray, (array('d', self.values),)
+
+
+# Applies `operator` to the elements of two arrays of the same length, or of
+# an array and a number. `message` is the error when neither operand is an
+# array.
+def element_wise(operator: Callable, left, right,
+                 message: str) -> FloatArray:
+    if type(left) is FloatArray:
+        if type(right) is FloatArray:
+            if len(left.values) != len(right.values):
+                raise NativeError('FloatArray lengths differ.')
+            values = map(operator, left.values, right.values)
+        elif type(right) is float:
+            values = map(operator, left.values, repeat(right))
+        else:
+            raise NativeError(message)
+    elif type(right) is FloatArray and type(left) is float:
+        values = map(operator, repeat(left), right.values)
+    else:
+        raise NativeError(message)
+    try:
+        return FloatArray(array('d', values))
+    except ZeroDivisionError:
+        raise NativeError('Division by zero.') from None
+
+
+# Arithmetic of the engines on operands that aren't both numbers, only valid
+# when one of them is a FloatArray. Errors are reported at `operator`.
+def arithmetic(operator: Token, function: Callable, left, right,
+               message: str = 'Operands must be numbers') -> FloatArray:
+    try:
+        return element_wise(function, left, right, message)
+    except NativeError as e:
+        raise LoxRuntimeError(operator, str(e)) from None
+
+
+@FloatArray.methods.register(name='len')
+def array_len(interpreter, receiver: FloatArray):
+    return len(receiver.values)
+
+
+@FloatArray.methods.register(name='sum')
+def array_sum(interpreter, receiver: FloatArray):
+    return math.fsum(receiver.values)
+
+
+@FloatArray.methods.register(name='min')
+def array_min(interpreter, receiver: FloatArray):
+    if not receiver.values:
+        raise NativeError('FloatArray is empty.')
+    return min(receiver.values)
+
+
+@FloatArray.methods.register(name='max')
+def array_max(interpreter, receiver: FloatArray):
+    if not receiver.values:
+        raise NativeError('FloatArray is empty.')
+    return max(receiver.values)
+
+
+@FloatArray.methods.register(name='dot')
+def array_dot(interpreter, receiver: FloatArray, other):
+    if type(other) is not FloatArray:
+        raise NativeError('Can only take the dot product of FloatArrays.')
+    if len(receiver.values) != len(other.values):
+        raise NativeError('FloatArray lengths differ.')
+    return math.fsum(map(mul, receiver.values, other.values))
+
+
+@FloatArray.methods.register(name='toList')
+def array_to_list(interpreter, receiver: FloatArray):
+    return LoxList(list(receiver.values))
@@ -0,0 +1,15 @@
+# Monomorphic inline cache of a Get or Super site: the method its name
+# resolved to in the class seen there last. Both are kept in one tuple,
+# replaced as a whole, so interpreters running the same program at once can
+# share the cache.
+class MethodCache:
+    __slots__ = ('entry',)
+
+    def __init__(self):
+        self.entry = (None, None)
+
+    def lookup(self, klass, name: str):
+        entry = self.entry
+        if entry[0] is not klass:
+            entry = self.entry = (klass, klass.find_method(name))
+        return entry[1]
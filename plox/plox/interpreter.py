@@ -1,25 +1,86 @@
 from functools import singledispatchmethod
+from operator import add, mul, sub, truediv
+from typing import Callable, Iterable, TextIO
 
-from plox.callable import Clock, LoxCallable, LoxFunction, LoxLambda
-from plox.environment import Environment
+from plox.builtins import BUILTINS
+from plox.callable import LoxCallable, LoxFunction, LoxLambda, TailCall
+from plox.environment import (UNDEFINED, Environment, GlobalCell,
+                              LocalEnvironment, undefined_variable)
 from plox.errors import LoxErrors, LoxRuntimeError
 from plox.expressions import (Assignment, Binary, Call, Expr, Get, Grouping,
-                              Literal, Logical, Set, Super, This, Unary,
-                              Variable)
+                              Index, Literal, Logical, Set, SetIndex, Super,
+                              This, Unary, Variable)
+from plox.float_array import arithmetic
 from plox.lox_class import LoxClass, LoxInstance
-from plox.return_ex import LoxReturn
+from plox.natives import (NativeError, NativeFunction, NativeMethod,
+                          NativeObject)
 from plox.statements import (Block, Class, Expression, Function, If, Lambda,
                              Print, Return, Stmt, Var, While)
 from plox.token_types import Token, TokenType
 
+# Hooks of each event are called with: the statement about to run; the
+# function being called and its arguments; the function returning and its
+# value; a newly created instance; a runtime error ending the program.
+HOOK_EVENTS = ('statement', 'call', 'return', 'instance', 'error')
+
 
 class Interpreter:
-    def __init__(self):
+    # Program output goes to `out`, sys.stdout (at the time of printing) when
+    # not given.
+    def __init__(self, errors: LoxErrors = None, out: TextIO = None):
+        self.errors = LoxErrors() if errors is None else errors
+        self._out = out
         self.globals = Environment()
-        self._locals = {}
         self._env = self.globals
-
-        self.globals.define('clock', Clock())
+        # Cells the global variable nodes run so far bound to. They are kept
+        # here and not on the nodes, so a program can be run by any number
+        # of interpreters without copying it.
+        self._cells: {Variable | Assignment: GlobalCell} = {}
+        # Value of the last executed return statement. Statements signal a
+        # return by evaluating to True, and the call that ran them picks the
+        # value up from here.
+        self.return_value = None
+        self._hooks: {str: [Callable]} = None
+        self.natives: {str: NativeFunction} = {}
+        self.define_natives(BUILTINS)
+
+    def define_natives(self, natives: Iterable[NativeFunction]):
+        for native in natives:
+            self.natives[native.name] = native
+            self.globals.define(native.name, native)
+
+    # Entry point for native code calling back into Lox.
+    def call(self, callee, args: list):
+        if type(callee) is NativeFunction:
+            return callee.call_native(*args)
+        if not isinstance(callee, LoxCallable):
+            raise NativeError('Can only call functions and classes')
+        if len(args) != callee.arity():
+            raise NativeError(f'Expected {callee.arity()} arguments, '
+                              f'but got {len(args)}.')
+        return callee.call(self, args)
+
+    def add_hook(self, event: str, callback: Callable):
+        if event not in HOOK_EVENTS:
+            raise ValueError(f'Unknown hook event {event}.')
+        if self._hooks is None:
+            if type(self) is not Interpreter:
+                raise TypeError(
+                    f'{type(self).__name__} has no hooks, only the tree '
+                    f'engine supports them.')
+            self._hooks = {name: [] for name in HOOK_EVENTS}
+            # Only an interpreter with hooks goes through the instrumented
+            # methods, the plain ones never check for hooks.
+            self.__class__ = InstrumentedInterpreter
+        self._hooks[event].append(callback)
+
+    def remove_hook(self, event: str, callback: Callable):
+        if self._hooks is None:
+            raise ValueError(f'No hook for event {event}.')
+        self._hooks[event].remove(callback)
+        if not any(self._hooks.values()):
+            self._hooks = None
+            self.__class__ = Interpreter
 
     def interpret(self, statements: Stmt):
         try:
@@ -27,10 +88,10 @@ class Interpreter:
                 if statement is not None:
                     self._execute(statement)
         except LoxRuntimeError as e:
-            LoxErrors.runtime_error(e)
+            self._runtime_error(e)
 
-    def resolve(self, expr: Expr, depth: int):
-        self._locals[expr] = depth
+    def _runtime_error(self, error: LoxRuntimeError):
+        self.errors.runtime_error(error)
 
     @singledispatchmethod
     def _execute(self, stmt: Stmt):
@@ -39,9 +100,9 @@ class Interpreter:
     @_execute.register
     def _(self, stmt: If):
         if self._is_truthy(self._evaluate(stmt.condition)):
-            self._execute(stmt.then_branch)
+            return self._execute(stmt.then_branch)
         elif stmt.else_branch is not None:
-            self._execute(stmt.else_branch)
+            return self._execute(stmt.else_branch)
         else:
             return None
 
@@ -52,36 +113,40 @@ class Interpreter:
     @_execute.register
     def _(self, stmt: Function):
         function = LoxFunction(stmt, self._env, False)
-        self._env.define(stmt.name.lexeme, function)
+        self._define(stmt.name, stmt.slot, function)
         return None
 
     @_execute.register
     def _(self, stmt: Print):
         value = self._evaluate(stmt.expr)
-        print(self._stringify(value))
+        print(self._stringify(value), file=self._out)
 
     @_execute.register
     def _(self, stmt: Return):
         value = None
-        if stmt.value is not None:
+        if stmt.tail_call:
+            value = self._evaluate_call(stmt.value, tail=True)
+        elif stmt.value is not None:
             value = self._evaluate(stmt.value)
-        raise LoxReturn(value)
+        self.return_value = value
+        return True
 
     @_execute.register
     def _(self, stmt: Var):
         value = None
         if stmt.init is not None:
             value = self._evaluate(stmt.init)
-        self._env.define(stmt.name.lexeme, value)
+        self._define(stmt.name, stmt.slot, value)
 
     @_execute.register
     def _(self, stmt: While):
         while self._is_truthy(self._evaluate(stmt.condition)):
-            self._execute(stmt.body)
+            if self._execute(stmt.body):
+                return True
 
     @_execute.register
     def _(self, stmt: Block):
-        self.execute_block(stmt.statements, Environment(self._env))
+        return self.execute_block(stmt.statements, LocalEnvironment(self._env))
 
     @_execute.register
     def _(self, stmt: Class):
@@ -91,11 +156,10 @@ class Interpreter:
             if not isinstance(superclass, LoxClass):
                 raise LoxRuntimeError(
                     stmt.superclass.name, 'Superclass must be a class')
-        self._env.define(stmt.name.lexeme, None)
+        self._define(stmt.name, stmt.slot, None)
 
         if superclass is not None:
-            self._env = Environment(self._env)
-            self._env.define('super', superclass)
+            self._env = LocalEnvironment(self._env, [superclass])
 
         methods = dict()
         for method in stmt.methods:
@@ -105,18 +169,34 @@ class Interpreter:
         klass = LoxClass(stmt.name.lexeme, superclass, methods)
         if superclass is not None:
             self._env = self._env.enclosing
-        self._env.assign(stmt.name, klass)
+        if stmt.slot is None:
+            self.globals.assign(stmt.name, klass)
+        else:
+            self._env.values[stmt.slot] = klass
         return None
 
-    def execute_block(self, statements: [Stmt], env: Environment):
+    def _define(self, name: Token, slot: int, value):
+        if slot is None:
+            self.globals.define(name.lexeme, value)
+        else:
+            self._env.define(value)
+
+    def execute_block(self, statements: [Stmt], env: LocalEnvironment) -> bool:
         prev_env = self._env
         self._env = env
         try:
             for statement in statements:
-                self._execute(statement)
+                if self._execute(statement):
+                    return True
+            return False
         finally:
             self._env = prev_env
 
+    # Runs the body of a Lox function or lambda in its new frame.
+    def execute_function(self, function: LoxFunction | LoxLambda,
+                         env: LocalEnvironment) -> bool:
+        return self.execute_block(function._declaration.body, env)
+
     @singledispatchmethod
     def _evaluate(self, expr: Expr):
         raise NotImplementedError
@@ -124,11 +204,13 @@ class Interpreter:
     @_evaluate.register
     def _(self, expr: Assignment):
         value = self._evaluate(expr.value)
-        distance = self._locals.get(expr)
-        if distance is not None:
-            return self._env.assign_at(distance, expr.name, value)
-        else:
-            return self.globals.assign(expr.name, value)
+        if expr.depth is not None:
+            self._env.assign_at(expr.depth, expr.slot, value)
+            return value
+        cell = self._cells.get(expr) or self._bind_global(expr)
+        if cell.value is UNDEFINED:
+            raise undefined_variable(expr.name)
+        cell.value = value
         return value
 
     @_evaluate.register
@@ -157,23 +239,25 @@ class Interpreter:
                 self._check_number_operands(expr.operator, left, right)
                 return left <= right
             case TokenType.MINUS:
-                self._check_number_operands(expr.operator, left, right)
-                return left - right
+                if isinstance(left, float) and isinstance(right, float):
+                    return left - right
+                return arithmetic(expr.operator, sub, left, right)
             case TokenType.PLUS:
                 if isinstance(left, float) and isinstance(right, float):
                     return float(left) + float(right)
                 if isinstance(left, str) and isinstance(right, str):
                     return str(left) + str(right)
-                raise LoxRuntimeError(
-                    expr.operator,
-                    'Operands must be two numbers or two strings.'
-                )
+                return arithmetic(
+                    expr.operator, add, left, right,
+                    'Operands must be two numbers or two strings.')
             case TokenType.SLASH:
-                self._check_number_operands(expr.operator, left, right)
-                return left / right
+                if isinstance(left, float) and isinstance(right, float):
+                    return left / right
+                return arithmetic(expr.operator, truediv, left, right)
             case TokenType.STAR:
-                self._check_number_operands(expr.operator, left, right)
-                return left * right
+                if isinstance(left, float) and isinstance(right, float):
+                    return left * right
+                return arithmetic(expr.operator, mul, left, right)
 
     @_evaluate.register
     def _(self, expr: Lambda):
@@ -181,10 +265,33 @@ class Interpreter:
 
     @_evaluate.register
     def _(self, expr: Call):
+        return self._evaluate_call(expr)
+
+    # With `tail` set, calls of Lox functions are not made but handed back as
+    # a TailCall for the trampoline of the function being returned from.
+    def _evaluate_call(self, expr: Call, tail: bool = False):
+        if isinstance(expr.callee, Get):
+            return self._invoke(expr, expr.callee, tail)
+        if isinstance(expr.callee, Super):
+            return self._super_invoke(expr, expr.callee, tail)
         callee = self._evaluate(expr.callee)
+        if type(callee) is NativeFunction:
+            return self._call_native(expr, callee)
         args = []
         for arg in expr.args:
             args.append(self._evaluate(arg))
+        return self._call(expr, callee, args, tail)
+
+    # Natives get the arguments as they're evaluated, without a list.
+    def _call_native(self, expr: Call, native: NativeFunction):
+        try:
+            return native.call_native(*map(self._evaluate, expr.args))
+        except NativeError as e:
+            raise LoxRuntimeError(expr.paren, str(e)) from None
+        except RecursionError:
+            raise LoxRuntimeError(expr.paren, 'Stack overflow.') from None
+
+    def _call(self, expr: Call, callee, args: list, tail: bool = False):
         if not isinstance(callee, LoxCallable):
             raise LoxRuntimeError(
                 expr.paren, 'Can only call functions and classes')
@@ -193,21 +300,110 @@ class Interpreter:
             raise LoxRuntimeError(
                 expr.paren,
                 f'Expected {function.arity()} arguments, but got {len(args)}.')
-        return function.call(self, args)
+        if tail and isinstance(function, (LoxFunction, LoxLambda)):
+            return TailCall(function, args)
+        try:
+            return function.call(self, args)
+        except RecursionError:
+            raise LoxRuntimeError(expr.paren, 'Stack overflow.') from None
+
+    # obj.name(args): calls the method with the receiver prepended to the
+    # arguments instead of allocating a bound method first.
+    def _invoke(self, expr: Call, get: Get, tail: bool = False):
+        obj = self._evaluate(get.object)
+        if not isinstance(obj, LoxInstance):
+            if isinstance(obj, NativeObject):
+                return self._call_native_method(expr, obj.method(get.name),
+                                                obj)
+            raise LoxRuntimeError(get.name, 'Only instances have properties.')
+        if obj.has_field(get.name):
+            callee = obj.get(get.name)
+            if type(callee) is NativeFunction:
+                return self._call_native(expr, callee)
+            args = []
+            for arg in expr.args:
+                args.append(self._evaluate(arg))
+            return self._call(expr, callee, args, tail)
+        return self._call_method(
+            expr, obj.find_method(get.name, get.cache), obj, tail)
+
+    def _super_invoke(self, expr: Call, super: Super, tail: bool = False):
+        superclass: LoxClass = self._env.get_at(super.depth, super.slot)
+        object: LoxInstance = self._env.get_at(super.depth - 1, 0)
+        method: LoxFunction = super.cache.lookup(
+            superclass, super.method.lexeme)
+        if method is None:
+            raise LoxRuntimeError(
+                super.method, f'Undefined property {super.method.lexeme}.')
+        return self._call_method(expr, method, object, tail)
+
+    # The receiver and the arguments are evaluated straight into the list
+    # the method runs in as its frame.
+    def _call_method(self, expr: Call, method: LoxFunction, receiver,
+                     tail: bool = False):
+        values = [receiver, *map(self._evaluate, expr.args)]
+        if len(expr.args) != method.arity():
+            raise LoxRuntimeError(
+                expr.paren,
+                f'Expected {method.arity()} arguments, '
+                f'but got {len(expr.args)}.')
+        if tail and not method._is_initializer:
+            return TailCall(method, values)
+        try:
+            return method.invoke(self, values)
+        except RecursionError:
+            raise LoxRuntimeError(expr.paren, 'Stack overflow.') from None
+
+    def _call_native_method(self, expr: Call, method: NativeMethod,
+                            receiver: NativeObject):
+        try:
+            return method.call_method(self, receiver,
+                                      *map(self._evaluate, expr.args))
+        except NativeError as e:
+            raise LoxRuntimeError(expr.paren, str(e)) from None
+        except RecursionError:
+            raise LoxRuntimeError(expr.paren, 'Stack overflow.') from None
 
     @_evaluate.register
     def _(self, expr: Get):
         obj = self._evaluate(expr.object)
         if isinstance(obj, LoxInstance):
-            return obj.get(expr.name)
+            return obj.get(expr.name, expr.cache)
+        if isinstance(obj, NativeObject):
+            return obj.method(expr.name).bind(self, obj)
         raise LoxRuntimeError(expr.name, 'Only instances have properties.')
 
+    @_evaluate.register
+    def _(self, expr: Index):
+        obj = self._evaluate(expr.object)
+        index = self._evaluate(expr.index)
+        if not isinstance(obj, NativeObject):
+            raise LoxRuntimeError(expr.bracket,
+                                  'Only collections can be indexed.')
+        try:
+            return obj.get_item(index)
+        except NativeError as e:
+            raise LoxRuntimeError(expr.bracket, str(e)) from None
+
+    @_evaluate.register
+    def _(self, expr: SetIndex):
+        obj = self._evaluate(expr.object)
+        index = self._evaluate(expr.index)
+        value = self._evaluate(expr.value)
+        if not isinstance(obj, NativeObject):
+            raise LoxRuntimeError(expr.bracket,
+                                  'Only collections can be indexed.')
+        try:
+            obj.set_item(index, value)
+        except NativeError as e:
+            raise LoxRuntimeError(expr.bracket, str(e)) from None
+        return value
+
     @_evaluate.register
     def _(self, expr: Super):
-        distance = self._locals.get(expr)
-        superclass: LoxClass = self._env.get_at(distance, 'super')
-        object: LoxInstance = self._env.get_at(distance - 1, 'this')
-        method: LoxFunction = superclass.find_method(expr.method.lexeme)
+        superclass: LoxClass = self._env.get_at(expr.depth, expr.slot)
+        object: LoxInstance = self._env.get_at(expr.depth - 1, 0)
+        method: LoxFunction = expr.cache.lookup(superclass, expr.method.lexeme)
         if method is None:
             raise LoxRuntimeError(
                 expr.method, f'Undefined property {expr.method.lexeme}.')
@@ -238,7 +434,12 @@ class Interpreter:
 
     @_evaluate.register
     def _(self, expr: Variable):
-        return self._lookup_var(expr.name, expr)
+        if expr.depth is not None:
+            return self._env.get_at(expr.depth, expr.slot)
+        value = (self._cells.get(expr) or self._bind_global(expr)).value
+        if value is UNDEFINED:
+            raise undefined_variable(expr.name)
+        return value
 
     @_evaluate.register
     def _(self, expr: Grouping):
@@ -260,12 +461,15 @@ class Interpreter:
         return self._evaluate(expr.right)
 
     def _lookup_var(self, name: Token, expr: Expr):
-        distance = self._locals.get(expr)
-        if distance is not None:
-            return self._env.get_at(distance, name.lexeme)
+        if expr.depth is not None:
+            return self._env.get_at(expr.depth, expr.slot)
         else:
             return self.globals.get(name)
 
+    def _bind_global(self, expr: Variable | Assignment) -> GlobalCell:
+        cell = self._cells[expr] = self.globals.cell(expr.name.lexeme)
+        return cell
+
     def _is_truthy(self, obj) -> bool:
         if obj is None:
             return False
@@ -301,4 +505,60 @@ class Interpreter:
             return text
         if isinstance(object, bool):
             return "true" if object else "false"
+        if isinstance(object, NativeObject):
+            return object.stringify(self._stringify)
         return str(object)
+
+
+# What an Interpreter turns into while it has hooks.
+class InstrumentedInterpreter(Interpreter):
+    def _runtime_error(self, error: LoxRuntimeError):
+        for hook in self._hooks['error']:
+            hook(error)
+        super()._runtime_error(error)
+
+    def _execute(self, stmt: Stmt):
+        for hook in self._hooks['statement']:
+            hook(stmt)
+        return super()._execute(stmt)
+
+    def execute_function(self, function: LoxFunction | LoxLambda,
+                         env: LocalEnvironment) -> bool:
+        # Tail calls are run here instead of by the trampoline, so the
+        # functions they return from are reported with the value the last
+        # callee returns. Like the trampoline this loops, the Python stack
+        # doesn't grow.
+        returning = []
+        while True:
+            if self._hooks['call']:
+                # Methods get the receiver ahead of the arguments.
+                args = env.values[len(env.values) - function.arity():]
+                for hook in self._hooks['call']:
+                    hook(function, args)
+            returned = super().execute_function(function, env)
+            value = self.return_value if returned else None
+            returning.append(function)
+            if type(value) is not TailCall:
+                break
+            function = value.function
+            env = LocalEnvironment(function._closure, value.args)
+        for function in reversed(returning):
+            for hook in self._hooks['return']:
+                hook(function, value)
+        # Hooks calling into Lox overwrite the value the caller picks up.
+        self.return_value = value
+        return returned
+
+    def call(self, callee, args: list):
+        return self._created(callee, super().call(callee, args))
+
+    def _call(self, expr: Call, callee, args: list, tail: bool = False):
+        return self._created(callee, super()._call(expr, callee, args, tail))
+
+    # Lox code and natives calling back into it make instances through
+    # _call and call respectively.
+    def _created(self, callee, result):
+        if isinstance(callee, LoxClass):
+            for hook in self._hooks['instance']:
+                hook(result)
+        return result
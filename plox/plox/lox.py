@@ -1,44 +1,119 @@
 import sys
+from typing import TextIO
 
+from plox.cache import MemoryCache, ProgramCache
+from plox.closure_interpreter import ClosureInterpreter
 from plox.errors import LoxErrors
 from plox.interpreter import Interpreter
+from plox.natives import Natives
+from plox.optimizer import PASSES, Optimizer
 from plox.parser import Parser
+from plox.profiler import Profiler, ProfilingInterpreter
 from plox.scanner import Scanner
 from plox.resolver import Resolver
+from plox.snapshot import load_heap, save_heap
 from plox.statements import Stmt
+from plox.vm import VM
 
+ENGINES = {
+    'tree': Interpreter,
+    'closure': ClosureInterpreter,
+    'vm': VM,
+}
 
-class Lox:
-    _interpreter = Interpreter()
 
-    def __init__(self):
-        pass
+class Lox:
+    def __init__(self, engine: str = 'tree', passes: [str] = PASSES,
+                 cache: ProgramCache | MemoryCache = None,
+                 profiler: Profiler = None,
+                 natives: Natives = None,
+                 out: TextIO = None, err: TextIO = None):
+        # Everything a Lox runs shares this, and nothing else does, so
+        # separate instances can run side by side.
+        self.errors = LoxErrors(out, err)
+        if profiler is not None:
+            # Only the tree-walking interpreter can be profiled.
+            self._interpreter = ProfilingInterpreter(profiler, self.errors,
+                                                     out)
+        else:
+            self._interpreter = ENGINES[engine](self.errors, out)
+        if natives is not None:
+            self._interpreter.define_natives(natives)
+        self._passes = [name for name in PASSES if name in passes]
+        self._optimizer = Optimizer(self._passes)
+        self._cache = cache
 
-    def run_file(self, path: str):
+    def run_file(self, path: str, stream: bool = False):
         with open(path) as src_file:
-            self.run(src_file.read())
-        if LoxErrors.had_error:
+            if stream:
+                self.run_stream(src_file)
+            else:
+                self.run(src_file.read())
+        if self.errors.had_error:
             sys.exit(65)
-        if LoxErrors.had_runtime_error:
+        if self.errors.had_runtime_error:
             sys.exit(70)
 
+    # Saves the globals left by everything run so far, so another Lox of the
+    # same engine can restore them instead of running the same code again.
+    def save_heap(self, path: str):
+        with open(path, 'wb') as heap_file:
+            save_heap(self._interpreter, heap_file)
+
+    def load_heap(self, path: str):
+        with open(path, 'rb') as heap_file:
+            load_heap(self._interpreter, heap_file)
+
     def run_prompt(self):
         while True:
             line = input("> ")
             if not line:
                 break
             self.run(line)
-            LoxErrors.had_error = False
+            self.errors.had_error = False
 
     def run(self, src: str):
-        scanner = Scanner(src)
+        statements = None
+        if self._cache is not None:
+            statements = self._cache.load(src, self._passes)
+        if statements is None:
+            statements = self.compile(src)
+            if statements is None:
+                return
+            # Programs with errors never reach the cache, every run has to
+            # report them.
+            if self._cache is not None and not self.errors.had_error:
+                self._cache.store(src, self._passes, statements)
+        self._interpreter.interpret(statements)
+
+    # Scans, parses, resolves and optimizes the source, or returns None after
+    # reporting errors.
+    def compile(self, src: str) -> [Stmt]:
+        scanner = Scanner(src, self.errors)
         tokens = scanner.scan_tokens()
-        parser = Parser(tokens)
+        parser = Parser(tokens, self.errors)
         statements: [Stmt] = parser.parse()
-        if LoxErrors.had_error:
-            return
-        resolver = Resolver(self._interpreter)
+        if self.errors.had_error:
+            return None
+        return self._prepare(statements)
+
+    # Runs each top-level declaration as soon as it's parsed, without ever
+    # holding the whole source or program. Once there's an error nothing
+    # else runs, but the rest is still parsed to report syntax errors.
+    def run_stream(self, src_file: TextIO):
+        parser = Parser(Scanner(src_file, self.errors).tokens(), self.errors)
+        for statement in parser.declarations():
+            if self.errors.had_error or self.errors.had_runtime_error:
+                continue
+            statements = self._prepare([statement])
+            if statements is not None:
+                self._interpreter.interpret(statements)
+
+    # Resolves before optimizing, so code the passes remove is still checked
+    # and the same programs compile whichever passes are enabled.
+    def _prepare(self, statements: [Stmt]) -> [Stmt]:
+        resolver = Resolver(self.errors)
         resolver.resolve(statements)
-        if LoxErrors.had_error:
-            return
-        self._interpreter.interpret(statements)
+        if self.errors.had_error:
+            return None
+        return self._optimizer.optimize(statements)
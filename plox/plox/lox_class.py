@@ -1,7 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from plox.callable import LoxCallable, LoxFunction
 from plox.errors import LoxRuntimeError
+from plox.inline_cache import MethodCache
 from plox.token_types import Token
 
 
@@ -10,29 +11,34 @@ class LoxClass(LoxCallable):
     name: str
     superclass: 'LoxClass'
     _methods: dict()
+    _method_table: dict = field(init=False, repr=False)
+    _initializer: LoxFunction = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # Methods can't change once the class is declared, so inherited ones
+        # are copied down and every lookup is a single dict hit.
+        self._method_table = {}
+        if self.superclass is not None:
+            self._method_table.update(self.superclass._method_table)
+        self._method_table.update(self._methods)
+        self._initializer = self._method_table.get('init')
 
     def __str__(self):
         return self.name
 
     def call(self, interpreter, args):
         instance = LoxInstance(_klass=self, _fields={})
-        initializer = self.find_method("init")
-        if initializer is not None:
-            initializer.bind(instance).call(interpreter, args)
+        if self._initializer is not None:
+            self._initializer.invoke(interpreter, [instance, *args])
         return instance
 
     def arity(self):
-        initializer = self.find_method("init")
-        if initializer is None:
+        if self._initializer is None:
             return 0
-        return initializer.arity()
+        return self._initializer.arity()
 
     def find_method(self, name: str) -> LoxFunction:
-        if name in self._methods.keys():
-            return self._methods[name]
-        if self.superclass is not None:
-            return self.superclass.find_method(name)
-        return None
+        return self._method_table.get(name)
 
 
 @dataclass
@@ -43,15 +49,23 @@ class LoxInstance:
     def __str__(self):
         return f'{self._klass.name} instance'
 
-    def get(self, name: Token):
+    def get(self, name: Token, cache: MethodCache = None):
         if name.lexeme in self._fields.keys():
             return self._fields[name.lexeme]
+        return self.find_method(name, cache).bind(self)
 
-        method = self._klass.find_method(name.lexeme)
-        if method is not None:
-            return method.bind(self)
+    def has_field(self, name: Token) -> bool:
+        return name.lexeme in self._fields
 
-        raise LoxRuntimeError(name, f'Undefined property {name.lexeme}.')
+    def find_method(self, name: Token, cache: MethodCache = None):
+        if cache is None:
+            method = self._klass.find_method(name.lexeme)
+        else:
+            method = cache.lookup(self._klass, name.lexeme)
+        if method is None:
+            raise LoxRuntimeError(
+                name, f'Undefined property {name.lexeme}.')
+        return method
 
     def set(self, name: Token, value):
         self._fields[name.lexeme] = value
@@ -0,0 +1,83 @@
+from typing import Callable
+
+from plox.natives import NativeError, NativeMethod, NativeObject, Natives
+
+
+class LoxList(NativeObject):
+    __slots__ = ('elements',)
+
+    type_name = 'List'
+    methods = Natives(NativeMethod)
+
+    def __init__(self, elements: list):
+        self.elements = elements
+
+    def get_item(self, index):
+        return self.elements[self._index(index)]
+
+    def set_item(self, index, value):
+        self.elements[self._index(index)] = value
+
+    # Negative indexes count from the end, as in Python.
+    def _index(self, index) -> int:
+        index = whole_number(index, 'List index')
+        if not -len(self.elements) <= index < len(self.elements):
+            raise NativeError('List index out of range.')
+        return index
+
+    def stringify(self, stringify: Callable) -> str:
+        return f'[{", ".join(map(stringify, self.elements))}]'
+
+
+def whole_number(value, what: str) -> int:
+    if type(value) is not float or not value.is_integer():
+        raise NativeError(f'{what} must be a whole number.')
+    return int(value)
+
+
+@LoxList.methods.register(name='append')
+def list_append(interpreter, receiver: LoxList, value):
+    receiver.elements.append(value)
+
+
+@LoxList.methods.register(name='len')
+def list_len(interpreter, receiver: LoxList):
+    return len(receiver.elements)
+
+
+# Copies the elements from start up to end, or the last one, as a new list.
+@LoxList.methods.register(name='slice')
+def list_slice(interpreter, receiver: LoxList, start, end=None):
+    start = whole_number(start, 'Slice start')
+    if end is not None:
+        end = whole_number(end, 'Slice end')
+    return LoxList(receiver.elements[start:end])
+
+
+# Sorts in place, by the values a function returns for the elements when one
+# is given.
+@LoxList.methods.register(name='sort')
+def list_sort(interpreter, receiver: LoxList, key=None):
+    if key is None:
+        receiver.elements.sort()
+    else:
+        receiver.elements.sort(
+            key=lambda element: interpreter.call(key, [element]))
+
+
+@LoxList.methods.register(name='map')
+def list_map(interpreter, receiver: LoxList, function):
+    call = interpreter.call
+    return LoxList([call(function, [element])
+                    for element in receiver.elements])
+
+
+@LoxList.methods.register(name='filter')
+def list_filter(interpreter, receiver: LoxList, function):
+    call = interpreter.call
+    return LoxList([element for element in receiver.elements
+                    if _is_truthy(call(function, [element]))])
+
+
+def _is_truthy(value) -> bool:
+    return not (value is None or value is False)
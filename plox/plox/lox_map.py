@@ -0,0 +1,72 @@
+from typing import Callable
+
+from plox.lox_list import LoxList
+from plox.natives import NativeError, NativeMethod, NativeObject, Natives
+
+KEY_TYPES = (str, float, bool, type(None))
+
+
+# Keys are the Lox values themselves, so the dict finds them by Python
+# equality and hashing, which is what Interpreter._check_equal compares
+# them by.
+class LoxMap(NativeObject):
+    __slots__ = ('entries',)
+
+    type_name = 'Map'
+    methods = Natives(NativeMethod)
+
+    def __init__(self, entries: dict):
+        self.entries = entries
+
+    def get_item(self, key):
+        try:
+            return self.entries[key]
+        except (KeyError, TypeError):
+            if type(key) not in KEY_TYPES:
+                raise NativeError(_KEY_ERROR) from None
+            raise NativeError('Map has no such key.') from None
+
+    def set_item(self, key, value):
+        _check_key(key)
+        self.entries[key] = value
+
+    def stringify(self, stringify: Callable) -> str:
+        return '{' + ', '.join(
+            f'{stringify(key)}: {stringify(value)}'
+            for key, value in self.entries.items()) + '}'
+
+
+_KEY_ERROR = 'Map keys must be strings, numbers, booleans or nil.'
+
+
+def _check_key(key):
+    if type(key) not in KEY_TYPES:
+        raise NativeError(_KEY_ERROR)
+
+
+@LoxMap.methods.register(name='len')
+def map_len(interpreter, receiver: LoxMap):
+    return len(receiver.entries)
+
+
+@LoxMap.methods.register(name='keys')
+def map_keys(interpreter, receiver: LoxMap):
+    return LoxList(list(receiver.entries))
+
+
+@LoxMap.methods.register(name='values')
+def map_values(interpreter, receiver: LoxMap):
+    return LoxList(list(receiver.entries.values()))
+
+
+@LoxMap.methods.register(name='has')
+def map_has(interpreter, receiver: LoxMap, key):
+    _check_key(key)
+    return key in receiver.entries
+
+
+# Returns the value the key had, or nil when there was none.
+@LoxMap.methods.register(name='remove')
+def map_remove(interpreter, receiver: LoxMap, key):
+    _check_key(key)
+    return receiver.entries.pop(key, None)
@@ -0,0 +1,179 @@
+import inspect
+import sys
+from functools import partial
+from typing import Callable, Iterator
+
+from plox.callable import LoxCallable
+from plox.errors import LoxRuntimeError
+from plox.token_types import Token
+
+
+# Raised by natives for the engine to report at the call, which only the
+# engine knows.
+class NativeError(Exception):
+    pass
+
+
+# A Python callable exposed to Lox. How many arguments it takes is worked out
+# once, from its signature, and calls pass the arguments straight through.
+class NativeFunction(LoxCallable):
+    __slots__ = ('name', 'function', '_min_args', '_max_args')
+
+    # Leading parameters the function takes before the Lox arguments.
+    _skip = 0
+
+    def __init__(self, function: Callable, name: str = None,
+                 arity: int = None):
+        self.name = function.__name__ if name is None else name
+        self.function = function
+        if arity is not None:
+            self._min_args = self._max_args = arity
+        else:
+            self._min_args, self._max_args = _arity(function, self.name,
+                                                    self._skip)
+
+    def arity(self) -> int:
+        # Variadic natives don't have a single one.
+        if self._min_args != self._max_args:
+            return None
+        return self._min_args
+
+    def call(self, interpreter, args):
+        return self.call_native(*args)
+
+    # Takes the arguments themselves, so call sites that know how many they
+    # pass don't build a list for them.
+    def call_native(self, *args):
+        if not self._min_args <= len(args) <= self._max_args:
+            raise NativeError(self._arity_message(len(args)))
+        try:
+            result = self.function(*args)
+        except (LoxRuntimeError, NativeError, RecursionError):
+            raise
+        except Exception as e:
+            raise NativeError(
+                f'{self.name}: {str(e) or type(e).__name__}') from e
+        # Lox numbers are floats.
+        if type(result) is int:
+            return float(result)
+        return result
+
+    def _arity_message(self, argc: int) -> str:
+        if self._min_args == self._max_args:
+            return f'Expected {self._min_args} arguments, but got {argc}.'
+        if argc < self._min_args:
+            return (f'Expected at least {self._min_args} arguments, '
+                    f'but got {argc}.')
+        return f'Expected at most {self._max_args} arguments, but got {argc}.'
+
+    def __repr__(self):
+        return '<native fn>'
+
+
+# A method of a native type. The function takes the interpreter, so it can
+# call back into Lox, and the receiver ahead of the Lox arguments.
+class NativeMethod(NativeFunction):
+    __slots__ = ()
+
+    _skip = 2
+
+    def call_method(self, interpreter, receiver, *args):
+        if not self._min_args <= len(args) <= self._max_args:
+            raise NativeError(self._arity_message(len(args)))
+        try:
+            result = self.function(interpreter, receiver, *args)
+        except (LoxRuntimeError, NativeError, RecursionError):
+            raise
+        except Exception as e:
+            raise NativeError(
+                f'{self.name}: {str(e) or type(e).__name__}') from e
+        if type(result) is int:
+            return float(result)
+        return result
+
+    # The method as a value, for `receiver.name` not immediately called.
+    def bind(self, interpreter, receiver) -> NativeFunction:
+        bound = NativeFunction.__new__(NativeFunction)
+        bound.name = self.name
+        bound.function = partial(self.function, interpreter, receiver)
+        bound._min_args = self._min_args
+        bound._max_args = self._max_args
+        return bound
+
+
+def _arity(function: Callable, name: str, skip: int) -> (int, int):
+    try:
+        parameters = inspect.signature(function).parameters.values()
+    except (TypeError, ValueError):
+        raise TypeError(
+            f'Native {name} needs an explicit arity.') from None
+    min_args = max_args = 0
+    for parameter in list(parameters)[skip:]:
+        if parameter.kind == parameter.VAR_POSITIONAL:
+            max_args = sys.maxsize
+        elif parameter.kind == parameter.VAR_KEYWORD:
+            continue
+        elif parameter.default is not parameter.empty:
+            max_args += 1
+        elif parameter.kind == parameter.KEYWORD_ONLY:
+            raise TypeError(
+                f'Native {name} has a keyword-only parameter without a '
+                f'default.')
+        else:
+            min_args += 1
+            max_args += 1
+    return min_args, max_args
+
+
+# Natives to define in interpreters. Functions are registered with the
+# decorator, as is or with a Lox name and arity:
+#
+#     @natives.register
+#     def hypot(x, y): ...
+#
+#     @natives.register(name='max', arity=2)
+#     def lox_max(a, b): ...
+class Natives:
+    def __init__(self, kind: type = NativeFunction):
+        self._kind = kind
+        self._functions: {str: NativeFunction} = {}
+
+    def register(self, function: Callable = None, *, name: str = None,
+                 arity: int = None):
+        def register(function: Callable) -> Callable:
+            native = self._kind(function, name, arity)
+            self._functions[native.name] = native
+            return function
+        if function is None:
+            return register
+        return register(function)
+
+    def get(self, name: str) -> NativeFunction:
+        return self._functions.get(name)
+
+    def __iter__(self) -> Iterator[NativeFunction]:
+        return iter(self._functions.values())
+
+
+# Values of types implemented in Python. Their methods are NativeMethods and
+# the ones that are collections can be indexed.
+class NativeObject:
+    __slots__ = ()
+
+    type_name = 'object'
+    methods = Natives(NativeMethod)
+
+    def method(self, name: Token) -> NativeMethod:
+        method = self.methods.get(name.lexeme)
+        if method is None:
+            raise LoxRuntimeError(name, f'Undefined property {name.lexeme}.')
+        return method
+
+    def get_item(self, index):
+        raise NativeError(f'{self.type_name} can not be indexed.')
+
+    def set_item(self, index, value):
+        raise NativeError(f'{self.type_name} can not be indexed.')
+
+    def stringify(self, stringify: Callable) -> str:
+        return f'<{self.type_name}>'
@@ -0,0 +1,276 @@
+from functools import singledispatchmethod
+
+from plox.expressions import (Assignment, Binary, Call, Expr, Get, Grouping,
+                              Index, Literal, Logical, Set, SetIndex, Super,
+                              This, Unary, Variable)
+from plox.statements import (Block, Class, Expression, Function, If, Lambda,
+                             Print, Return, Stmt, Var, While)
+from plox.token_types import TokenType
+
+
+def _is_truthy(value) -> bool:
+    return not (value is None or value is False)
+
+
+# Walks the whole tree, rewriting children before their parents. A pass only
+# overrides the rewrite_* hooks for the nodes it cares about. A statement
+# rewritten to None is dropped.
+class Pass:
+    def run(self, statements: [Stmt]) -> [Stmt]:
+        return self._statements(statements)
+
+    def rewrite_statements(self, statements: [Stmt]) -> [Stmt]:
+        return statements
+
+    def rewrite_stmt(self, stmt: Stmt) -> Stmt:
+        return stmt
+
+    def rewrite_expr(self, expr: Expr) -> Expr:
+        return expr
+
+    def _statements(self, statements: [Stmt]) -> [Stmt]:
+        result = []
+        for stmt in statements:
+            if stmt is not None:
+                stmt = self._stmt(stmt)
+            if stmt is not None:
+                result.append(stmt)
+        return self.rewrite_statements(result)
+
+    # Statements nested directly in an if or a loop can't just disappear.
+    def _branch(self, stmt: Stmt) -> Stmt:
+        stmt = self._stmt(stmt)
+        if stmt is None:
+            return Block([])
+        return stmt
+
+    @singledispatchmethod
+    def _stmt(self, stmt: Stmt) -> Stmt:
+        raise NotImplementedError
+
+    @_stmt.register
+    def _(self, stmt: Block):
+        stmt.statements = self._statements(stmt.statements)
+        return self.rewrite_stmt(stmt)
+
+    @_stmt.register
+    def _(self, stmt: Class):
+        stmt.methods = [self._stmt(method) for method in stmt.methods]
+        return self.rewrite_stmt(stmt)
+
+    @_stmt.register
+    def _(self, stmt: Expression):
+        stmt.expr = self._expr(stmt.expr)
+        return self.rewrite_stmt(stmt)
+
+    @_stmt.register
+    def _(self, stmt: Function):
+        stmt.body = self._statements(stmt.body)
+        return self.rewrite_stmt(stmt)
+
+    @_stmt.register
+    def _(self, stmt: If):
+        stmt.condition = self._expr(stmt.condition)
+        stmt.then_branch = self._branch(stmt.then_branch)
+        if stmt.else_branch is not None:
+            stmt.else_branch = self._branch(stmt.else_branch)
+        return self.rewrite_stmt(stmt)
+
+    @_stmt.register
+    def _(self, stmt: Print):
+        stmt.expr = self._expr(stmt.expr)
+        return self.rewrite_stmt(stmt)
+
+    @_stmt.register
+    def _(self, stmt: Return):
+        if stmt.value is not None:
+            stmt.value = self._expr(stmt.value)
+        return self.rewrite_stmt(stmt)
+
+    @_stmt.register
+    def _(self, stmt: Var):
+        if stmt.init is not None:
+            stmt.init = self._expr(stmt.init)
+        return self.rewrite_stmt(stmt)
+
+    @_stmt.register
+    def _(self, stmt: While):
+        stmt.condition = self._expr(stmt.condition)
+        stmt.body = self._branch(stmt.body)
+        return self.rewrite_stmt(stmt)
+
+    @singledispatchmethod
+    def _expr(self, expr: Expr) -> Expr:
+        raise NotImplementedError
+
+    @_expr.register
+    def _(self, expr: Assignment):
+        expr.value = self._expr(expr.value)
+        return self.rewrite_expr(expr)
+
+    @_expr.register
+    def _(self, expr: Binary):
+        return self.rewrite_expr(Binary(self._expr(expr.left), expr.operator,
+                                        self._expr(expr.right)))
+
+    @_expr.register
+    def _(self, expr: Call):
+        expr.callee = self._expr(expr.callee)
+        expr.args = [self._expr(arg) for arg in expr.args]
+        return self.rewrite_expr(expr)
+
+    @_expr.register
+    def _(self, expr: Get):
+        expr.object = self._expr(expr.object)
+        return self.rewrite_expr(expr)
+
+    @_expr.register
+    def _(self, expr: Grouping):
+        expr.expression = self._expr(expr.expression)
+        return self.rewrite_expr(expr)
+
+    @_expr.register
+    def _(self, expr: Index):
+        expr.object = self._expr(expr.object)
+        expr.index = self._expr(expr.index)
+        return self.rewrite_expr(expr)
+
+    @_expr.register
+    def _(self, expr: Lambda):
+        expr.body = self._statements(expr.body)
+        return self.rewrite_expr(expr)
+
+    @_expr.register
+    def _(self, expr: Logical):
+        expr.left = self._expr(expr.left)
+        expr.right = self._expr(expr.right)
+        return self.rewrite_expr(expr)
+
+    @_expr.register
+    def _(self, expr: Set):
+        expr.object = self._expr(expr.object)
+        expr.value = self._expr(expr.value)
+        return self.rewrite_expr(expr)
+
+    @_expr.register
+    def _(self, expr: SetIndex):
+        expr.object = self._expr(expr.object)
+        expr.index = self._expr(expr.index)
+        expr.value = self._expr(expr.value)
+        return self.rewrite_expr(expr)
+
+    @_expr.register
+    def _(self, expr: Unary):
+        expr.right = self._expr(expr.right)
+        return self.rewrite_expr(expr)
+
+    @_expr.register(Literal)
+    @_expr.register(Super)
+    @_expr.register(This)
+    @_expr.register(Variable)
+    def _(self, expr):
+        return self.rewrite_expr(expr)
+
+
+class UnwrapGroupings(Pass):
+    def rewrite_expr(self, expr: Expr) -> Expr:
+        if isinstance(expr, Grouping):
+            return expr.expression
+        return expr
+
+
+# Only folds operations that succeed at runtime, so type errors and division
+# by zero are still reported when (and if) the code runs.
+class FoldConstants(Pass):
+    def rewrite_expr(self, expr: Expr) -> Expr:
+        match expr:
+            case Grouping(Literal() as literal):
+                return literal
+            case Unary(operator, Literal(value)):
+                if operator.type == TokenType.BANG:
+                    return Literal(not _is_truthy(value))
+                if isinstance(value, float):
+                    return Literal(-value)
+            case Binary(Literal(left), operator, Literal(right)):
+                return self._fold_binary(expr, operator.type, left, right)
+            case Logical(Literal(value), operator, right):
+                if _is_truthy(value) == (operator.type == TokenType.OR):
+                    return expr.left
+                return right
+        return expr
+
+    def _fold_binary(self, expr: Binary, type: TokenType, left, right):
+        match type:
+            case TokenType.EQUAL_EQUAL:
+                return Literal(self._equal(left, right))
+            case TokenType.BANG_EQUAL:
+                return Literal(not self._equal(left, right))
+        if isinstance(left, str) and isinstance(right, str):
+            if type == TokenType.PLUS:
+                return Literal(left + right)
+            return expr
+        if not (isinstance(left, float) and isinstance(right, float)):
+            return expr
+        match type:
+            case TokenType.PLUS:
+                return Literal(left + right)
+            case TokenType.MINUS:
+                return Literal(left - right)
+            case TokenType.STAR:
+                return Literal(left * right)
+            case TokenType.SLASH if right != 0:
+                return Literal(left / right)
+            case TokenType.GREATER:
+                return Literal(left > right)
+            case TokenType.GREATER_EQUAL:
+                return Literal(left >= right)
+            case TokenType.LESS:
+                return Literal(left < right)
+            case TokenType.LESS_EQUAL:
+                return Literal(left <= right)
+        return expr
+
+    # Same as Interpreter._check_equal.
+    def _equal(self, left, right) -> bool:
+        if left is None:
+            return right is None
+        return left == right
+
+
+class EliminateDeadBranches(Pass):
+    def rewrite_stmt(self, stmt: Stmt) -> Stmt:
+        match stmt:
+            case If(Literal(value), then_branch, else_branch):
+                if _is_truthy(value):
+                    return then_branch
+                return else_branch
+            case While(Literal(value)) if not _is_truthy(value):
+                return None
+        return stmt
+
+
+class RemoveUnreachable(Pass):
+    def rewrite_statements(self, statements: [Stmt]) -> [Stmt]:
+        for i, stmt in enumerate(statements):
+            if isinstance(stmt, Return):
+                return statements[:i + 1]
+        return statements
+
+
+# In the order the optimizer runs them.
+PASSES = {
+    'groupings': UnwrapGroupings,
+    'fold': FoldConstants,
+    'dead-branches': EliminateDeadBranches,
+    'unreachable': RemoveUnreachable,
+}
+
+
+class Optimizer:
+    def __init__(self, passes: [str] = PASSES):
+        self._passes = [PASSES[name]() for name in PASSES if name in passes]
+
+    def optimize(self, statements: [Stmt]) -> [Stmt]:
+        for optimization in self._passes:
+            statements = optimization.run(statements)
+        return statements
@@ -1,22 +1,44 @@
+from typing import Iterable, Iterator
+
 from plox.errors import LoxErrors, LoxParseError
 from plox.expressions import (Assignment, Binary, Call, Expr, Get, Grouping,
-                              Literal, Logical, Set, Super, This, Unary,
-                              Variable)
+                              Index, Literal, Logical, Set, SetIndex, Super,
+                              This, Unary, Variable)
 from plox.statements import (Block, Class, Expression, Function, If, Lambda,
                              Print, Return, Stmt, Var, While)
 from plox.token_types import Token, TokenType
 
 
+TRUE = Literal(True)
+FALSE = Literal(False)
+NIL = Literal(None)
+
+# Literals are immutable, so equal ones in a program share a node. The cache
+# is dropped once it grows past this, which keeps streaming parses bounded.
+LITERAL_CACHE_SIZE = 4096
+
+
 class Parser:
-    def __init__(self, tokens):
-        self._tokens = tokens
+    def __init__(self, tokens: Iterable[Token], errors: LoxErrors = None):
+        self._errors = LoxErrors() if errors is None else errors
+        # Tokens are pulled from the stream as the parser looks at them.
+        self._stream = iter(tokens)
+        self._tokens = []
         self._current = 0
+        self._literals = {}
 
     def parse(self) -> [Stmt]:
-        statements: [Stmt] = []
+        return list(self.declarations())
+
+    def declarations(self) -> Iterator[Stmt]:
         while not self._is_at_end():
-            statements.append(self._declaration())
-        return statements
+            yield self._declaration()
+            # Only the previous token is ever looked at again, so the buffer
+            # never holds more than one declaration.
+            del self._tokens[:self._current - 1]
+            self._current = 1
+            if len(self._literals) > LITERAL_CACHE_SIZE:
+                self._literals.clear()
 
     def _declaration(self) -> Stmt:
         try:
@@ -142,7 +164,7 @@ class Parser:
         if increment is not None:
             body = Block([body, Expression(increment)])
         if condition is None:
-            condition = Literal(True)
+            condition = TRUE
         body = While(condition, body)
         if initializer is not None:
             body = Block([initializer, body])
@@ -201,6 +223,8 @@ class Parser:
             elif isinstance(expr, Get):
                 get: Get = expr
                 return Set(get.object, get.name, value)
+            elif isinstance(expr, Index):
+                return SetIndex(expr.object, expr.bracket, expr.index, value)
             self._error(equals, "Invalid assignment target")
         return expr
 
@@ -277,6 +301,11 @@ class Parser:
             elif self._match(TokenType.DOT):
                 name = self._consume(TokenType.IDENTIFIER, '')
                 expr = Get(expr, name)
+            elif self._match(TokenType.LEFT_BRACKET):
+                index = self._expression()
+                bracket = self._consume(TokenType.RIGHT_BRACKET,
+                                        'Expected "]" after index')
+                expr = Index(expr, bracket, index)
             else:
                 break
 
@@ -300,15 +329,19 @@ class Parser:
         if self._match(TokenType.FUN):
             return self._lambda_declaration()
         if self._match(TokenType.FALSE):
-            return Literal(False)
+            return FALSE
         if self._match(TokenType.TRUE):
-            return Literal(True)
+            return TRUE
         if self._match(TokenType.NIL):
-            return Literal(None)
+            return NIL
 
         if self._match(TokenType.NUMBER,
                        TokenType.STRING):
-            return Literal(self._previous().literal)
+            value = self._previous().literal
+            literal = self._literals.get(value)
+            if literal is None:
+                literal = self._literals[value] = Literal(value)
+            return literal
 
         if self._match(TokenType.LEFT_PAREN):
             expr = self._expression()
@@ -354,16 +387,20 @@ class Parser:
         return self._peek().type == TokenType.EOF
 
     def _peek(self) -> Token:
+        if self._current == len(self._tokens):
+            self._tokens.append(next(self._stream))
         return self._tokens[self._current]
 
     def _previous(self) -> Token:
         return self._tokens[self._current - 1]
 
     def _error(self, token: Token, message: str):
+        self._errors.had_error = True
         if token.type == TokenType.EOF:
-            LoxErrors.report(token.line, "at end", message)
+            self._errors.report(token.line, "at end", message)
         else:
-            LoxErrors.report(token.line, "at '" + token.lexeme + "'", message)
+            self._errors.report(
+                token.line, "at '" + token.lexeme + "'", message)
         return LoxParseError()
 
     def _synchronize(self):
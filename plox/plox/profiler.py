@@ -0,0 +1,193 @@
+import time
+from dataclasses import dataclass, fields
+from typing import TextIO
+
+from plox.callable import LoxFunction, LoxLambda
+from plox.environment import LocalEnvironment
+from plox.errors import LoxErrors
+from plox.expressions import Expr
+from plox.interpreter import Interpreter
+from plox.statements import Block, Class, Stmt
+from plox.token_types import Token
+
+SCRIPT = '<script>'
+
+
+@dataclass
+class FunctionStats:
+    calls: int = 0
+    # Seconds from call to return, counted once for recursive calls.
+    inclusive: float = 0.0
+    # Seconds spent in the function itself, not in the functions it called.
+    exclusive: float = 0.0
+
+
+@dataclass
+class LineStats:
+    count: int = 0
+    # Seconds spent in statements of the line, not in nested statements.
+    time: float = 0.0
+
+
+# Deterministic profiler: the interpreter reports every statement and every
+# call it starts and finishes, and the time between two such events is
+# charged to the innermost line and function, and to the whole call stack.
+class Profiler:
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self.functions: {str: FunctionStats} = {}
+        self.lines: {int: LineStats} = {}
+        # Exclusive time of each call stack, keyed by its collapsed form.
+        self.stacks: {str: float} = {}
+        self._calls = []
+        self._line_stack = []
+        self._active: {str: int} = {}
+        self._last = clock()
+
+    def enter_function(self, name: str):
+        now = self._tick()
+        stats = self.functions.get(name)
+        if stats is None:
+            stats = self.functions[name] = FunctionStats()
+        stats.calls += 1
+        self._active[name] = self._active.get(name, 0) + 1
+        stack = f'{self._calls[-1][1]};{name}' if self._calls else name
+        self._calls.append((stats, stack, name, now))
+
+    def exit_function(self):
+        now = self._tick()
+        stats, _, name, start = self._calls.pop()
+        self._active[name] -= 1
+        if not self._active[name]:
+            stats.inclusive += now - start
+
+    def enter_line(self, line: int):
+        self._tick()
+        stats = self.lines.get(line)
+        if stats is None:
+            stats = self.lines[line] = LineStats()
+        stats.count += 1
+        self._line_stack.append(stats)
+
+    def exit_line(self):
+        self._tick()
+        self._line_stack.pop()
+
+    def _tick(self) -> float:
+        now = self._clock()
+        elapsed = now - self._last
+        self._last = now
+        if self._line_stack:
+            self._line_stack[-1].time += elapsed
+        if self._calls:
+            stats, stack, _, _ = self._calls[-1]
+            stats.exclusive += elapsed
+            self.stacks[stack] = self.stacks.get(stack, 0.0) + elapsed
+        return now
+
+    def report(self, out: TextIO):
+        print(f'{"calls":>10} {"inclusive ms":>12} {"exclusive ms":>12}  '
+              f'function', file=out)
+        functions = sorted(self.functions.items(),
+                           key=lambda item: item[1].exclusive, reverse=True)
+        for name, stats in functions:
+            print(f'{stats.calls:>10} {stats.inclusive * 1000:>12.3f} '
+                  f'{stats.exclusive * 1000:>12.3f}  {name}', file=out)
+        print(file=out)
+        print(f'{"count":>10} {"ms":>12}  line', file=out)
+        lines = sorted(self.lines.items(),
+                       key=lambda item: item[1].time, reverse=True)
+        for line, stats in lines:
+            print(f'{stats.count:>10} {stats.time * 1000:>12.3f}  {line}',
+                  file=out)
+
+    # One "frame;frame;frame microseconds" line per call stack, the collapsed
+    # format flame graph tools read.
+    def write_stacks(self, out: TextIO):
+        for stack, seconds in sorted(self.stacks.items()):
+            microseconds = round(seconds * 1_000_000)
+            if microseconds:
+                print(f'{stack} {microseconds}', file=out)
+
+
+# First line a token of the node is on, or None for nodes without tokens,
+# like a literal.
+def _line(node) -> int:
+    if isinstance(node, Token):
+        return node.line
+    if isinstance(node, list):
+        children = node
+    elif isinstance(node, (Expr, Stmt)):
+        children = [getattr(node, field.name) for field in fields(node)]
+    else:
+        return None
+    for child in children:
+        line = _line(child)
+        if line is not None:
+            return line
+    return None
+
+
+# Tree-walking interpreter reporting to a Profiler. Statements without tokens
+# and blocks are not lines of their own, their time goes to the enclosing
+# statement.
+class ProfilingInterpreter(Interpreter):
+    def __init__(self, profiler: Profiler, errors: LoxErrors = None,
+                 out: TextIO = None):
+        super().__init__(errors, out)
+        self._profiler = profiler
+        # Keyed by node id. The nodes are kept alongside so their ids aren't
+        # reused while the program runs.
+        self._lines: {int: (Stmt, int)} = {}
+        self._names: {int: (Stmt | Expr, str)} = {}
+
+    def interpret(self, statements: [Stmt]):
+        self._profiler.enter_function(SCRIPT)
+        try:
+            super().interpret(statements)
+        finally:
+            self._profiler.exit_function()
+
+    def _execute(self, stmt: Stmt):
+        entry = self._lines.get(id(stmt))
+        if entry is None:
+            entry = self._lines[id(stmt)] = (stmt, self._statement_line(stmt))
+        line = entry[1]
+        if line is None:
+            return super()._execute(stmt)
+        self._profiler.enter_line(line)
+        try:
+            return super()._execute(stmt)
+        finally:
+            self._profiler.exit_line()
+
+    def _statement_line(self, stmt: Stmt) -> int:
+        if isinstance(stmt, Block):
+            return None
+        if isinstance(stmt, Class):
+            for method in stmt.methods:
+                name = f'{stmt.name.lexeme}.{method.name.lexeme}'
+                self._names[id(method)] = (method, self._name(name, method))
+        return _line(stmt)
+
+    def execute_function(self, function: LoxFunction | LoxLambda,
+                         env: LocalEnvironment) -> bool:
+        declaration = function._declaration
+        entry = self._names.get(id(declaration))
+        if entry is None:
+            if isinstance(function, LoxLambda):
+                name = self._name('<lambda>', declaration)
+            else:
+                name = self._name(declaration.name.lexeme, declaration)
+            entry = self._names[id(declaration)] = (declaration, name)
+        self._profiler.enter_function(entry[1])
+        try:
+            return super().execute_function(function, env)
+        finally:
+            self._profiler.exit_function()
+
+    def _name(self, name: str, declaration: Stmt | Expr) -> str:
+        line = _line(declaration)
+        if line is None:
+            return name
+        return f'{name}:{line}'
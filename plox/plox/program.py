@@ -0,0 +1,65 @@
+import io
+from array import array
+from dataclasses import dataclass
+
+from plox.environment import UNDEFINED
+from plox.errors import LoxCompileError, LoxErrors, LoxRuntimeError
+from plox.float_array import FloatArray
+from plox.lox import ENGINES, Lox
+from plox.natives import Natives
+from plox.optimizer import PASSES
+
+
+@dataclass
+class Result:
+    # Every global defined when the program ended, supplied ones included.
+    globals: dict
+    # What the program printed.
+    output: str
+    # What stopped the program, if it didn't run to the end.
+    error: LoxRuntimeError = None
+
+
+# A source compiled once, for running any number of times without going
+# through the front end again. Interpreters keep what they bind to while
+# running off the nodes, so every run, concurrent ones included, shares the
+# same statements.
+class Program:
+    __slots__ = ('_statements',)
+
+    def __init__(self, source: str, passes: [str] = PASSES):
+        lox = Lox(passes=passes, out=io.StringIO(), err=io.StringIO())
+        statements = lox.compile(source)
+        if statements is None or lox.errors.reports:
+            raise LoxCompileError(lox.errors.reports)
+        self._statements = statements
+
+    def run(self, globals: dict = None, engine: str = 'tree',
+            natives: Natives = None) -> Result:
+        out = io.StringIO()
+        interpreter = ENGINES[engine](LoxErrors(out, io.StringIO()), out)
+        if natives is not None:
+            interpreter.define_natives(natives)
+        builtins = set(interpreter.globals.cells())
+        if globals is not None:
+            for name, value in globals.items():
+                interpreter.globals.define(name, _lox_value(value))
+                builtins.discard(name)
+        interpreter.interpret(self._statements)
+        defined = {name: cell.value
+                   for name, cell in interpreter.globals.cells().items()
+                   if cell.value is not UNDEFINED and name not in builtins}
+        runtime_errors = interpreter.errors.runtime_errors
+        error = runtime_errors[-1] if runtime_errors else None
+        return Result(defined, out.getvalue(), error)
+
+
+# Lox numbers are floats. Arrays and memoryviews of doubles are shared with
+# the program as FloatArrays, it sees the host's buffer and the host sees
+# what it writes there.
+def _lox_value(value):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (array, memoryview)):
+        return FloatArray.share(value)
+    return value
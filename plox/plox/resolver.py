@@ -1,11 +1,11 @@
+from dataclasses import dataclass
 from enum import Enum, auto
 from functools import singledispatchmethod
 
 from plox.errors import LoxErrors
 from plox.expressions import (Assignment, Binary, Call, Expr, Get, Grouping,
-                              Literal, Logical, Set, Super, This, Unary,
-                              Variable)
-from plox.interpreter import Interpreter
+                              Index, Literal, Logical, Set, SetIndex, Super,
+                              This, Unary, Variable)
 from plox.statements import (Block, Class, Expression, Function, If, Lambda,
                              Print, Return, Stmt, Var, While)
 from plox.token_types import Token
@@ -24,9 +24,15 @@ class ClassType(Enum):
     SUBCLASS = auto()
 
 
+@dataclass
+class Binding:
+    slot: int
+    defined: bool = False
+
+
 class Resolver:
-    def __init__(self, interpreter: Interpreter):
-        self._interpreter = interpreter
+    def __init__(self, errors: LoxErrors = None):
+        self._errors = LoxErrors() if errors is None else errors
         self._scopes: list(dict) = []
         self._current_function = FunctionType.NONE
         self._current_class = ClassType.NONE
@@ -50,25 +56,22 @@ class Resolver:
     def _(self, stmt: Class):
         enclosing_class: ClassType = self._current_class
         self._current_class = ClassType.CLASS
-        self._declare(stmt.name)
+        stmt.slot = self._declare(stmt.name)
         self._define(stmt.name)
         if stmt.superclass is not None:
             if stmt.name.lexeme == stmt.superclass.name.lexeme:
-                LoxErrors.error(stmt.superclass.name.line,
-                                'A class cannot inherit from itself')
+                self._errors.error(stmt.superclass.name.line,
+                                   'A class cannot inherit from itself')
             self._current_class = ClassType.SUBCLASS
             self._resolve_expr(stmt.superclass)
 
             self._begin_scope()
-            self._scopes[-1]['super'] = True
-        self._begin_scope()
-        self._scopes[-1]['this'] = True
+            self._scopes[-1]['super'] = Binding(0, True)
         for method in stmt.methods:
             declaration: FunctionType = FunctionType.METHOD
             if method.name.lexeme == 'init':
                 declaration = FunctionType.INITIALIZER
             self._resolve_function(method, declaration)
-        self._end_scope()
         if stmt.superclass is not None:
             self._end_scope()
         self._current_class = enclosing_class
@@ -76,7 +79,7 @@ class Resolver:
 
     @ _resolve_stmt.register
     def _(self, stmt: Var):
-        self._declare(stmt.name)
+        stmt.slot = self._declare(stmt.name)
         if stmt.init is not None:
             self._resolve_expr(stmt.init)
         self._define(stmt.name)
@@ -84,7 +87,7 @@ class Resolver:
 
     @ _resolve_stmt.register
     def _(self, stmt: Function):
-        self._declare(stmt.name)
+        stmt.slot = self._declare(stmt.name)
         self._define(stmt.name)
         self._resolve_function(stmt, FunctionType.FUNCTION)
         return None
@@ -93,6 +96,9 @@ class Resolver:
         enclosing_function = self._current_function
         self._current_function = type
         self._begin_scope()
+        if type in (FunctionType.METHOD, FunctionType.INITIALIZER):
+            # Methods are called with the receiver in slot 0 of their frame.
+            self._scopes[-1]['this'] = Binding(0, True)
         for param in fn.params:
             self._declare(param)
             self._define(param)
@@ -121,13 +127,22 @@ class Resolver:
     @ _resolve_stmt.register
     def _(self, stmt: Return):
         if self._current_function == FunctionType.NONE:
-            LoxErrors.error(stmt.keyword.line,
-                            'Can\'t return from top-level context')
+            self._errors.error(stmt.keyword.line,
+                               'Can\'t return from top-level context')
         if stmt.value is not None:
             if self._current_function == FunctionType.INITIALIZER:
-                LoxErrors.error(stmt.keyword,
-                                'Can\'t return a value from an initializer')
+                self._errors.error(
+                    stmt.keyword.line,
+                    'Can\'t return a value from an initializer')
             self._resolve_expr(stmt.value)
+            # Parentheses don't change what is returned, return (f()); is a
+            # tail call too.
+            value = stmt.value
+            while isinstance(value, Grouping):
+                value = value.expression
+            if isinstance(value, Call):
+                stmt.value = value
+                stmt.tail_call = True
         return None
 
     @ _resolve_stmt.register
@@ -158,22 +173,30 @@ class Resolver:
         self._resolve_expr(expr.object)
         return None
 
+    @_resolve_expr.register
+    def _(self, expr: SetIndex):
+        self._resolve_expr(expr.object)
+        self._resolve_expr(expr.index)
+        self._resolve_expr(expr.value)
+        return None
+
     @_resolve_expr.register
     def _(self, expr: Super):
         if self._current_class == ClassType.NONE:
-            LoxErrors.error(expr.keyword.line,
-                            'Can\'t use "super" outside of a class.')
+            self._errors.error(expr.keyword.line,
+                               'Can\'t use "super" outside of a class.')
         elif self._current_class == ClassType.CLASS:
-            LoxErrors.error(expr.keyword.line,
-                            'Can\'t use "super" in a class with no superclass.')
+            self._errors.error(
+                expr.keyword.line,
+                'Can\'t use "super" in a class with no superclass.')
         self._resolve_local(expr, expr.keyword)
         return None
 
     @_resolve_expr.register
     def _(self, expr: This):
-        if not self._current_class == ClassType.CLASS:
-            LoxErrors.error(expr.keyword,
-                            'Can\'t use "this" outside of a class')
+        if self._current_class == ClassType.NONE:
+            self._errors.error(expr.keyword.line,
+                               'Can\'t use "this" outside of a class')
             return None
         self._resolve_local(expr, expr.keyword)
         return None
@@ -200,6 +223,12 @@ class Resolver:
         self._resolve_expr(expr.object)
         return None
 
+    @_resolve_expr.register
+    def _(self, expr: Index):
+        self._resolve_expr(expr.object)
+        self._resolve_expr(expr.index)
+        return None
+
     @ _resolve_expr.register
     def _(self, expr: Grouping):
         self._resolve_expr(expr.expression)
@@ -211,8 +240,8 @@ class Resolver:
 
     @ _resolve_expr.register
     def _(self, expr: Variable):
-        if self._scopes and expr.name.lexeme in self._scopes[-1] and not self._scopes[-1][expr.name.lexeme]:
-            LoxErrors.error(
+        if self._scopes and expr.name.lexeme in self._scopes[-1] and not self._scopes[-1][expr.name.lexeme].defined:
+            self._errors.error(
                 expr.name.line,
                 'Can\'t read local variable in its own initializer'
             )
@@ -225,25 +254,27 @@ class Resolver:
         self._resolve_local(expr, expr.name)
         return None
 
-    def _declare(self, name: Token):
+    def _declare(self, name: Token) -> int:
         if not self._scopes:
-            return
+            return None
         scope = self._scopes[-1]
         if name.lexeme in scope:
-            LoxErrors.error(
+            self._errors.error(
                 name.line, 'Already a variable with this name in this scope.')
-        scope[name.lexeme] = False
+        scope[name.lexeme] = Binding(len(scope))
+        return scope[name.lexeme].slot
 
     def _define(self, name: Token):
         if not self._scopes:
             return
         scope = self._scopes[-1]
-        scope[name.lexeme] = True
+        scope[name.lexeme].defined = True
 
     def _resolve_local(self, expr: Expr, name: Token):
         for i in range(len(self._scopes)-1, -1, -1):
             if name.lexeme in self._scopes[i]:
-                self._interpreter.resolve(expr, len(self._scopes) - i - 1)
+                expr.depth = len(self._scopes) - i - 1
+                expr.slot = self._scopes[i][name.lexeme].slot
                 return
 
     def _begin_scope(self):
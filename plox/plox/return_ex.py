@@ -1,4 +0,0 @@
-class LoxReturn(RuntimeError):
-    def __init__(self, value):
-        super().__init__()
-        self.value = value
@@ -1,174 +1,127 @@
-import string
+import re
+import sys
+from typing import Iterator, TextIO
 
 from plox.errors import LoxErrors
 from plox.token_types import KEYWORD_TOKEN_TYPES, Token, TokenType
 
+OPERATOR_TOKEN_TYPES = {
+    '(': TokenType.LEFT_PAREN,
+    ')': TokenType.RIGHT_PAREN,
+    '{': TokenType.LEFT_BRACE,
+    '}': TokenType.RIGHT_BRACE,
+    '[': TokenType.LEFT_BRACKET,
+    ']': TokenType.RIGHT_BRACKET,
+    ',': TokenType.COMMA,
+    '.': TokenType.DOT,
+    '-': TokenType.MINUS,
+    '+': TokenType.PLUS,
+    ';': TokenType.SEMICOLON,
+    '/': TokenType.SLASH,
+    '*': TokenType.STAR,
+    '!': TokenType.BANG,
+    '!=': TokenType.BANG_EQUAL,
+    '=': TokenType.EQUAL,
+    '==': TokenType.EQUAL_EQUAL,
+    '>': TokenType.GREATER,
+    '>=': TokenType.GREATER_EQUAL,
+    '<': TokenType.LESS,
+    '<=': TokenType.LESS_EQUAL,
+}
+
+# One alternative per kind of lexeme, tried in order, so a single match
+# consumes a whole token, comment or run of whitespace. The last alternative
+# takes any single character nothing else does.
+LEXEME = re.compile(r'''
+    (?P<space>[ \t\r\n]+)
+  | (?P<comment>//[^\n]*)
+  | (?P<block_comment>/\*(?s:.*?)\*/)
+  | (?P<unterminated_comment>/\*)
+  | (?P<number>[0-9]+(?:\.[0-9]+)?)
+  | (?P<identifier>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<string>"[^"]*")
+  | (?P<unterminated_string>")
+  | (?P<operator>[!=<>]=?|[(){}\[\],.\-+;*/])
+  | (?P<unexpected>.)
+''', re.VERBOSE)
+
+
+# Streamed sources are read about this many characters at a time, always up to
+# the end of a line, so only strings and block comments can span two chunks.
+CHUNK_SIZE = 1 << 16
+
+UNTERMINATED = ('unterminated_string', 'unterminated_comment')
+
 
 class Scanner:
-    def __init__(self, source):
-        self._tokens = []
-        self._start = 0
-        self._current = 0
-        self._line = 1
+    def __init__(self, source: str | TextIO, errors: LoxErrors = None):
         self._source = source
+        self._errors = LoxErrors() if errors is None else errors
 
     def scan_tokens(self) -> [Token]:
-        while not self._is_at_end():
-            self._start = self._current
-            self.scan_single_token()
-
-        self._add_token(TokenType.EOF)
-        return self._tokens
-
-    def scan_single_token(self):
-        c = self._advance()
-        match c:
-            case '(':
-                self._add_token(TokenType.LEFT_PAREN)
-            case ')':
-                self._add_token(TokenType.RIGHT_PAREN)
-            case '{':
-                self._add_token(TokenType.LEFT_BRACE)
-            case '}':
-                self._add_token(TokenType.RIGHT_BRACE)
-            case ',':
-                self._add_token(TokenType.COMMA)
-            case '.':
-                self._add_token(TokenType.DOT)
-            case '-':
-                self._add_token(TokenType.MINUS)
-            case '+':
-                self._add_token(TokenType.PLUS)
-            case ';':
-                self._add_token(TokenType.SEMICOLON)
-            case '*':
-                self._add_token(TokenType.STAR)
-            case '!':
-                if self._match("="):
-                    self._add_token(TokenType.BANG_EQUAL)
-                else:
-                    self._add_token(TokenType.BANG)
-            case '=':
-                if self._match("="):
-                    self._add_token(TokenType.EQUAL_EQUAL)
-                else:
-                    self._add_token(TokenType.EQUAL)
-            case '>':
-                if self._match("="):
-                    self._add_token(TokenType.GREATER_EQUAL)
-                else:
-                    self._add_token(TokenType.GREATER)
-            case '<':
-                if self._match("="):
-                    self._add_token(TokenType.LESS_EQUAL)
-                else:
-                    self._add_token(TokenType.LESS)
-            case '/':
-                if self._match("/"):
-                    while self._peek() not in ['\n', None]:
-                        self._advance()
-                elif self._match("*"):
-                    while self._peek_digraph() != "*/":
-                        self._advance()
-                    self._advance()
-                    self._advance()
-                else:
-                    self._add_token(TokenType.SLASH)
-            case ' ' | '\r' | '\t':
-                pass
-            case '\n':
-                self._line += 1
-            case '"':
-                self._scan_string()
-
-            case _:
-                if is_digit(c):
-                    self._scan_number()
-                elif is_alpha(c):
-                    self._scan_identifier()
-                else:
-                    LoxErrors.error(self._line, f"Unexpected character {c}.")
-
-    def _add_token(self, token_type: TokenType, literal=None):
-        token = Token(
-            type=token_type,
-            lexeme=self._source[self._start: self._current],
-            literal=literal,
-            line=self._line
-        )
-        self._tokens.append(token)
-
-    def _advance(self) -> str:
-        char = self._source[self._current]
-        self._current += 1
-        return char
-
-    def _match(self, expected: str) -> bool:
-        if self._is_at_end():
-            return False
-        if self._source[self._current] != expected:
-            return False
-        self._current += 1
-        return True
-
-    def _peek(self) -> str:
-        if self._is_at_end():
-            return None
-        return self._source[self._current]
-
-    def _peek_next(self) -> str:
-        if self._current + 1 >= len(self._source):
-            return None
-        return self._source[self._current + 1]
-
-    def _peek_digraph(self) -> str:
-        return f"{self._peek()}{self._peek_next()}"
-
-    def _is_at_end(self) -> bool:
-        return self._current >= len(self._source)
-
-    def _scan_string(self):
-        while self._peek() not in ['"', None]:
-            if self._peek() == '\n':
-                self._line += 1
-            self._advance()
-        if self._is_at_end():
-            # string not terminated
-            LoxErrors.error(self._line, "Unterminated string")
+        return list(self.tokens())
+
+    def tokens(self) -> Iterator[Token]:
+        keyword = KEYWORD_TOKEN_TYPES.get
+        error = self._errors.error
+        intern = sys.intern
+        IDENTIFIER, NUMBER, STRING = \
+            TokenType.IDENTIFIER, TokenType.NUMBER, TokenType.STRING
+        line = 1
+        # Start of the last lexeme scanned, EOF's lexeme begins there.
+        start = 0
+        buffer = ''
+        pos = 0
+        chunks = self._chunks()
+        chunk = next(chunks, None)
+        while chunk is not None:
+            buffer = buffer[pos:] + chunk
+            chunk = next(chunks, None)
+            pos = len(buffer)
+            for match in LEXEME.finditer(buffer):
+                kind = match.lastgroup
+                text = match.group()
+                if kind == 'space':
+                    line += text.count('\n')
+                    start = match.end() - 1
+                    continue
+                start = match.start()
+                # Names and operators repeat a lot, so their tokens share
+                # the lexeme strings.
+                if kind == 'identifier':
+                    text = intern(text)
+                    yield Token(keyword(text, IDENTIFIER), text, None, line)
+                elif kind == 'operator':
+                    text = intern(text)
+                    yield Token(OPERATOR_TOKEN_TYPES[text], text, None, line)
+                elif kind == 'number':
+                    yield Token(NUMBER, text, float(text), line)
+                elif kind == 'string':
+                    line += text.count('\n')
+                    yield Token(STRING, text, text[1:-1], line)
+                elif kind in UNTERMINATED and chunk is not None:
+                    # Scan it again once the next chunk is appended.
+                    pos = start
+                    break
+                elif kind == 'unterminated_string':
+                    line += buffer.count('\n', start)
+                    error(line, "Unterminated string")
+                    break
+                elif kind == 'unterminated_comment':
+                    error(line, "Unterminated comment")
+                    break
+                elif kind == 'unexpected':
+                    error(line, f"Unexpected character {text}.")
+                # Comments are skipped. Newlines inside block comments have
+                # never been counted, and line numbers stay compatible with
+                # that.
+
+        yield Token(TokenType.EOF, buffer[start:], None, line)
+
+    def _chunks(self) -> Iterator[str]:
+        if isinstance(self._source, str):
+            if self._source:
+                yield self._source
             return
-        self._advance()  # step over '"'
-        # +-1 are trimming the surrounding '"'
-        value = self._source[self._start + 1:self._current - 1]
-        self._add_token(TokenType.STRING, value)
-
-    def _scan_number(self):
-        while is_digit(self._peek()):
-            self._advance()
-        # check if there's a fractional part
-        if self._peek() == '.' and is_digit(self._peek_next()):
-            self._advance()
-            while is_digit(self._peek()):
-                self._advance()
-
-        self._add_token(TokenType.NUMBER,
-                        float(self._source[self._start:self._current]))
-
-    def _scan_identifier(self):
-        while is_alphanumeric(self._peek()):
-            self._advance()
-
-        word = self._source[self._start:self._current]
-        token_type = KEYWORD_TOKEN_TYPES.get(word, TokenType.IDENTIFIER)
-        self._add_token(token_type)
-
-
-def is_digit(char: str) -> bool:
-    return char and char in string.digits
-
-
-def is_alpha(char: str) -> bool:
-    return char and char in string.ascii_letters or char == '_'
-
-
-def is_alphanumeric(char):
-    return is_digit(char) or is_alpha(char)
+        while lines := self._source.readlines(CHUNK_SIZE):
+            yield ''.join(lines)
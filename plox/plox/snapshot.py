@@ -0,0 +1,110 @@
+import pickle
+from typing import BinaryIO
+
+from plox import __version__
+from plox.closure_interpreter import FunctionCode
+from plox.environment import UNDEFINED, GlobalCell
+from plox.interpreter import Interpreter
+from plox.natives import NativeFunction
+
+# Bumped when the pickled heap changes shape without a version bump.
+FORMAT = 3
+
+
+class SnapshotError(Exception):
+    pass
+
+
+# The globals and their cells are not part of the snapshot, only what the
+# cells hold. Everything referring to them is pickled by name and bound to
+# the cells of the interpreter restoring the heap, so code compiled before
+# and after the restore shares the same globals.
+class _HeapPickler(pickle.Pickler):
+    def __init__(self, file: BinaryIO, interpreter: Interpreter):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self._interpreter = interpreter
+        self._globals = interpreter.globals
+        self._names = {id(cell): name
+                       for name, cell in self._globals.cells().items()}
+
+    def persistent_id(self, obj):
+        if obj is self._globals:
+            return 'globals'
+        # Bound methods of native values hold on to it.
+        if obj is self._interpreter:
+            return 'interpreter'
+        if type(obj) is GlobalCell:
+            return 'cell', self._names[id(obj)]
+        # Compiled closures can't be pickled, the declaration is compiled
+        # again instead.
+        if type(obj) is FunctionCode:
+            return 'code', obj.name, obj.declaration
+        # Natives are the restoring interpreter's, by name.
+        if type(obj) is NativeFunction and \
+                self._interpreter.natives.get(obj.name) is obj:
+            return 'native', obj.name
+        return None
+
+
+class _HeapUnpickler(pickle.Unpickler):
+    def __init__(self, file: BinaryIO, interpreter: Interpreter):
+        super().__init__(file)
+        self._interpreter = interpreter
+        self._code = {}
+
+    def persistent_load(self, pid):
+        match pid:
+            case 'globals':
+                return self._interpreter.globals
+            case 'interpreter':
+                return self._interpreter
+            case 'cell', name:
+                return self._interpreter.globals.cell(name)
+            case 'code', name, declaration:
+                code = self._code.get(id(declaration))
+                if code is None:
+                    code = self._interpreter.compile_function(name,
+                                                              declaration)
+                    self._code[id(declaration)] = code
+                return code
+            case 'native', name:
+                native = self._interpreter.natives.get(name)
+                if native is None:
+                    raise SnapshotError(f'native {name} is not defined')
+                return native
+        raise pickle.UnpicklingError(f'unknown persistent id {pid!r}')
+
+
+# Writes every defined global of the interpreter, with all the functions,
+# classes and instances reachable from them, to `file`.
+def save_heap(interpreter: Interpreter, file: BinaryIO):
+    values = {name: cell.value
+              for name, cell in interpreter.globals.cells().items()
+              if cell.value is not UNDEFINED}
+    header = (__version__, FORMAT, type(interpreter).__name__)
+    try:
+        pickle.dump(header, file, pickle.HIGHEST_PROTOCOL)
+        _HeapPickler(file, interpreter).dump(values)
+    except (RecursionError, pickle.PicklingError) as e:
+        raise SnapshotError(f'heap can not be saved: {e}') from None
+
+
+# Defines the globals saved by save_heap in the interpreter, which has to be
+# of the same engine.
+def load_heap(interpreter: Interpreter, file: BinaryIO):
+    try:
+        version, format, engine = pickle.load(file)
+    except Exception:
+        raise SnapshotError('not a heap snapshot') from None
+    if (version, format) != (__version__, FORMAT):
+        raise SnapshotError(f'snapshot was saved by plox {version}')
+    if engine != type(interpreter).__name__:
+        raise SnapshotError(f'snapshot is of another engine ({engine})')
+    try:
+        values = _HeapUnpickler(file, interpreter).load()
+    except SnapshotError:
+        raise
+    except Exception:
+        raise SnapshotError('heap snapshot is corrupt') from None
+    for name, value in values.items():
+        interpreter.globals.define(name, value)
@@ -5,64 +5,68 @@ from plox.token_types import Token
 
 
 class Stmt:
-    pass
+    __slots__ = ()
 
 
-@dataclass
+@dataclass(slots=True)
 class Expression(Stmt):
     expr: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class Print(Stmt):
     expr: Expr
 
 
-@dataclass
+@dataclass(slots=True)
 class Return(Stmt):
     keyword: Token
     value: Expr
+    tail_call: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class Var(Stmt):
     name: Token
     init: Expr
+    slot: int = None
 
 
-@dataclass
+@dataclass(slots=True)
 class While(Stmt):
     condition: Expr
     body: Stmt
 
 
-@dataclass
+@dataclass(slots=True)
 class Block(Stmt):
     statements: [Stmt]
 
 
-@dataclass
+@dataclass(slots=True)
 class If(Stmt):
     condition: Expr
     then_branch: Stmt
     else_branch: Stmt
 
 
-@dataclass
+@dataclass(slots=True)
 class Function(Stmt):
     name: Token
     params: [Token]
     body: [Stmt]
+    slot: int = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Class(Stmt):
     name: Token
     superclass: Variable
     methods: [Function]
+    slot: int = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Lambda(Expr):
     params: [Token]
     body: [Stmt]
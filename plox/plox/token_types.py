@@ -9,6 +9,8 @@ class TokenType(Enum):
     RIGHT_PAREN = auto()
     LEFT_BRACE = auto()
     RIGHT_BRACE = auto()
+    LEFT_BRACKET = auto()
+    RIGHT_BRACKET = auto()
 
     # single character tokens
     COMMA = auto()
@@ -74,7 +76,7 @@ KEYWORD_TOKEN_TYPES = {
 }
 
 
-@dataclass(frozen=True, eq=False)
+@dataclass(frozen=True, eq=False, slots=True)
 class Token:
     type: TokenType
     lexeme: str
@@ -0,0 +1,5 @@
+from plox.vm.chunk import Chunk, OpCode
+from plox.vm.compiler import Compiler
+from plox.vm.vm import VM
+
+__all__ = ['Chunk', 'Compiler', 'OpCode', 'VM']
@@ -0,0 +1,85 @@
+from array import array
+from bisect import bisect_left
+from enum import IntEnum, auto
+
+from plox.token_types import Token
+
+
+class OpCode(IntEnum):
+    CONSTANT = 0
+    NOT = auto()
+    NEGATE = auto()
+    NIL = auto()
+    TRUE = auto()
+    FALSE = auto()
+    POP = auto()
+    GET_LOCAL = auto()
+    SET_LOCAL = auto()
+    GET_GLOBAL = auto()
+    DEFINE_GLOBAL = auto()
+    SET_GLOBAL = auto()
+    GET_UPVALUE = auto()
+    SET_UPVALUE = auto()
+    GET_PROPERTY = auto()
+    SET_PROPERTY = auto()
+    GET_INDEX = auto()
+    SET_INDEX = auto()
+    GET_SUPER = auto()
+    EQUAL = auto()
+    GREATER = auto()
+    GREATER_EQUAL = auto()
+    LESS = auto()
+    LESS_EQUAL = auto()
+    ADD = auto()
+    SUBTRACT = auto()
+    MULTIPLY = auto()
+    DIVIDE = auto()
+    PRINT = auto()
+    JUMP = auto()
+    JUMP_IF_FALSE = auto()
+    LOOP = auto()
+    CALL = auto()
+    TAIL_CALL = auto()
+    INVOKE = auto()
+    SUPER_INVOKE = auto()
+    TAIL_INVOKE = auto()
+    TAIL_SUPER_INVOKE = auto()
+    CLOSURE = auto()
+    CLOSE_UPVALUE = auto()
+    CLASS = auto()
+    INHERIT = auto()
+    METHOD = auto()
+    RETURN = auto()
+
+
+# Every opcode and operand takes one 16-bit word of the code array.
+MAX_OPERAND = 0xffff
+
+
+class Chunk:
+    def __init__(self):
+        self.code = array('H')
+        self.lines = array('i')
+        self.constants = []
+        # Offsets of instructions that can fail at runtime and the tokens
+        # their errors are reported against, in increasing offset order.
+        self._token_offsets = []
+        self._tokens = []
+
+    def write(self, word: int, line: int):
+        self.code.append(word)
+        self.lines.append(line)
+
+    def add_constant(self, value) -> int:
+        self.constants.append(value)
+        return len(self.constants) - 1
+
+    def mark(self, token: Token):
+        self._token_offsets.append(len(self.code))
+        self._tokens.append(token)
+
+    def token_at(self, ip: int) -> Token:
+        # `ip` points past the failing instruction, so the closest marked
+        # offset before it is the instruction itself.
+        index = bisect_left(self._token_offsets, ip) - 1
+        return self._tokens[index]
@@ -0,0 +1,453 @@
+from dataclasses import dataclass, field
+from enum import Enum, auto
+from functools import singledispatchmethod
+
+from plox.errors import LoxErrors
+from plox.expressions import (Assignment, Binary, Call, Expr, Get, Grouping,
+                              Index, Literal, Logical, Set, SetIndex, Super,
+                              This, Unary, Variable)
+from plox.statements import (Block, Class, Expression, Function, If, Lambda,
+                             Print, Return, Stmt, Var, While)
+from plox.token_types import Token, TokenType
+from plox.vm.chunk import MAX_OPERAND, Chunk, OpCode
+from plox.vm.objects import ObjFunction
+
+
+class FunctionType(Enum):
+    FUNCTION = auto()
+    INITIALIZER = auto()
+    METHOD = auto()
+    SCRIPT = auto()
+
+
+BINARY_OPS = {
+    TokenType.EQUAL_EQUAL: (OpCode.EQUAL,),
+    TokenType.BANG_EQUAL: (OpCode.EQUAL, OpCode.NOT),
+    TokenType.GREATER: (OpCode.GREATER,),
+    TokenType.GREATER_EQUAL: (OpCode.GREATER_EQUAL,),
+    TokenType.LESS: (OpCode.LESS,),
+    TokenType.LESS_EQUAL: (OpCode.LESS_EQUAL,),
+    TokenType.PLUS: (OpCode.ADD,),
+    TokenType.MINUS: (OpCode.SUBTRACT,),
+    TokenType.STAR: (OpCode.MULTIPLY,),
+    TokenType.SLASH: (OpCode.DIVIDE,),
+}
+
+
+def _this_token(keyword: Token) -> Token:
+    return Token(TokenType.THIS, 'this', None, keyword.line)
+
+
+@dataclass
+class Local:
+    name: str
+    depth: int
+    is_captured: bool = False
+
+
+@dataclass
+class FunctionState:
+    enclosing: 'FunctionState'
+    function: ObjFunction
+    type: FunctionType
+    locals: [Local] = field(default_factory=list)
+    upvalues: [(bool, int)] = field(default_factory=list)
+    scope_depth: int = 0
+
+
+class Compiler:
+    def __init__(self, errors: LoxErrors = None):
+        self._errors = LoxErrors() if errors is None else errors
+        self._current: FunctionState = None
+        self._line = 0
+
+    def compile(self, statements: [Stmt]) -> ObjFunction:
+        self._begin_function(None, FunctionType.SCRIPT)
+        for stmt in statements:
+            self._stmt(stmt)
+        return self._end_function()
+
+    # Emitting code
+    def _chunk(self) -> Chunk:
+        return self._current.function.chunk
+
+    def _emit(self, *words: int):
+        chunk = self._chunk()
+        for word in words:
+            chunk.write(word, self._line)
+
+    def _emit_checked(self, token: Token, *words: int):
+        self._line = token.line
+        self._chunk().mark(token)
+        self._emit(*words)
+
+    def _make_constant(self, value) -> int:
+        constant = self._chunk().add_constant(value)
+        if constant > MAX_OPERAND:
+            self._errors.error(self._line, 'Too many constants in one chunk.')
+            return 0
+        return constant
+
+    def _emit_jump(self, op: OpCode) -> int:
+        self._emit(op, MAX_OPERAND)
+        return len(self._chunk().code) - 1
+
+    def _patch_jump(self, offset: int):
+        code = self._chunk().code
+        jump = len(code) - offset - 1
+        if jump > MAX_OPERAND:
+            self._errors.error(self._line, 'Too much code to jump over.')
+        code[offset] = jump
+
+    def _emit_loop(self, loop_start: int):
+        offset = len(self._chunk().code) - loop_start + 2
+        if offset > MAX_OPERAND:
+            self._errors.error(self._line, 'Loop body too large.')
+        self._emit(OpCode.LOOP, offset)
+
+    def _emit_return(self):
+        if self._current.type == FunctionType.INITIALIZER:
+            self._emit(OpCode.GET_LOCAL, 0)
+        else:
+            self._emit(OpCode.NIL)
+        self._emit(OpCode.RETURN)
+
+    # Functions and scopes
+    def _begin_function(self, name: str, type: FunctionType):
+        self._current = FunctionState(self._current, ObjFunction(name), type)
+        receiver = ''
+        if type in (FunctionType.METHOD, FunctionType.INITIALIZER):
+            receiver = 'this'
+        self._current.locals.append(Local(receiver, 0))
+
+    def _end_function(self) -> ObjFunction:
+        self._emit_return()
+        function = self._current.function
+        self._current = self._current.enclosing
+        return function
+
+    def _function(self, name: str, params: [Token], body: [Stmt],
+                  type: FunctionType):
+        self._begin_function(name, type)
+        self._begin_scope()
+        self._current.function.arity = len(params)
+        for param in params:
+            self._add_local(param.lexeme)
+            self._mark_initialized()
+        for stmt in body:
+            self._stmt(stmt)
+        upvalues = self._current.upvalues
+        function = self._end_function()
+        self._emit(OpCode.CLOSURE, self._make_constant(function))
+        for is_local, index in upvalues:
+            self._emit(1 if is_local else 0, index)
+
+    def _begin_scope(self):
+        self._current.scope_depth += 1
+
+    def _end_scope(self):
+        current = self._current
+        current.scope_depth -= 1
+        while current.locals and current.locals[-1].depth > current.scope_depth:
+            if current.locals[-1].is_captured:
+                self._emit(OpCode.CLOSE_UPVALUE)
+            else:
+                self._emit(OpCode.POP)
+            current.locals.pop()
+
+    def _add_local(self, name: str):
+        if len(self._current.locals) > MAX_OPERAND:
+            self._errors.error(self._line,
+                               'Too many local variables in function.')
+            return
+        self._current.locals.append(Local(name, -1))
+
+    def _mark_initialized(self):
+        if self._current.scope_depth == 0:
+            return
+        self._current.locals[-1].depth = self._current.scope_depth
+
+    def _declare_variable(self, name: Token):
+        self._line = name.line
+        if self._current.scope_depth > 0:
+            self._add_local(name.lexeme)
+
+    def _define_variable(self, name: Token):
+        if self._current.scope_depth > 0:
+            self._mark_initialized()
+            return
+        self._emit(OpCode.DEFINE_GLOBAL, self._make_constant(name.lexeme))
+
+    def _resolve_local(self, state: FunctionState, name: str) -> int:
+        for i in range(len(state.locals) - 1, -1, -1):
+            if state.locals[i].name == name:
+                return i
+        return -1
+
+    def _add_upvalue(self, state: FunctionState, index: int,
+                     is_local: bool) -> int:
+        upvalue = (is_local, index)
+        if upvalue in state.upvalues:
+            return state.upvalues.index(upvalue)
+        state.upvalues.append(upvalue)
+        state.function.upvalue_count = len(state.upvalues)
+        return len(state.upvalues) - 1
+
+    def _resolve_upvalue(self, state: FunctionState, name: str) -> int:
+        if state.enclosing is None:
+            return -1
+        local = self._resolve_local(state.enclosing, name)
+        if local != -1:
+            state.enclosing.locals[local].is_captured = True
+            return self._add_upvalue(state, local, True)
+        upvalue = self._resolve_upvalue(state.enclosing, name)
+        if upvalue != -1:
+            return self._add_upvalue(state, upvalue, False)
+        return -1
+
+    def _named_variable(self, name: Token, is_global: bool,
+                        assign: bool = False):
+        self._line = name.line
+        if is_global:
+            constant = self._make_constant(name)
+            op = OpCode.SET_GLOBAL if assign else OpCode.GET_GLOBAL
+        elif (arg := self._resolve_local(self._current, name.lexeme)) != -1:
+            constant = arg
+            op = OpCode.SET_LOCAL if assign else OpCode.GET_LOCAL
+        else:
+            constant = self._resolve_upvalue(self._current, name.lexeme)
+            op = OpCode.SET_UPVALUE if assign else OpCode.GET_UPVALUE
+        self._emit(op, constant)
+
+    # Statements
+    @singledispatchmethod
+    def _stmt(self, stmt: Stmt):
+        raise NotImplementedError
+
+    @_stmt.register
+    def _(self, stmt: Expression):
+        self._expr(stmt.expr)
+        self._emit(OpCode.POP)
+
+    @_stmt.register
+    def _(self, stmt: Print):
+        self._expr(stmt.expr)
+        self._emit(OpCode.PRINT)
+
+    @_stmt.register
+    def _(self, stmt: Var):
+        self._declare_variable(stmt.name)
+        if stmt.init is not None:
+            self._expr(stmt.init)
+        else:
+            self._emit(OpCode.NIL)
+        self._define_variable(stmt.name)
+
+    @_stmt.register
+    def _(self, stmt: Function):
+        self._declare_variable(stmt.name)
+        self._mark_initialized()
+        self._function(stmt.name.lexeme, stmt.params, stmt.body,
+                       FunctionType.FUNCTION)
+        self._define_variable(stmt.name)
+
+    @_stmt.register
+    def _(self, stmt: Return):
+        self._line = stmt.keyword.line
+        if stmt.value is None:
+            self._emit_return()
+        elif stmt.tail_call:
+            self._call(stmt.value, tail=True)
+            # Only reached when the callee wasn't a closure.
+            self._emit(OpCode.RETURN)
+        else:
+            self._expr(stmt.value)
+            self._emit(OpCode.RETURN)
+
+    @_stmt.register
+    def _(self, stmt: If):
+        self._expr(stmt.condition)
+        then_jump = self._emit_jump(OpCode.JUMP_IF_FALSE)
+        self._emit(OpCode.POP)
+        self._stmt(stmt.then_branch)
+        else_jump = self._emit_jump(OpCode.JUMP)
+        self._patch_jump(then_jump)
+        self._emit(OpCode.POP)
+        if stmt.else_branch is not None:
+            self._stmt(stmt.else_branch)
+        self._patch_jump(else_jump)
+
+    @_stmt.register
+    def _(self, stmt: While):
+        loop_start = len(self._chunk().code)
+        self._expr(stmt.condition)
+        exit_jump = self._emit_jump(OpCode.JUMP_IF_FALSE)
+        self._emit(OpCode.POP)
+        self._stmt(stmt.body)
+        self._emit_loop(loop_start)
+        self._patch_jump(exit_jump)
+        self._emit(OpCode.POP)
+
+    @_stmt.register
+    def _(self, stmt: Block):
+        self._begin_scope()
+        for statement in stmt.statements:
+            self._stmt(statement)
+        self._end_scope()
+
+    @_stmt.register
+    def _(self, stmt: Class):
+        name = stmt.name
+        self._declare_variable(name)
+        self._emit(OpCode.CLASS, self._make_constant(name.lexeme))
+        self._define_variable(name)
+        is_global = self._current.scope_depth == 0
+
+        if stmt.superclass is not None:
+            self._expr(stmt.superclass)
+            self._begin_scope()
+            self._add_local('super')
+            self._mark_initialized()
+            self._named_variable(name, is_global)
+            self._emit_checked(stmt.superclass.name, OpCode.INHERIT)
+
+        self._named_variable(name, is_global)
+        for method in stmt.methods:
+            type = FunctionType.METHOD
+            if method.name.lexeme == 'init':
+                type = FunctionType.INITIALIZER
+            self._function(method.name.lexeme, method.params, method.body,
+                           type)
+            self._emit(OpCode.METHOD, self._make_constant(method.name.lexeme))
+        self._emit(OpCode.POP)
+
+        if stmt.superclass is not None:
+            self._end_scope()
+
+    # Expressions
+    @singledispatchmethod
+    def _expr(self, expr: Expr):
+        raise NotImplementedError
+
+    @_expr.register
+    def _(self, expr: Literal):
+        if expr.value is None:
+            self._emit(OpCode.NIL)
+        elif expr.value is True:
+            self._emit(OpCode.TRUE)
+        elif expr.value is False:
+            self._emit(OpCode.FALSE)
+        else:
+            self._emit(OpCode.CONSTANT, self._make_constant(expr.value))
+
+    @_expr.register
+    def _(self, expr: Grouping):
+        self._expr(expr.expression)
+
+    @_expr.register
+    def _(self, expr: Variable):
+        self._named_variable(expr.name, expr.depth is None)
+
+    @_expr.register
+    def _(self, expr: Assignment):
+        self._expr(expr.value)
+        self._named_variable(expr.name, expr.depth is None, assign=True)
+
+    @_expr.register
+    def _(self, expr: This):
+        self._named_variable(expr.keyword, False)
+
+    @_expr.register
+    def _(self, expr: Unary):
+        self._expr(expr.right)
+        if expr.operator.type == TokenType.BANG:
+            self._emit(OpCode.NOT)
+        else:
+            self._emit_checked(expr.operator, OpCode.NEGATE)
+
+    @_expr.register
+    def _(self, expr: Binary):
+        self._expr(expr.left)
+        self._expr(expr.right)
+        self._emit_checked(expr.operator, *BINARY_OPS[expr.operator.type])
+
+    @_expr.register
+    def _(self, expr: Logical):
+        self._expr(expr.left)
+        if expr.operator.type == TokenType.OR:
+            else_jump = self._emit_jump(OpCode.JUMP_IF_FALSE)
+            end_jump = self._emit_jump(OpCode.JUMP)
+            self._patch_jump(else_jump)
+        else:
+            end_jump = self._emit_jump(OpCode.JUMP_IF_FALSE)
+        self._emit(OpCode.POP)
+        self._expr(expr.right)
+        self._patch_jump(end_jump)
+
+    @_expr.register
+    def _(self, expr: Lambda):
+        self._function(None, expr.params, expr.body, FunctionType.FUNCTION)
+
+    @_expr.register
+    def _(self, expr: Call):
+        self._call(expr)
+
+    # Tail calls replace the caller's frame when the callee is a closure.
+    def _call(self, expr: Call, tail: bool = False):
+        callee = expr.callee
+        if isinstance(callee, Get):
+            self._expr(callee.object)
+            self._args(expr.args)
+            op = OpCode.TAIL_INVOKE if tail else OpCode.INVOKE
+            self._emit_checked(expr.paren, op,
+                               self._make_constant(callee.name),
+                               len(expr.args))
+        elif isinstance(callee, Super):
+            self._named_variable(_this_token(callee.keyword), False)
+            self._args(expr.args)
+            self._named_variable(callee.keyword, False)
+            op = OpCode.TAIL_SUPER_INVOKE if tail else OpCode.SUPER_INVOKE
+            self._emit_checked(expr.paren, op,
+                               self._make_constant(callee.method),
+                               len(expr.args))
+        else:
+            self._expr(callee)
+            self._args(expr.args)
+            op = OpCode.TAIL_CALL if tail else OpCode.CALL
+            self._emit_checked(expr.paren, op, len(expr.args))
+
+    def _args(self, args: [Expr]):
+        for arg in args:
+            self._expr(arg)
+
+    @_expr.register
+    def _(self, expr: Get):
+        self._expr(expr.object)
+        self._line = expr.name.line
+        self._emit(OpCode.GET_PROPERTY, self._make_constant(expr.name))
+
+    @_expr.register
+    def _(self, expr: Set):
+        self._expr(expr.object)
+        self._expr(expr.value)
+        self._line = expr.name.line
+        self._emit(OpCode.SET_PROPERTY, self._make_constant(expr.name))
+
+    @_expr.register
+    def _(self, expr: Index):
+        self._expr(expr.object)
+        self._expr(expr.index)
+        self._emit_checked(expr.bracket, OpCode.GET_INDEX)
+
+    @_expr.register
+    def _(self, expr: SetIndex):
+        self._expr(expr.object)
+        self._expr(expr.index)
+        self._expr(expr.value)
+        self._emit_checked(expr.bracket, OpCode.SET_INDEX)
+
+    @_expr.register
+    def _(self, expr: Super):
+        self._named_variable(_this_token(expr.keyword), False)
+        self._named_variable(expr.keyword, False)
+        self._emit(OpCode.GET_SUPER, self._make_constant(expr.method))
@@ -0,0 +1,74 @@
+from plox.vm.chunk import Chunk, OpCode
+from plox.vm.objects import ObjFunction
+
+SIMPLE = {
+    OpCode.NIL, OpCode.TRUE, OpCode.FALSE, OpCode.POP, OpCode.EQUAL,
+    OpCode.GREATER, OpCode.GREATER_EQUAL, OpCode.LESS, OpCode.LESS_EQUAL,
+    OpCode.ADD, OpCode.SUBTRACT, OpCode.MULTIPLY, OpCode.DIVIDE, OpCode.NOT,
+    OpCode.NEGATE, OpCode.PRINT, OpCode.CLOSE_UPVALUE, OpCode.INHERIT,
+    OpCode.RETURN, OpCode.GET_INDEX, OpCode.SET_INDEX,
+}
+SLOT = {
+    OpCode.GET_LOCAL, OpCode.SET_LOCAL, OpCode.GET_UPVALUE,
+    OpCode.SET_UPVALUE, OpCode.CALL, OpCode.TAIL_CALL,
+}
+JUMP = {OpCode.JUMP: 1, OpCode.JUMP_IF_FALSE: 1, OpCode.LOOP: -1}
+INVOKE = {
+    OpCode.INVOKE, OpCode.SUPER_INVOKE, OpCode.TAIL_INVOKE,
+    OpCode.TAIL_SUPER_INVOKE,
+}
+
+
+def disassemble_function(function: ObjFunction) -> [str]:
+    lines = [f'== {function!r} ==']
+    lines += disassemble_chunk(function.chunk)
+    for constant in function.chunk.constants:
+        if isinstance(constant, ObjFunction):
+            lines += disassemble_function(constant)
+    return lines
+
+
+def disassemble_chunk(chunk: Chunk) -> [str]:
+    lines = []
+    offset = 0
+    while offset < len(chunk.code):
+        text, offset = disassemble_instruction(chunk, offset)
+        lines.append(text)
+    return lines
+
+
+def disassemble_instruction(chunk: Chunk, offset: int) -> (str, int):
+    code = chunk.code
+    if offset > 0 and chunk.lines[offset] == chunk.lines[offset - 1]:
+        prefix = f'{offset:04d}    | '
+    else:
+        prefix = f'{offset:04d} {chunk.lines[offset]:4d} '
+    op = OpCode(code[offset])
+    name = f'OP_{op.name}'
+
+    if op in SIMPLE:
+        return prefix + name, offset + 1
+    if op in SLOT:
+        return f'{prefix}{name:<16} {code[offset + 1]:4d}', offset + 2
+    if op in JUMP:
+        target = offset + 2 + JUMP[op] * code[offset + 1]
+        return f'{prefix}{name:<16} {offset:4d} -> {target}', offset + 2
+    constant = code[offset + 1]
+    value = _constant_repr(chunk.constants[constant])
+    if op in INVOKE:
+        args = code[offset + 2]
+        return (f'{prefix}{name:<16} ({args} args) {constant:4d} {value}',
+                offset + 3)
+    text = f'{prefix}{name:<16} {constant:4d} {value}'
+    offset += 2
+    if op == OpCode.CLOSURE:
+        for _ in range(chunk.constants[constant].upvalue_count):
+            kind = 'local' if code[offset] else 'upvalue'
+            text += f'\n{offset:04d}    |{"":21} {kind} {code[offset + 1]}'
+            offset += 2
+    return text, offset
+
+
+def _constant_repr(value) -> str:
+    lexeme = getattr(value, 'lexeme', None)
+    return f"'{lexeme if lexeme is not None else value}'"
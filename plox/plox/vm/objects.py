@@ -0,0 +1,86 @@
+from plox.callable import LoxCallable
+from plox.vm.chunk import Chunk
+
+
+class ObjFunction:
+    def __init__(self, name: str = None):
+        self.name = name
+        self.arity = 0
+        self.upvalue_count = 0
+        self.chunk = Chunk()
+
+    def __repr__(self):
+        if self.name is None:
+            return '<script>'
+        return f'<fn {self.name}>'
+
+
+class ObjUpvalue:
+    __slots__ = ('location', 'closed')
+
+    def __init__(self, location: int):
+        # Index of the captured slot on the VM stack while the variable is
+        # still alive there, -1 once it has been closed over.
+        self.location = location
+        self.closed = None
+
+
+class ObjClosure(LoxCallable):
+    def __init__(self, function: ObjFunction, upvalues: list):
+        self.function = function
+        self.upvalues = upvalues
+
+    def call(self, interpreter, args):
+        return interpreter.call(self, args)
+
+    def arity(self):
+        return self.function.arity
+
+    def __repr__(self):
+        if self.function.name is None:
+            return '<lambda fn>'
+        return f'<fn {self.function.name}>'
+
+
+class ObjClass(LoxCallable):
+    def __init__(self, name: str):
+        self.name = name
+        self.methods = {}
+
+    def call(self, interpreter, args):
+        return interpreter.call(self, args)
+
+    def arity(self):
+        initializer = self.methods.get('init')
+        if initializer is None:
+            return 0
+        return initializer.arity()
+
+    def __str__(self):
+        return self.name
+
+
+class ObjInstance:
+    __slots__ = ('klass', 'fields')
+
+    def __init__(self, klass: ObjClass):
+        self.klass = klass
+        self.fields = {}
+
+    def __str__(self):
+        return f'{self.klass.name} instance'
+
+
+class ObjBoundMethod(LoxCallable):
+    def __init__(self, receiver, method: ObjClosure):
+        self.receiver = receiver
+        self.method = method
+
+    def call(self, interpreter, args):
+        return interpreter.call(self, args)
+
+    def arity(self):
+        return self.method.arity()
+
+    def __repr__(self):
+        return repr(self.method)
@@ -0,0 +1,465 @@
+from operator import add, mul, sub, truediv
+from typing import TextIO
+
+from plox.callable import LoxCallable
+from plox.errors import LoxErrors, LoxRuntimeError
+from plox.float_array import arithmetic
+from plox.interpreter import Interpreter
+from plox.natives import (NativeError, NativeFunction, NativeMethod,
+                          NativeObject)
+from plox.statements import Stmt
+from plox.token_types import Token
+from plox.vm.chunk import OpCode
+from plox.vm.compiler import Compiler
+from plox.vm.objects import (ObjBoundMethod, ObjClass, ObjClosure,
+                             ObjInstance, ObjUpvalue)
+
+FRAMES_MAX = 10000
+
+_MISSING = object()
+
+_ELEMENT_WISE = {
+    OpCode.ADD: add,
+    OpCode.SUBTRACT: sub,
+    OpCode.MULTIPLY: mul,
+    OpCode.DIVIDE: truediv,
+}
+
+
+class CallFrame:
+    __slots__ = ('closure', 'ip', 'base')
+
+    def __init__(self, closure: ObjClosure, base: int):
+        self.closure = closure
+        self.ip = 0
+        # Stack index of slot 0: the callee itself, or the receiver.
+        self.base = base
+
+
+class VM(Interpreter):
+    def __init__(self, errors: LoxErrors = None, out: TextIO = None):
+        super().__init__(errors, out)
+        self._stack = []
+        self._frames: [CallFrame] = []
+        self._open_upvalues: {int: ObjUpvalue} = {}
+
+    def interpret(self, statements: [Stmt]):
+        function = Compiler(self.errors).compile(statements)
+        if self.errors.had_error:
+            return
+        closure = ObjClosure(function, [])
+        self._stack.append(closure)
+        self._frames.append(CallFrame(closure, 0))
+        try:
+            self._run(0)
+        except LoxRuntimeError as e:
+            self.errors.runtime_error(e)
+            self._stack.clear()
+            self._frames.clear()
+            self._open_upvalues.clear()
+
+    # Entry point for native code calling back into Lox.
+    def call(self, callee, args):
+        depth = len(self._frames)
+        self._stack.append(callee)
+        self._stack.extend(args)
+        self._call_value(callee, len(args))
+        if len(self._frames) > depth:
+            return self._run(depth)
+        return self._stack.pop()
+
+    def _error(self, message: str) -> LoxRuntimeError:
+        return LoxRuntimeError(self._token(), message)
+
+    def _token(self) -> Token:
+        frame = self._frames[-1]
+        return frame.closure.function.chunk.token_at(frame.ip)
+
+    # Operands that aren't both numbers, of which only arithmetic ones may
+    # be FloatArrays.
+    def _element_wise(self, op: OpCode, a, b, message: str):
+        function = _ELEMENT_WISE.get(op)
+        if function is None:
+            raise self._error(message)
+        return arithmetic(self._token(), function, a, b, message)
+
+    def _push_frame(self, closure: ObjClosure, arg_count: int):
+        if arg_count != closure.function.arity:
+            raise self._error(
+                f'Expected {closure.function.arity} arguments, '
+                f'but got {arg_count}.')
+        if len(self._frames) == FRAMES_MAX:
+            raise self._error('Stack overflow.')
+        self._frames.append(
+            CallFrame(closure, len(self._stack) - arg_count - 1))
+
+    def _call_value(self, callee, arg_count: int):
+        stack = self._stack
+        if isinstance(callee, ObjClosure):
+            self._push_frame(callee, arg_count)
+        elif isinstance(callee, ObjBoundMethod):
+            stack[-arg_count - 1] = callee.receiver
+            self._push_frame(callee.method, arg_count)
+        elif isinstance(callee, ObjClass):
+            stack[-arg_count - 1] = ObjInstance(callee)
+            initializer = callee.methods.get('init')
+            if initializer is not None:
+                self._push_frame(initializer, arg_count)
+            elif arg_count != 0:
+                raise self._error(
+                    f'Expected 0 arguments, but got {arg_count}.')
+        elif type(callee) is NativeFunction:
+            # Few arguments are passed directly, without slicing them into
+            # a list.
+            try:
+                if arg_count == 1:
+                    result = callee.call_native(stack[-1])
+                elif arg_count == 2:
+                    result = callee.call_native(stack[-2], stack[-1])
+                else:
+                    result = callee.call_native(
+                        *stack[len(stack) - arg_count:])
+            except NativeError as e:
+                raise self._error(str(e)) from None
+            except RecursionError:
+                raise self._error('Stack overflow.') from None
+            del stack[len(stack) - arg_count - 1:]
+            stack.append(result)
+        elif isinstance(callee, LoxCallable):
+            if arg_count != callee.arity():
+                raise self._error(
+                    f'Expected {callee.arity()} arguments, '
+                    f'but got {arg_count}.')
+            args = stack[len(stack) - arg_count:]
+            del stack[len(stack) - arg_count - 1:]
+            stack.append(callee.call(self, args))
+        else:
+            raise self._error('Can only call functions and classes')
+
+    # Replaces the current frame with the callee's when it is a closure
+    # taking the right number of arguments.
+    def _tail_call(self, callee, arg_count: int):
+        if not isinstance(callee, ObjClosure) or \
+                callee.function.arity != arg_count:
+            self._call_value(callee, arg_count)
+            return
+        base = self._frames[-1].base
+        if self._open_upvalues:
+            self._close_upvalues(base)
+        del self._stack[base:len(self._stack) - arg_count - 1]
+        self._frames.pop()
+        self._push_frame(callee, arg_count)
+
+    # With `tail` set, the receiver and the arguments take the place of the
+    # current frame, as _tail_call does for other callees.
+    def _invoke_from_class(self, klass: ObjClass, name, arg_count: int,
+                           tail: bool = False):
+        method = klass.methods.get(name.lexeme)
+        if method is None:
+            raise LoxRuntimeError(name, f'Undefined property {name.lexeme}.')
+        if tail:
+            self._tail_call(method, arg_count)
+        else:
+            self._push_frame(method, arg_count)
+
+    def _invoke(self, name, arg_count: int, tail: bool = False):
+        receiver = self._stack[-arg_count - 1]
+        if not isinstance(receiver, ObjInstance):
+            if isinstance(receiver, NativeObject):
+                self._invoke_native(receiver.method(name), arg_count)
+                return
+            raise LoxRuntimeError(name, 'Only instances have properties.')
+        value = receiver.fields.get(name.lexeme, _MISSING)
+        if value is not _MISSING:
+            self._stack[-arg_count - 1] = value
+            if tail:
+                self._tail_call(value, arg_count)
+            else:
+                self._call_value(value, arg_count)
+        else:
+            self._invoke_from_class(receiver.klass, name, arg_count, tail)
+
+    def _invoke_native(self, method: NativeMethod, arg_count: int):
+        stack = self._stack
+        receiver = stack[-arg_count - 1]
+        try:
+            if arg_count == 0:
+                result = method.call_method(self, receiver)
+            elif arg_count == 1:
+                result = method.call_method(self, receiver, stack[-1])
+            else:
+                result = method.call_method(
+                    self, receiver, *stack[len(stack) - arg_count:])
+        except NativeError as e:
+            raise self._error(str(e)) from None
+        except RecursionError:
+            raise self._error('Stack overflow.') from None
+        del stack[len(stack) - arg_count - 1:]
+        stack.append(result)
+
+    def _bind_method(self, klass: ObjClass, name, receiver):
+        method = klass.methods.get(name.lexeme)
+        if method is None:
+            raise LoxRuntimeError(name, f'Undefined property {name.lexeme}.')
+        return ObjBoundMethod(receiver, method)
+
+    def _capture_upvalue(self, location: int) -> ObjUpvalue:
+        upvalue = self._open_upvalues.get(location)
+        if upvalue is None:
+            upvalue = ObjUpvalue(location)
+            self._open_upvalues[location] = upvalue
+        return upvalue
+
+    def _close_upvalues(self, last: int):
+        stack = self._stack
+        for location in [loc for loc in self._open_upvalues if loc >= last]:
+            upvalue = self._open_upvalues.pop(location)
+            upvalue.closed = stack[location]
+            upvalue.location = -1
+
+    def _run(self, stop: int):
+        stack = self._stack
+        frames = self._frames
+        push = stack.append
+        pop = stack.pop
+        globals = self.globals
+        stringify = self._stringify
+        out = self._out
+        check_equal = self._check_equal
+
+        frame = frames[-1]
+        closure = frame.closure
+        code = closure.function.chunk.code
+        constants = closure.function.chunk.constants
+        base = frame.base
+        ip = frame.ip
+
+        (CONSTANT, NOT, NEGATE, NIL, TRUE, FALSE, POP, GET_LOCAL, SET_LOCAL,
+         GET_GLOBAL, DEFINE_GLOBAL, SET_GLOBAL, GET_UPVALUE, SET_UPVALUE,
+         GET_PROPERTY, SET_PROPERTY, GET_INDEX, SET_INDEX, GET_SUPER, EQUAL,
+         GREATER, GREATER_EQUAL, LESS, LESS_EQUAL, ADD, SUBTRACT, MULTIPLY,
+         DIVIDE, PRINT, JUMP, JUMP_IF_FALSE, LOOP, CALL, TAIL_CALL, INVOKE,
+         SUPER_INVOKE, TAIL_INVOKE, TAIL_SUPER_INVOKE, CLOSURE, CLOSE_UPVALUE,
+         CLASS, INHERIT, METHOD, RETURN) = tuple(OpCode)
+
+        while True:
+            op = code[ip]
+            ip += 1
+
+            if op == GET_LOCAL:
+                push(stack[base + code[ip]])
+                ip += 1
+            elif op == CONSTANT:
+                push(constants[code[ip]])
+                ip += 1
+            elif op == GET_GLOBAL:
+                push(globals.get(constants[code[ip]]))
+                ip += 1
+            elif op == SET_LOCAL:
+                stack[base + code[ip]] = stack[-1]
+                ip += 1
+            elif op == POP:
+                pop()
+            elif op == JUMP_IF_FALSE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip += code[ip]
+                ip += 1
+            elif op == JUMP:
+                ip += code[ip] + 1
+            elif op == LOOP:
+                ip -= code[ip] - 1
+            elif op == LESS or op == LESS_EQUAL or op == GREATER \
+                    or op == GREATER_EQUAL or op == SUBTRACT \
+                    or op == MULTIPLY or op == DIVIDE:
+                b = pop()
+                a = pop()
+                if not (isinstance(a, float) and isinstance(b, float)):
+                    frame.ip = ip
+                    push(self._element_wise(op, a, b,
+                                            'Operands must be numbers'))
+                elif op == LESS:
+                    push(a < b)
+                elif op == SUBTRACT:
+                    push(a - b)
+                elif op == MULTIPLY:
+                    push(a * b)
+                elif op == GREATER:
+                    push(a > b)
+                elif op == LESS_EQUAL:
+                    push(a <= b)
+                elif op == GREATER_EQUAL:
+                    push(a >= b)
+                else:
+                    push(a / b)
+            elif op == ADD:
+                b = pop()
+                a = pop()
+                if (isinstance(a, float) and isinstance(b, float)) or \
+                        (isinstance(a, str) and isinstance(b, str)):
+                    push(a + b)
+                else:
+                    frame.ip = ip
+                    push(self._element_wise(
+                        op, a, b,
+                        'Operands must be two numbers or two strings.'))
+            elif op == GET_UPVALUE:
+                upvalue = closure.upvalues[code[ip]]
+                if upvalue.location < 0:
+                    push(upvalue.closed)
+                else:
+                    push(stack[upvalue.location])
+                ip += 1
+            elif op == SET_UPVALUE:
+                upvalue = closure.upvalues[code[ip]]
+                if upvalue.location < 0:
+                    upvalue.closed = stack[-1]
+                else:
+                    stack[upvalue.location] = stack[-1]
+                ip += 1
+            elif op == CALL or op == INVOKE or op == SUPER_INVOKE \
+                    or op == TAIL_CALL or op == TAIL_INVOKE \
+                    or op == TAIL_SUPER_INVOKE:
+                if op == CALL:
+                    arg_count = code[ip]
+                    ip += 1
+                    frame.ip = ip
+                    self._call_value(stack[-arg_count - 1], arg_count)
+                elif op == TAIL_CALL:
+                    arg_count = code[ip]
+                    ip += 1
+                    frame.ip = ip
+                    self._tail_call(stack[-arg_count - 1], arg_count)
+                elif op == INVOKE or op == TAIL_INVOKE:
+                    name = constants[code[ip]]
+                    arg_count = code[ip + 1]
+                    ip += 2
+                    frame.ip = ip
+                    self._invoke(name, arg_count, op == TAIL_INVOKE)
+                else:
+                    name = constants[code[ip]]
+                    arg_count = code[ip + 1]
+                    ip += 2
+                    frame.ip = ip
+                    self._invoke_from_class(pop(), name, arg_count,
+                                            op == TAIL_SUPER_INVOKE)
+                frame = frames[-1]
+                closure = frame.closure
+                code = closure.function.chunk.code
+                constants = closure.function.chunk.constants
+                base = frame.base
+                ip = frame.ip
+            elif op == RETURN:
+                result = pop()
+                if self._open_upvalues:
+                    self._close_upvalues(base)
+                frames.pop()
+                del stack[base:]
+                if len(frames) == stop:
+                    return result
+                push(result)
+                frame = frames[-1]
+                closure = frame.closure
+                code = closure.function.chunk.code
+                constants = closure.function.chunk.constants
+                base = frame.base
+                ip = frame.ip
+            elif op == NIL:
+                push(None)
+            elif op == TRUE:
+                push(True)
+            elif op == FALSE:
+                push(False)
+            elif op == EQUAL:
+                b = pop()
+                push(check_equal(pop(), b))
+            elif op == NOT:
+                value = pop()
+                push(value is None or value is False)
+            elif op == NEGATE:
+                value = stack[-1]
+                if not isinstance(value, float):
+                    frame.ip = ip
+                    raise self._error('Operand must be a number')
+                stack[-1] = -value
+            elif op == GET_PROPERTY:
+                name = constants[code[ip]]
+                ip += 1
+                instance = stack[-1]
+                if isinstance(instance, ObjInstance):
+                    value = instance.fields.get(name.lexeme, _MISSING)
+                    if value is _MISSING:
+                        value = self._bind_method(instance.klass, name,
+                                                  instance)
+                elif isinstance(instance, NativeObject):
+                    value = instance.method(name).bind(self, instance)
+                else:
+                    raise LoxRuntimeError(
+                        name, 'Only instances have properties.')
+                stack[-1] = value
+            elif op == SET_PROPERTY:
+                name = constants[code[ip]]
+                ip += 1
+                value = pop()
+                instance = stack[-1]
+                if not isinstance(instance, ObjInstance):
+                    raise LoxRuntimeError(name, 'Only instances have fields')
+                instance.fields[name.lexeme] = value
+                stack[-1] = value
+            elif op == GET_INDEX or op == SET_INDEX:
+                frame.ip = ip
+                if op == SET_INDEX:
+                    value = pop()
+                index = pop()
+                obj = stack[-1]
+                if not isinstance(obj, NativeObject):
+                    raise self._error('Only collections can be indexed.')
+                try:
+                    if op == GET_INDEX:
+                        stack[-1] = obj.get_item(index)
+                    else:
+                        obj.set_item(index, value)
+                        stack[-1] = value
+                except NativeError as e:
+                    raise self._error(str(e)) from None
+            elif op == GET_SUPER:
+                name = constants[code[ip]]
+                ip += 1
+                superclass = pop()
+                stack[-1] = self._bind_method(superclass, name, stack[-1])
+            elif op == PRINT:
+                print(stringify(pop()), file=out)
+            elif op == DEFINE_GLOBAL:
+                globals.define(constants[code[ip]], pop())
+                ip += 1
+            elif op == SET_GLOBAL:
+                globals.assign(constants[code[ip]], stack[-1])
+                ip += 1
+            elif op == CLOSURE:
+                function = constants[code[ip]]
+                ip += 1
+                upvalues = []
+                for _ in range(function.upvalue_count):
+                    if code[ip]:
+                        upvalues.append(
+                            self._capture_upvalue(base + code[ip + 1]))
+                    else:
+                        upvalues.append(closure.upvalues[code[ip + 1]])
+                    ip += 2
+                push(ObjClosure(function, upvalues))
+            elif op == CLOSE_UPVALUE:
+                self._close_upvalues(len(stack) - 1)
+                pop()
+            elif op == CLASS:
+                push(ObjClass(constants[code[ip]]))
+                ip += 1
+            elif op == INHERIT:
+                superclass = stack[-2]
+                if not isinstance(superclass, ObjClass):
+                    frame.ip = ip
+                    raise self._error('Superclass must be a class')
+                pop().methods.update(superclass.methods)
+            elif op == METHOD:
+                method = pop()
+                stack[-1].methods[constants[code[ip]]] = method
+                ip += 1
@@ -0,0 +1,19 @@
+import io
+
+import pytest
+
+from plox.lox import Lox
+from plox.natives import Natives
+
+
+def _run(engine: str, src: str, natives: Natives = None) -> (str, str):
+    out, err = io.StringIO(), io.StringIO()
+    Lox(engine=engine, natives=natives, out=out, err=err).run(src)
+    return out.getvalue(), err.getvalue()
+
+
+# Runs a source on an engine and returns what it printed to stdout and
+# stderr.
+@pytest.fixture
+def run():
+    return _run
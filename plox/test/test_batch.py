@@ -0,0 +1,29 @@
+from plox.batch import BatchSettings, run_batch, run_script
+
+
+def test_run_script(tmp_path):
+    script = tmp_path / 'ok.lox'
+    script.write_text('print "hi";')
+    result = run_script(str(script), BatchSettings(use_cache=False))
+    assert (result['exit_code'], result['stdout'], result['stderr']) == \
+        (0, 'hi\n', '')
+
+    script.write_text('print "a" + 1;')
+    result = run_script(str(script), BatchSettings(use_cache=False))
+    assert result['exit_code'] == 70
+    assert 'Operands must be' in result['stderr']
+
+    result = run_script(str(tmp_path / 'missing.lox'), BatchSettings())
+    assert result['exit_code'] == 66
+
+
+def test_run_batch(tmp_path):
+    paths = []
+    for i in range(6):
+        path = tmp_path / f'{i}.lox'
+        path.write_text(f'var x = {i}; print x * x;')
+        paths.append(str(path))
+    results = run_batch(paths, BatchSettings(engine='vm', use_cache=False),
+                        jobs=2)
+    outputs = {result['file']: result['stdout'] for result in results}
+    assert outputs == {path: f'{i * i}\n' for i, path in enumerate(paths)}
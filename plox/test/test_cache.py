@@ -0,0 +1,60 @@
+import os
+
+from plox.cache import MemoryCache, ProgramCache
+from plox.lox import ENGINES, Lox
+from plox.optimizer import PASSES
+
+SOURCE = '''
+class A { init(n) { this.n = n; } get() { return this.n; } }
+fun twice(x) { return x + x; }
+print twice(A(21).get());
+'''
+
+
+def run(cache, capsys):
+    Lox(engine='closure', cache=cache).run(SOURCE)
+    return capsys.readouterr().out
+
+
+def test_cached_program_runs(tmp_path, capsys):
+    cache = ProgramCache(str(tmp_path))
+    assert run(cache, capsys) == '42\n'
+    [name] = os.listdir(tmp_path)
+    assert name.endswith('.plc')
+    assert cache.load(SOURCE, list(PASSES)) is not None
+    assert run(cache, capsys) == '42\n'
+
+
+def test_cache_misses(tmp_path, capsys):
+    cache = ProgramCache(str(tmp_path))
+    run(cache, capsys)
+    assert cache.load(SOURCE + ' ', list(PASSES)) is None
+    assert cache.load(SOURCE, ['fold']) is None
+    [name] = os.listdir(tmp_path)
+    with open(tmp_path / name, 'wb') as cache_file:
+        cache_file.write(b'garbage')
+    assert cache.load(SOURCE, list(PASSES)) is None
+    assert run(cache, capsys) == '42\n'
+
+
+def test_memory_cache(capsys):
+    cache = MemoryCache(size=1)
+    assert run(cache, capsys) == '42\n'
+    first = cache.load(SOURCE, list(PASSES))
+    # Interpreters leave the statements alone, every load shares them.
+    assert first is not None and first is cache.load(SOURCE, list(PASSES))
+    assert run(cache, capsys) == '42\n'
+    for engine in ENGINES:
+        Lox(engine=engine, cache=cache).run(SOURCE)
+        assert capsys.readouterr().out == '42\n'
+    cache.store('print 1;', list(PASSES), [])
+    assert cache.load(SOURCE, list(PASSES)) is None
+
+
+def test_errors_not_cached(tmp_path, capsys):
+    cache = ProgramCache(str(tmp_path))
+    for _ in range(2):
+        Lox(cache=cache).run('print 1;\nprint (;')
+        assert capsys.readouterr().out == \
+            "[line 2] Error at ';': Expected expression\n"
+    assert os.listdir(tmp_path) == []
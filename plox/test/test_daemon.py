@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+import signal
+import threading
+
+import pytest
+
+from plox.batch import BatchSettings
+from plox.client import request
+from plox.daemon import TIMED_OUT, Daemon
+
+
+@pytest.fixture
+def serve(tmp_path):
+    daemons = []
+
+    def serve(**options) -> str:
+        socket_path = str(tmp_path / f'plox{len(daemons)}.sock')
+        daemon = Daemon(socket_path, BatchSettings(use_cache=False), jobs=1,
+                        **options)
+        thread = threading.Thread(target=daemon.serve_forever)
+        thread.start()
+        daemons.append((daemon, thread))
+        return socket_path
+    yield serve
+    for daemon, thread in daemons:
+        daemon.shutdown()
+        daemon.server_close()
+        thread.join()
+        assert not os.path.exists(daemon.server_address)
+
+
+def test_daemon(tmp_path, serve):
+    script = tmp_path / 'script.lox'
+    script.write_text('print "from file";')
+    socket_path = serve()
+    assert list(request(socket_path, {'path': str(script)})) == [
+        {'stdout': 'from file\n'}, {'exit_code': 0, 'cached': False}]
+    for cached in [False, True]:
+        *output, done = request(socket_path, {'source': 'print nil + 1;'})
+        assert done == {'exit_code': 70, 'cached': cached}
+        stderr = ''.join(reply['stderr'] for reply in output)
+        assert stderr.startswith('+: ')
+    [reply] = request(socket_path, {'path': 1})
+    assert 'error' in reply
+
+
+# Output reaches the client while the script still runs, until the script
+# runs out of time.
+def test_timeout(serve):
+    socket_path = serve(request_timeout=0.5)
+    replies = request(socket_path,
+                      {'source': 'print "started";\nwhile (true) {}'})
+    assert next(replies) == {'stdout': 'started\n'}
+    assert list(replies) == [
+        {'stderr': 'plox: timed out after 0.5s\n'},
+        {'exit_code': TIMED_OUT, 'cached': False}]
+    *_, done = request(socket_path, {'source': 'print 1;'})
+    assert done['exit_code'] == 0
+
+
+def test_worker_killed(serve):
+    socket_path = serve()
+    *_, done = request(socket_path, {'source': 'print 1;'})
+    assert done['exit_code'] == 0
+    [worker] = multiprocessing.active_children()
+    os.kill(worker.pid, signal.SIGKILL)
+    worker.join()
+    # A request the dead worker's pool still takes fails, the pool is
+    # replaced for the ones after it.
+    for _ in range(2):
+        *_, done = request(socket_path, {'source': 'print 2;'})
+        if 'exit_code' in done:
+            break
+        assert done['error'].startswith('worker failed')
+    assert done['exit_code'] == 0
+
+
+def test_socket_of_another_user(serve, monkeypatch):
+    socket_path = serve()
+    monkeypatch.setattr(os, 'getuid', lambda: os.stat(socket_path).st_uid + 1)
+    with pytest.raises(PermissionError):
+        next(request(socket_path, {'source': 'print 1;'}))
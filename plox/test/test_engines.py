@@ -0,0 +1,234 @@
+import io
+
+import pytest
+
+from plox.lox import ENGINES, Lox
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_fun_lox(engine, run):
+    with open("test/fun.lox") as lox_src:
+        out, err = run(engine, lox_src.read())
+
+    expected = ['Hi, dear reader!']
+    a, b = 0, 1
+    for _ in range(20):
+        expected.append(str(a))
+        a, b = b, a + b
+    expected += ['1', '2', '1', '2', '3', '1', '2', '3', 'Hi, user', '10']
+    assert out.splitlines() == expected
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_classes(engine, run):
+    src = '''
+    class A {
+      init(x) { this.x = x; }
+      get() { return this.x; }
+    }
+    class B < A {
+      init(x) { super.init(x * 2); }
+      get() { return super.get() + 1; }
+    }
+    var b = B(3);
+    print b.get();
+    print b;
+    print B;
+    b.y = "field";
+    print b.y;
+    '''
+    out, err = run(engine, src)
+    assert out.splitlines() == ['7', 'B instance', 'B', 'field']
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_closures(engine, run):
+    src = '''
+    var a = "global";
+    {
+      fun show() { print a; }
+      show();
+      var a = "block";
+      show();
+      print a;
+    }
+    '''
+    out, err = run(engine, src)
+    assert out.splitlines() == ['global', 'global', 'block']
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_runtime_error(engine, capsys):
+    lox = Lox(engine=engine)
+    lox.run('print "a" - 1;')
+    assert lox.errors.had_runtime_error
+    assert capsys.readouterr().err == '-: Operands must be numbers\n[line 1]\n'
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_upvalues(engine, run):
+    src = '''
+    fun counter() {
+      var i = 0;
+      fun count() { i = i + 1; return i; }
+      return count;
+    }
+    var a = counter();
+    var b = counter();
+    a(); a();
+    print a();
+    print b();
+    var fns = nil;
+    {
+      var shared = "open";
+      fun get() { return shared; }
+      fns = get;
+      shared = "closed";
+    }
+    print fns();
+    '''
+    out, err = run(engine, src)
+    assert out.splitlines() == ['3', '1', 'closed']
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_arity_error(engine, run):
+    out, err = run(engine, 'fun f(a) {}\nf(1, 2);')
+    assert err == '): Expected 1 arguments, but got 2.\n[line 2]\n'
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_globals(engine, run):
+    src = '''
+    fun show() { return late; }
+    var late = "late";
+    print show();
+    late = "reassigned";
+    print show();
+    print missing;
+    '''
+    out, err = run(engine, src)
+    assert out.splitlines() == ['late', 'reassigned']
+    assert err == 'missing: Undefined variable missing.\n[line 7]\n'
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_inherited_methods(engine, run):
+    src = '''
+    class A {
+      init(x) { this.x = x; }
+      name() { return "A"; }
+      get() { return this.name() + this.x; }
+    }
+    class B < A {}
+    class C < B {
+      name() { return "C" + super.name(); }
+    }
+    var objs = C("1");
+    print objs.get();
+    print B("2").get();
+    print C("3").get();
+    objs.name = "field";
+    print objs.name;
+    '''
+    out, err = run(engine, src)
+    assert out.splitlines() == ['CA1', 'A2', 'CA3', 'field']
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_invoke(engine, run):
+    src = '''
+    class A {
+      init() { this.callback = this.twice; }
+      twice(n) { return n * 2; }
+    }
+    var a = A();
+    print a.callback(4);
+    print a.twice;
+    print a.init();
+    a.twice(1, 2);
+    '''
+    out, err = run(engine, src)
+    assert out.splitlines() == ['8', '<fn twice>', 'A instance']
+    assert err == '): Expected 1 arguments, but got 2.\n[line 10]\n'
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_tail_calls(engine, run):
+    src = '''
+    fun even(n) { if (n == 0) return true; return odd(n - 1); }
+    fun odd(n) { if (n == 0) return false; return even(n - 1); }
+    print even(20001);
+    fun deep(n) { if (n == 0) return 0; return 1 + deep(n - 1); }
+    print deep(20000);
+    '''
+    out, err = run(engine, src)
+    assert out.splitlines() == ['false']
+    assert err == '): Stack overflow.\n[line 5]\n'
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_method_tail_calls(engine, run):
+    src = '''
+    class Counter {
+      go(n) { if (n == 0) return "done"; return this.go(n - 1); }
+    }
+    class Sub < Counter {
+      go(n) { if (n == 0) return "sub done"; return super.go(n - 1); }
+      hop(n) { if (n == 0) return "hopped"; return this.hop(n - 1); }
+    }
+    print Counter().go(20000);
+    print Sub().go(20000);
+    print Sub().hop(20000);
+    var c = Counter();
+    c.field = fun (n) { if (n == 0) return "field"; return c.field(n - 1); };
+    print c.field(20000);
+    '''
+    out, err = run(engine, src)
+    assert err == ''
+    assert out.splitlines() == ['done', 'sub done', 'hopped', 'field']
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_stream(engine, capsys):
+    src = io.StringIO('''
+    fun f(n) { return n * 2; }
+    print f(1);
+    print "a" - 1;
+    print f(2);
+    ''')
+    Lox(engine=engine).run_stream(src)
+    result = capsys.readouterr()
+    assert result.out.splitlines() == ['2']
+    assert result.err == '-: Operands must be numbers\n[line 4]\n'
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_isolated_instances(engine):
+    out, err = io.StringIO(), io.StringIO()
+    failing = Lox(engine=engine, out=out, err=err)
+    failing.run('print 1; print nil + 1;')
+    other = Lox(engine=engine, out=io.StringIO())
+    other.run('print 2;')
+    assert failing.errors.had_runtime_error
+    assert not other.errors.had_runtime_error
+    assert out.getvalue() == '1\n'
+    assert err.getvalue().startswith('+: ')
+    assert other.errors.out.getvalue() == '2\n'
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_stream_syntax_error(engine, capsys):
+    src = io.StringIO('''print 1;
+    print (;
+    print 2;
+    print 3 +;
+    ''')
+    lox = Lox(engine=engine)
+    lox.run_stream(src)
+    assert lox.errors.had_error
+    assert capsys.readouterr().out.splitlines() == [
+        '1',
+        "[line 2] Error at ';': Expected expression",
+        "[line 4] Error at ';': Expected expression",
+    ]
@@ -0,0 +1,57 @@
+from array import array
+
+import pytest
+
+from plox.float_array import FloatArray
+from plox.lox import ENGINES
+from plox.program import Program
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_float_array(engine, run):
+    out, err = run(engine, '''
+    var a = FloatArray(List(1, 2, 3));
+    var b = FloatArray(3);
+    b[0] = 10;
+    b[-1] = 0.5;
+    print b;
+    print a + b;
+    print a - 1;
+    print 6 / a;
+    print a * a;
+    print (a * 2).sum();
+    print a.dot(b);
+    print a.min();
+    print a.max();
+    print a.len();
+    print a.toList();
+    ''')
+    assert err == ''
+    assert out.splitlines() == [
+        '[10, 0, 0.5]', '[11, 2, 3.5]', '[0, 1, 2]', '[6, 3, 2]', '[1, 4, 9]',
+        '12', '11.5', '1', '3', '3', '[1, 2, 3]',
+    ]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_shared_buffers(engine):
+    program = Program('''
+    var total = prices.dot(amounts);
+    for (var i = 0; i < amounts.len(); i = i + 1) amounts[i] = 0;
+    var scaled = prices * 2;
+    ''')
+    prices = array('d', [1.5, 2.0, 4.0])
+    buffer = bytearray(array('d', [2.0, 1.0, 0.5]).tobytes())
+    amounts = memoryview(buffer).cast('d')
+    result = program.run({'prices': prices, 'amounts': amounts},
+                         engine=engine)
+    assert result.error is None
+    assert result.globals['total'] == 7.0
+    assert result.globals['prices'].values is prices
+    assert result.globals['scaled'].values == array('d', [3.0, 4.0, 8.0])
+    assert list(array('d', buffer)) == [0.0, 0.0, 0.0]
+
+
+def test_share():
+    with pytest.raises(TypeError):
+        FloatArray.share(array('i', [1]))
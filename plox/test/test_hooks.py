@@ -0,0 +1,124 @@
+import pytest
+
+from plox.closure_interpreter import ClosureInterpreter
+from plox.interpreter import InstrumentedInterpreter, Interpreter
+from plox.parser import Parser
+from plox.resolver import Resolver
+from plox.scanner import Scanner
+from plox.statements import Print
+from plox.token_types import Token, TokenType
+from plox.vm import VM
+
+SOURCE = '''
+class A { init(x) { this.x = x; } get() { return this.x; } }
+fun f(n) { return n + 1; }
+print A(f(1)).get();
+'''
+
+
+def run(interpreter, src):
+    statements = Parser(Scanner(src).scan_tokens()).parse()
+    Resolver().resolve(statements)
+    interpreter.interpret(statements)
+
+
+def test_hooks(capsys):
+    interpreter = Interpreter()
+    events = []
+    interpreter.add_hook('call', lambda fn, args: events.append(
+        ('call', repr(fn), args)))
+    interpreter.add_hook('return', lambda fn, value: events.append(
+        ('return', repr(fn), value)))
+    interpreter.add_hook('instance', lambda instance: events.append(
+        ('instance', str(instance))))
+    prints = []
+    interpreter.add_hook('statement', lambda stmt: isinstance(stmt, Print)
+                         and prints.append(stmt))
+    run(interpreter, SOURCE)
+    assert capsys.readouterr().out == '2\n'
+    assert events == [
+        ('call', '<fn f>', [1.0]),
+        ('return', '<fn f>', 2.0),
+        ('call', '<fn init>', [2.0]),
+        ('return', '<fn init>', None),
+        ('instance', 'A instance'),
+        ('call', '<fn get>', []),
+        ('return', '<fn get>', 2.0),
+    ]
+    assert len(prints) == 1
+
+
+# Tail calls return from each function of the chain with the value the last
+# one returns.
+def test_tail_call_hooks(capsys):
+    interpreter = Interpreter()
+    returns = []
+    interpreter.add_hook('return', lambda fn, value: returns.append(
+        (repr(fn), value)))
+    run(interpreter, '''
+    fun count(n) { if (n > 0) return count(n - 1); return "done"; }
+    fun start() { return (count(2)); }
+    print start();
+    ''')
+    assert capsys.readouterr().out == 'done\n'
+    assert returns == [('<fn count>', 'done')] * 3 + [('<fn start>', 'done')]
+
+
+def test_hook_calling_into_lox(capsys):
+    interpreter = Interpreter()
+
+    def call_other(fn, value):
+        if repr(fn) == '<fn f>':
+            other = interpreter.globals.get(
+                Token(TokenType.IDENTIFIER, 'other', None, 0))
+            interpreter.call(other, [])
+    interpreter.add_hook('return', call_other)
+    run(interpreter, '''
+    fun other() { return "other"; }
+    fun f() { return "f"; }
+    print f();
+    ''')
+    assert capsys.readouterr().out == 'f\n'
+
+
+# Natives calling a class make instances too.
+def test_instance_hook_from_natives():
+    interpreter = Interpreter()
+    instances = []
+    interpreter.add_hook('instance', instances.append)
+    run(interpreter, '''
+    class A { init(x) { this.x = x; } }
+    List(1, 2).map(A);
+    A(3);
+    ''')
+    assert [instance.get(Token(TokenType.IDENTIFIER, 'x', None, 0))
+            for instance in instances] == [1.0, 2.0, 3.0]
+
+
+def test_error_hook(capsys):
+    interpreter = Interpreter()
+    errors = []
+    interpreter.add_hook('error', errors.append)
+    run(interpreter, 'print 1 + nil;')
+    assert [error.message for error in errors] == \
+        ['Operands must be two numbers or two strings.']
+
+
+def test_hooks_are_removable():
+    interpreter = Interpreter()
+    calls = []
+    hook = calls.append
+    interpreter.add_hook('instance', hook)
+    assert type(interpreter) is InstrumentedInterpreter
+    interpreter.remove_hook('instance', hook)
+    assert type(interpreter) is Interpreter
+    run(interpreter, 'class A {} A();')
+    assert calls == []
+    with pytest.raises(ValueError):
+        interpreter.add_hook('jump', hook)
+
+
+@pytest.mark.parametrize('engine', [ClosureInterpreter, VM])
+def test_other_engines_have_no_hooks(engine):
+    with pytest.raises(TypeError, match='only the tree engine'):
+        engine().add_hook('statement', print)
@@ -0,0 +1,54 @@
+import pytest
+
+from plox.lox import ENGINES
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_list(engine, run):
+    out, err = run(engine, '''
+    var xs = List(3, 1, 2);
+    xs.append(4);
+    print xs;
+    print xs.len();
+    print xs[0] + xs[-1];
+    xs[1] = xs[1] + 10;
+    print xs;
+    xs.sort();
+    print xs;
+    xs.sort(fun (x) { return -x; });
+    print xs;
+    print xs.slice(1, 3);
+    print xs.slice(2);
+    print xs.map(fun (x) { return x * 2; });
+    print xs.filter(fun (x) { return x < 4; });
+    var len = xs.len;
+    xs.append(List("a", nil));
+    print len();
+    print xs;
+    ''')
+    assert err == ''
+    assert out.splitlines() == [
+        '[3, 1, 2, 4]', '4', '7', '[3, 11, 2, 4]', '[2, 3, 4, 11]',
+        '[11, 4, 3, 2]', '[4, 3]', '[3, 2]', '[22, 8, 6, 4]', '[3, 2]', '5',
+        '[11, 4, 3, 2, [a, nil]]',
+    ]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_callback_error(engine, run):
+    out, err = run(engine, '''var xs = List(1, 2, 3);
+    fun check(x) {
+      if (x > 2) return x + nil;
+      return true;
+    }
+    print xs.filter(check);''')
+    assert err == '+: Operands must be two numbers or two strings.\n' \
+                  '[line 3]\n'
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_callback_recursion(engine, run):
+    out, err = run(engine, '''
+    fun nest(n) { return List(n).map(fun (x) { return nest(x + 1); }); }
+    nest(0);''')
+    assert err == '): Stack overflow.\n[line 2]\n'
@@ -0,0 +1,46 @@
+import pytest
+
+from plox.lox import ENGINES
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_map(engine, run):
+    out, err = run(engine, '''
+    var m = Map();
+    m["a"] = 1;
+    m[2] = "two";
+    m[nil] = List(1);
+    m["b" + "c"] = m["a"] + 1;
+    print m;
+    print m["bc"];
+    print m[4 / 2];
+    print m.len();
+    print m.has("a");
+    print m.has("z");
+    print m.keys();
+    print m.values();
+    print m.remove("a");
+    print m.remove("a");
+    print m;
+    ''')
+    assert err == ''
+    assert out.splitlines() == [
+        '{a: 1, 2: two, nil: [1], bc: 2}', '2', 'two', '4', 'true', 'false',
+        '[a, 2, nil, bc]', '[1, two, [1], 2]', '1', 'nil',
+        '{2: two, nil: [1], bc: 2}',
+    ]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_lox_equality(engine, run):
+    # Keys collide exactly when == says they're equal.
+    out, err = run(engine, '''
+    var m = Map();
+    m[0] = "zero";
+    m[-0] = "negative zero";
+    m[1] = "one";
+    print 1 == true;
+    print m[true];
+    print m.len();
+    ''')
+    assert out.splitlines() == ['true', 'one', '2']
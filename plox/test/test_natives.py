@@ -0,0 +1,114 @@
+import io
+import math
+
+import pytest
+
+from plox.lox import ENGINES, Lox
+from plox.natives import NativeFunction, Natives
+from plox.snapshot import SnapshotError
+
+natives = Natives()
+
+
+@natives.register
+def hypot(x, y):
+    return math.hypot(x, y)
+
+
+@natives.register(name='join')
+def lox_join(separator, *parts):
+    return separator.join(parts)
+
+
+@natives.register
+def count(text, sub=' '):
+    return text.count(sub)
+
+
+@natives.register(name='sqrt', arity=1)
+def lox_sqrt(x):
+    return math.sqrt(x)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_natives(engine, run):
+    out, err = run(engine, '''
+    print hypot(3, 4);
+    print join(", ", "a", "b", "c");
+    print join("-");
+    print count("a b c");
+    print count("banana", "a") + 1;
+    print sqrt;
+    class A { init() { this.f = hypot; } }
+    print A().f(6, 8);
+    ''', natives)
+    assert err == ''
+    assert out.splitlines() == ['5', 'a, b, c', '', '2', '4', '<native fn>',
+                                '10']
+
+
+_KEY_ERROR = 'Map keys must be strings, numbers, booleans or nil.'
+
+
+# Errors raised by natives, the ones registered above and the builtin
+# collections alike. They stop the program on the line they're raised on.
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('src, error', [
+    ('hypot(1);', '): Expected 2 arguments, but got 1.'),
+    ('join();', '): Expected at least 1 arguments, but got 0.'),
+    ('count("a", "b", "c");', '): Expected at most 2 arguments, but got 3.'),
+    ('sqrt(-1);', '): sqrt: math domain error'),
+    ('join("", 1);',
+     '): join: sequence item 0: expected str instance, float found'),
+    ('var xs = List(1, 2, 3); xs[3];', ']: List index out of range.'),
+    ('var xs = List(1); xs[0.5] = 1;',
+     ']: List index must be a whole number.'),
+    ('nil[0];', ']: Only collections can be indexed.'),
+    ('List().push(1);', 'push: Undefined property push.'),
+    ('List().len(1);', '): Expected 0 arguments, but got 1.'),
+    ('List(1, "a").sort();',
+     "): sort: '<' not supported between instances of 'str' and 'float'"),
+    ('List(1).map(fun (a, b) {});', '): Expected 2 arguments, but got 1.'),
+    ('Map()["missing"];', ']: Map has no such key.'),
+    ('var m = Map(); m[Map()] = 1;', f']: {_KEY_ERROR}'),
+    ('Map()[List()];', f']: {_KEY_ERROR}'),
+    ('Map().has(List());', f'): {_KEY_ERROR}'),
+    ('Map().remove(Map);', f'): {_KEY_ERROR}'),
+    ('FloatArray(3) + FloatArray(2);', '+: FloatArray lengths differ.'),
+    ('FloatArray(3) + "s";',
+     '+: Operands must be two numbers or two strings.'),
+    ('FloatArray(3) < 1;', '<: Operands must be numbers'),
+    ('FloatArray(3) / FloatArray(3);', '/: Division by zero.'),
+    ('var a = FloatArray(3); a[0] = "s";',
+     ']: FloatArray elements must be numbers.'),
+    ('FloatArray(0).max();', '): FloatArray is empty.'),
+    ('FloatArray(List(1, nil));', '): FloatArray elements must be numbers.'),
+])
+def test_errors(engine, src, error, run):
+    out, err = run(engine, f'print "before";\n{src}\nprint "after";',
+                   natives)
+    assert out == 'before\n'
+    assert err == f'{error}\n[line 2]\n'
+
+
+def test_arity():
+    assert NativeFunction(hypot).arity() == 2
+    assert NativeFunction(lox_join).arity() is None
+    assert NativeFunction(math.floor, arity=1).arity() == 1
+    with pytest.raises(TypeError):
+        NativeFunction(lambda *, key: key)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_snapshot(engine, tmp_path):
+    path = str(tmp_path / 'heap')
+    lox = Lox(engine=engine, natives=natives)
+    lox.run('var f = hypot;')
+    lox.save_heap(path)
+    out = io.StringIO()
+    restored = Lox(engine=engine, natives=natives, out=out)
+    restored.load_heap(path)
+    restored.run('print f(5, 12);')
+    assert out.getvalue() == '13\n'
+    with pytest.raises(SnapshotError, match='native hypot'):
+        Lox(engine=engine).load_heap(path)
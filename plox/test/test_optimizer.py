@@ -0,0 +1,114 @@
+import pytest
+
+from plox.expressions import Literal, Logical, Variable
+from plox.lox import ENGINES, Lox
+from plox.optimizer import PASSES, Optimizer
+from plox.parser import Parser
+from plox.scanner import Scanner
+from plox.statements import Block, Expression, Print, Return
+
+
+def optimize(src, passes=PASSES):
+    statements = Parser(Scanner(src).scan_tokens()).parse()
+    return Optimizer(passes).optimize(statements)
+
+
+def test_fold_constants():
+    [stmt] = optimize('print -(1 + 2) * 3 <= -9 == !nil;')
+    assert stmt == Print(Literal(True))
+    [stmt] = optimize('print "a" + "b";')
+    assert stmt == Print(Literal('ab'))
+
+
+def test_fold_keeps_runtime_errors():
+    for src in ['print "a" - 1;', 'print 1 / 0;', 'print -"a";']:
+        [stmt] = optimize(src)
+        assert not isinstance(stmt.expr, Literal)
+
+
+def test_fold_logical():
+    [stmt] = optimize('print false or x;')
+    assert isinstance(stmt.expr, Variable)
+    [stmt] = optimize('print nil and x;')
+    assert stmt == Print(Literal(None))
+    [stmt] = optimize('print x or 1;')
+    assert isinstance(stmt.expr, Logical)
+
+
+def test_dead_branches():
+    assert optimize('if (false) print 1;') == []
+    assert optimize('while (1 < 0) print 1;') == []
+    assert optimize('if (1 > 0) print 1; else print 2;') == \
+        [Print(Literal(1.0))]
+    [stmt] = optimize('while (x) if (nil) print 1;')
+    assert stmt.body == Block([])
+
+
+def test_unreachable():
+    [fn] = optimize('fun f() { print 1; return 2; print 3; }')
+    assert fn.body == [Print(Literal(1.0)), Return(fn.body[1].keyword,
+                                                   Literal(2.0))]
+
+
+def test_passes_can_be_disabled():
+    [stmt] = optimize('(1 + 2);', passes=['groupings'])
+    assert isinstance(stmt, Expression)
+    assert not isinstance(stmt.expr, Literal)
+    assert optimize('if (false) print 1;', passes=[]) != []
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_optimized_program(engine, capsys):
+    Lox(engine=engine).run('''
+    fun f(n) {
+      if (true and n > 1) return (n * (2 + 3));
+      return "small";
+      print "unreachable";
+    }
+    while (false) print "never";
+    print f(2);
+    print f(1);
+    ''')
+    assert capsys.readouterr().out.splitlines() == ['10', 'small']
+
+
+# The parser leaves None for a declaration it couldn't parse, which the
+# optimizer drops, so the error itself has to stop the program.
+def test_syntax_error_stops_program(tmp_path, capsys):
+    path = tmp_path / 'bad.lox'
+    path.write_text('print 1;\nprint (;\nprint 2;\n')
+    with pytest.raises(SystemExit) as info:
+        Lox().run_file(str(path))
+    assert info.value.code == 65
+    result = capsys.readouterr()
+    assert result.out == "[line 2] Error at ';': Expected expression\n"
+
+
+# Programs are checked before any pass removes code, so disabling passes
+# never changes which of them compile.
+@pytest.mark.parametrize('passes', [PASSES, []])
+@pytest.mark.parametrize('src, error', [
+    ('if (false) return 1;\nprint "ran";',
+     "[line 1] Error : Can't return from top-level context"),
+    ('fun f() {\n  return;\n  var a;\n  var a;\n}',
+     '[line 4] Error : Already a variable with this name in this scope.'),
+    ('while (false) print this;',
+     '[line 1] Error : Can\'t use "this" outside of a class'),
+])
+def test_removed_code_is_checked(passes, src, error, capsys):
+    lox = Lox(passes=passes)
+    lox.run(src)
+    assert lox.errors.had_error
+    assert capsys.readouterr().out == f'{error}\n'
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_parenthesized_tail_call_without_passes(engine, capsys):
+    Lox(engine=engine, passes=[]).run('''
+    fun loop(n) {
+      if (n == 0) return "done";
+      return (loop(n - 1));
+    }
+    print loop(20000);
+    ''')
+    assert capsys.readouterr().out == 'done\n'
@@ -0,0 +1,15 @@
+from plox.parser import Parser
+from plox.scanner import Scanner
+
+
+def parse(src):
+    return Parser(Scanner(src).scan_tokens()).parse()
+
+
+def test_compact_nodes():
+    first, second = parse('print a + 1;\nprint a + 1;')
+    assert not hasattr(first, '__dict__')
+    assert not hasattr(first.expr, '__dict__')
+    assert not hasattr(first.expr.operator, '__dict__')
+    assert first.expr.right is second.expr.right
+    assert first.expr.left.name.lexeme is second.expr.left.name.lexeme
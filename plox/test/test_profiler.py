@@ -0,0 +1,60 @@
+import io
+from itertools import count
+
+from plox.lox import Lox
+from plox.profiler import SCRIPT, Profiler
+
+SOURCE = '''class A {
+  f(n) {
+    if (n > 0) return this.f(n - 1);
+    return g();
+  }
+}
+fun g() { return 1; }
+A().f(2);
+'''
+
+
+def profile(src):
+    # Every reading of the clock is one second later.
+    profiler = Profiler(clock=count().__next__)
+    Lox(profiler=profiler).run(src)
+    return profiler
+
+
+def test_function_stats():
+    profiler = profile(SOURCE)
+    assert set(profiler.functions) == {SCRIPT, 'A.f:2', 'g:7'}
+    assert profiler.functions['A.f:2'].calls == 3
+    assert profiler.functions['g:7'].calls == 1
+    for stats in profiler.functions.values():
+        assert stats.inclusive >= stats.exclusive > 0
+    script = profiler.functions[SCRIPT]
+    assert script.inclusive == sum(
+        stats.exclusive for stats in profiler.functions.values())
+
+
+def test_line_stats():
+    profiler = profile(SOURCE)
+    # The if and the return in it.
+    assert profiler.lines[3].count == 5
+    assert profiler.lines[4].count == 1
+    # The declaration of g and its return.
+    assert profiler.lines[7].count == 2
+    assert sum(stats.time for stats in profiler.lines.values()) <= \
+        profiler.functions[SCRIPT].inclusive
+
+
+def test_stacks():
+    profiler = profile(SOURCE)
+    out = io.StringIO()
+    profiler.write_stacks(out)
+    stacks = dict(line.rsplit(' ', 1) for line in out.getvalue().splitlines())
+    # Tail calls replace the caller's frame.
+    assert set(stacks) == {SCRIPT, f'{SCRIPT};A.f:2', f'{SCRIPT};g:7'}
+
+
+def test_report():
+    out = io.StringIO()
+    profile(SOURCE).report(out)
+    assert 'A.f:2' in out.getvalue()
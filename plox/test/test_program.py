@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from plox.errors import LoxCompileError
+from plox.lox import ENGINES
+from plox.program import Program
+
+RULE = '''
+class Order { init(total) { this.total = total; } }
+fun discount(order) {
+  if (order.total > limit) return order.total / 10;
+  return 0;
+}
+var order = Order(total);
+var result = discount(order);
+print result;
+'''
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_run_many_times(engine):
+    program = Program(RULE)
+    for total, expected in [(50, 0.0), (200, 20.0), (1000, 100.0)]:
+        result = program.run({'total': total, 'limit': 100}, engine=engine)
+        assert result.error is None
+        assert result.globals['result'] == expected
+        assert result.globals['total'] == float(total)
+        assert 'clock' not in result.globals
+        assert result.output == f'{expected:g}\n'
+
+
+# Runs share the compiled statements, each interpreter binds globals and
+# methods on its own.
+@pytest.mark.parametrize('engine', ENGINES)
+def test_concurrent_runs(engine):
+    program = Program(RULE + '''
+    class Big < Order { twice() { return this.total * 2; } }
+    for (var i = 0; i < 200; i = i + 1) result = result + Big(total).twice();
+    ''')
+
+    def run(total):
+        return program.run({'total': total, 'limit': 100}, engine=engine)
+    totals = [50, 200, 1000, 5000] * 4
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(run, totals))
+    for total, result in zip(totals, results):
+        assert result.error is None
+        discount = total / 10 if total > 100 else 0.0
+        assert result.globals['result'] == discount + 400 * total
+
+
+def test_runtime_error():
+    result = Program('var a = 1; var b = a + nil; var c = 3;').run()
+    assert result.error.message == \
+        'Operands must be two numbers or two strings.'
+    assert result.error.token.line == 1
+    assert result.globals == {'a': 1.0}
+
+
+def test_compile_error():
+    with pytest.raises(LoxCompileError) as info:
+        Program('return 1;')
+    [report] = info.value.reports
+    assert report.line == 1
+    assert 'top-level' in report.message
+
+
+def test_syntax_error():
+    with pytest.raises(LoxCompileError) as info:
+        Program('print 1; print (; print 2;')
+    [report] = info.value.reports
+    assert (report.line, report.where) == (1, "at ';'")
@@ -1,3 +1,7 @@
+import io
+
+from plox import scanner
+from plox.errors import LoxErrors
 from plox.scanner import Scanner
 from plox.token_types import Token, TokenType
 
@@ -59,3 +63,43 @@ def test_scanner():
 
     for (scanned, expected) in zip(scanner.scan_tokens(), expected_list):
         assert scanned == expected
+
+
+def fields(tokens):
+    return [(token.type, token.lexeme, token.literal, token.line)
+            for token in tokens]
+
+
+def test_scanner_runs(capsys):
+    src = 'a/*x\n*/ "two\nlines" 1.5.x // end\n>=!\n'
+    assert fields(Scanner(src).scan_tokens()) == [
+        (TokenType.IDENTIFIER, 'a', None, 1),
+        (TokenType.STRING, '"two\nlines"', 'two\nlines', 2),
+        (TokenType.NUMBER, '1.5', 1.5, 2),
+        (TokenType.DOT, '.', None, 2),
+        (TokenType.IDENTIFIER, 'x', None, 2),
+        (TokenType.GREATER_EQUAL, '>=', None, 3),
+        (TokenType.BANG, '!', None, 3),
+        (TokenType.EOF, '\n', None, 4),
+    ]
+    assert capsys.readouterr().out == ''
+
+
+def test_scanner_errors(capsys):
+    errors = LoxErrors()
+    tokens = Scanner('@ x "open\n', errors).scan_tokens()
+    assert fields(tokens) == [
+        (TokenType.IDENTIFIER, 'x', None, 1),
+        (TokenType.EOF, '"open\n', None, 2),
+    ]
+    assert capsys.readouterr().out == (
+        '[line 1] Error : Unexpected character @.\n'
+        '[line 2] Error : Unterminated string\n')
+    assert errors.had_error
+
+
+def test_scanner_stream(monkeypatch):
+    monkeypatch.setattr(scanner, 'CHUNK_SIZE', 1)
+    src = 'print "a\nb";\n/* c\n*/ x;\n'
+    streamed = Scanner(io.StringIO(src)).tokens()
+    assert fields(streamed) == fields(Scanner(src).scan_tokens())
@@ -0,0 +1,48 @@
+import pytest
+
+from plox.lox import ENGINES, Lox
+from plox.snapshot import SnapshotError
+
+PRELUDE = '''
+class Counter {
+  init(start) { this.n = start; }
+  next() { this.n = this.n + 1; total = total + 1; return this.n; }
+}
+class Twice < Counter {
+  next() { super.next(); return super.next(); }
+}
+fun adder(k) { fun add(x) { return x + k; } return add; }
+var total = 0;
+var add5 = adder(5);
+var shared = Twice(10);
+shared.next();
+'''
+
+JOB = '''
+print shared.next();
+print add5(1);
+print Counter(0).next();
+print total;
+'''
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_restored_heap(engine, tmp_path, capsys):
+    prelude = Lox(engine=engine)
+    prelude.run(PRELUDE)
+    prelude.save_heap(tmp_path / 'heap')
+    lox = Lox(engine=engine)
+    lox.load_heap(tmp_path / 'heap')
+    lox.run(JOB)
+    assert capsys.readouterr().out.splitlines() == ['14', '6', '1', '5']
+
+
+def test_snapshot_of_other_engine(tmp_path):
+    prelude = Lox(engine='tree')
+    prelude.run(PRELUDE)
+    prelude.save_heap(tmp_path / 'heap')
+    with pytest.raises(SnapshotError):
+        Lox(engine='vm').load_heap(tmp_path / 'heap')
+    (tmp_path / 'junk').write_bytes(b'junk')
+    with pytest.raises(SnapshotError):
+        Lox(engine='tree').load_heap(tmp_path / 'junk')
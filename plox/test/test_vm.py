@@ -0,0 +1,29 @@
+from plox.parser import Parser
+from plox.resolver import Resolver
+from plox.scanner import Scanner
+from plox.vm import Compiler, OpCode
+from plox.vm.debug import disassemble_chunk
+
+
+def compile(src):
+    statements = Parser(Scanner(src).scan_tokens()).parse()
+    Resolver().resolve(statements)
+    return Compiler().compile(statements)
+
+
+def test_compile_expression():
+    function = compile('print 1 + 2;')
+    code = function.chunk.code
+    assert list(code) == [
+        OpCode.CONSTANT, 0, OpCode.CONSTANT, 1, OpCode.ADD, OpCode.PRINT,
+        OpCode.NIL, OpCode.RETURN,
+    ]
+    assert function.chunk.constants == [1.0, 2.0]
+
+
+def test_locals_and_upvalues():
+    function = compile('{ var a = 1; fun f() { return a; } }')
+    listing = disassemble_chunk(function.chunk)
+    assert any('OP_CLOSURE' in line for line in listing)
+    assert any('local 1' in line for line in listing)
+    assert any('OP_CLOSE_UPVALUE' in line for line in listing)